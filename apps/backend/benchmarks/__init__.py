@@ -0,0 +1,6 @@
+"""Backend performance benchmarks.
+
+Each `bench_*` module is runnable on its own from `apps/backend`, e.g.
+`uv run python -m benchmarks.bench_state_update`, and writes a JSON report in
+the shared format of `benchmarks._report`.
+"""
@@ -0,0 +1,105 @@
+"""In-process stand-ins for the chat model, so benchmarks measure framework
+overhead rather than provider latency."""
+
+import asyncio
+import json
+import re
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from contextlib import ExitStack
+from itertools import cycle
+from typing import Any
+from unittest.mock import patch
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.tool import tool_call_chunk
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph.state import CompiledStateGraph
+
+from svelte_langgraph.graph import make_graph
+
+
+class FakeChatModel(GenericFakeChatModel):
+    """`GenericFakeChatModel` that accepts tools, as `create_agent` binds them
+    before every call."""
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> Runnable:
+        # A binding (not `self`), like real providers return; wrappers such as
+        # CoalescingChatModel rely on that shape.
+        return self.bind()
+
+
+class PacedChatModel(FakeChatModel):
+    """`FakeChatModel` whose stream waits `interval` seconds before each chunk
+    after the first, like a provider emitting tokens at a steady rate.
+
+    Tool calls are streamed too, as `args_chunk_chars`-sized argument
+    fragments the way providers stream them, followed by the text.
+    """
+
+    interval: float = 0.0
+    args_chunk_chars: int = 8
+
+    def _chunks(self, message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        n = self.args_chunk_chars
+        for index, tc in enumerate(message.tool_calls):
+            args = json.dumps(tc["args"])
+            for start in range(0, len(args), n):
+                head = start == 0
+                yield ChatGenerationChunk(
+                    message=AIMessageChunk(
+                        content="",
+                        tool_call_chunks=[
+                            tool_call_chunk(
+                                name=tc["name"] if head else None,
+                                args=args[start : start + n],
+                                id=tc["id"] if head else None,
+                                index=index,
+                            )
+                        ],
+                    )
+                )
+        if isinstance(message.content, str) and message.content:
+            for token in re.split(r"(\s)", message.content):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        message = next(self.messages)
+        if isinstance(message, str):
+            message = AIMessage(message)
+        for n, chunk in enumerate(self._chunks(message)):
+            if n:
+                await asyncio.sleep(self.interval)
+            yield chunk
+
+
+def fake_model(*responses: AIMessage) -> FakeChatModel:
+    """A fake model replaying `responses` forever (default: one short reply)."""
+    return FakeChatModel(messages=cycle(responses or (AIMessage("Hello!"),)))
+
+
+def fake_graph(
+    model: FakeChatModel, tools: Sequence[BaseTool | Callable] | None = None
+) -> CompiledStateGraph:
+    """The production graph wired to `model` and an `InMemorySaver`, and to
+    `tools` instead of the real ones if given."""
+    with ExitStack() as stack:
+        stack.enter_context(
+            patch("svelte_langgraph.graph.get_chat_model", return_value=model)
+        )
+        if tools is not None:
+            stack.enter_context(
+                patch("svelte_langgraph.graph.get_tools", return_value=tools)
+            )
+        graph = make_graph({})
+    return graph.copy(update={"checkpointer": InMemorySaver()})
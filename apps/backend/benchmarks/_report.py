@@ -0,0 +1,110 @@
+"""Shared measurement helpers and the JSON report format for benchmarks.
+
+Every benchmark emits the same shape so results can be stored and compared
+across commits:
+
+    {
+      "benchmark": "<name>",
+      "params": {...},
+      "results": [
+        {"name": ..., "unit": ..., "better": "lower" | "higher",
+         "n": ..., "mean": ..., "stdev": ..., "min": ..., "p50": ...,
+         "p95": ..., "max": ...},
+        ...
+      ]
+    }
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Literal
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile; `pct` in [0, 100]."""
+    ordered = sorted(samples)
+    if not ordered:
+        raise ValueError("percentile of an empty sample")
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class Measurement:
+    """One named series of samples, e.g. per-iteration latency in ms."""
+
+    name: str
+    unit: str
+    samples: list[float] = field(default_factory=list)
+    better: Literal["lower", "higher"] = "lower"
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "unit": self.unit,
+            "better": self.better,
+            "n": len(self.samples),
+            "mean": statistics.fmean(self.samples),
+            "stdev": statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0,
+            "min": min(self.samples),
+            "p50": percentile(self.samples, 50),
+            "p95": percentile(self.samples, 95),
+            "max": max(self.samples),
+        }
+
+
+async def time_async(
+    fn: Callable[[], Awaitable[object]], iterations: int, warmup: int = 3
+) -> list[float]:
+    """Await `fn` `warmup + iterations` times; return per-call wall ms."""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def parser(description: str, iterations: int = 200) -> argparse.ArgumentParser:
+    """Argument parser with the options every benchmark shares."""
+    p = argparse.ArgumentParser(description=description)
+    p.add_argument("--iterations", type=int, default=iterations)
+    p.add_argument(
+        "--output", type=Path, help="Write the JSON report here instead of stdout."
+    )
+    return p
+
+
+def build_report(
+    benchmark: str, measurements: Sequence[Measurement], params: dict[str, Any]
+) -> dict[str, Any]:
+    return {
+        "benchmark": benchmark,
+        "params": params,
+        "results": [m.summary() for m in measurements],
+    }
+
+
+def emit_report(report: dict[str, Any], output: Path | None) -> None:
+    """Print a summary table to stderr and the JSON report to `output`/stdout."""
+    print(f"{report['benchmark']}:", file=sys.stderr)
+    for r in report["results"]:
+        print(
+            f"  {r['name']:<40} p50={r['p50']:>10.3f}  p95={r['p95']:>10.3f}  "
+            f"mean={r['mean']:>10.3f} {r['unit']}",
+            file=sys.stderr,
+        )
+
+    text = json.dumps(report, indent=2)
+    if output is None:
+        print(text)
+    else:
+        output.write_text(text + "\n")
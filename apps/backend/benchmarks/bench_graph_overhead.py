@@ -0,0 +1,213 @@
+"""Per-turn overhead of the agent graph itself, with an instant fake model.
+
+Runs turns of the production graph (`make_graph`, every middleware) with an
+in-process fake chat model, instant fake tools and an `InMemorySaver`, so
+what's left is the graph's own cost. Each turn starts on a fresh thread
+already holding `history` messages, and the model answers either directly
+or after a first response with `tools` parallel `get_weather` calls and,
+with `phase=on`, a `change_phase` call. One parameter is varied at a time
+from the baseline (no history, no tool calls, no phase change): each value
+of `--history`, each of `--tool-calls`, and the phase change.
+
+Reported per case:
+
+- `turn`: wall time of a turn, ms;
+- `alloc_peak`: peak memory allocated during a turn, KiB, traced with
+  tracemalloc in `--alloc-iterations` separate turns (tracing slows them
+  down);
+- `checkpoint_size`: the thread's latest checkpoint with its channel values,
+  serialized as the saver stores it, KiB;
+- `checkpoint_written`: what the saver stored during the turn (checkpoints,
+  channel values and pending writes), KiB.
+
+Run from apps/backend:
+
+    uv run python -m benchmarks.bench_graph_overhead
+"""
+
+import asyncio
+import time
+import tracemalloc
+from collections.abc import Sequence
+from itertools import cycle
+from typing import NamedTuple
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph.state import CompiledStateGraph
+
+from svelte_langgraph.state_update import STATE_UPDATE_AS_NODE
+from svelte_langgraph.tool_cache import get_tool_cache
+from svelte_langgraph.tools import change_phase
+
+from ._fakes import FakeChatModel, fake_graph
+from ._report import Measurement, build_report, emit_report, parser
+
+KiB = 1024
+FILLER = "Some words to give messages a realistic size. " * 4
+
+
+class Case(NamedTuple):
+    history: int
+    tools: int
+    phase: bool
+
+    @property
+    def label(self) -> str:
+        phase = "on" if self.phase else "off"
+        return f"history={self.history},tools={self.tools},phase={phase}"
+
+
+def cases(history: Sequence[int], tool_calls: Sequence[int]) -> list[Case]:
+    """The baseline, then one parameter varied at a time."""
+    sweep = [Case(0, 0, False)]
+    sweep += [Case(n, 0, False) for n in history]
+    sweep += [Case(0, n, False) for n in tool_calls]
+    sweep.append(Case(0, 0, True))
+    return list(dict.fromkeys(sweep))
+
+
+async def get_weather(city: str) -> str:
+    """Get weather for a given city."""
+    return f"It's always sunny in {city}!"
+
+
+def responses(case: Case) -> list[AIMessage]:
+    """The model's messages of one turn."""
+    answer = AIMessage(f"Here you go. {FILLER}")
+    tool_calls = [
+        {"name": "get_weather", "args": {"city": f"City {n}"}, "id": f"call_{n}"}
+        for n in range(case.tools)
+    ]
+    if case.phase:
+        tool_calls.append(
+            {"name": "change_phase", "args": {"phase": "draft"}, "id": "call_phase"}
+        )
+    if not tool_calls:
+        return [answer]
+    return [AIMessage("", tool_calls=tool_calls), answer]
+
+
+def history(n: int) -> list[AnyMessage]:
+    messages: list[AnyMessage] = []
+    for i in range(n):
+        cls = HumanMessage if i % 2 == 0 else AIMessage
+        messages.append(cls(f"Message {i}. {FILLER}", id=str(uuid4())))
+    return messages
+
+
+def stored_bytes(saver: InMemorySaver) -> int:
+    """Bytes of everything `saver` holds, serialized."""
+    total = 0
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+    for writes in saver.writes.values():
+        for _, _, value, _ in writes.values():
+            total += len(value[1])
+    for _, value in saver.blobs.values():
+        total += len(value)
+    return total
+
+
+class Turns:
+    """Turns of `case` on fresh threads of one graph."""
+
+    def __init__(self, case: Case) -> None:
+        self.case = case
+        model = FakeChatModel(messages=cycle(responses(case)))
+        self.graph: CompiledStateGraph = fake_graph(model, [get_weather, change_phase])
+        saver = self.graph.checkpointer
+        assert isinstance(saver, InMemorySaver)
+        self.saver = saver
+
+    async def new_thread(self) -> RunnableConfig:
+        config = RunnableConfig(configurable={"thread_id": str(uuid4())})
+        if self.case.history:
+            await self.graph.aupdate_state(
+                config,
+                {"messages": history(self.case.history)},
+                as_node=STATE_UPDATE_AS_NODE,
+            )
+        # get_weather's results are cached; every turn must pay for its calls.
+        get_tool_cache().clear()
+        return config
+
+    async def turn(self, config: RunnableConfig) -> None:
+        await self.graph.ainvoke({"messages": [HumanMessage("And now?")]}, config)
+
+    async def checkpoint_size(self, config: RunnableConfig) -> int:
+        saved = await self.saver.aget_tuple(config)
+        assert saved is not None
+        return len(self.saver.serde.dumps_typed(saved.checkpoint)[1])
+
+
+async def measure(
+    case: Case, iterations: int, alloc_iterations: int
+) -> list[Measurement]:
+    turns = Turns(case)
+    label = case.label
+    latency = Measurement(f"turn[{label}]", "ms")
+    size = Measurement(f"checkpoint_size[{label}]", "KiB")
+    written = Measurement(f"checkpoint_written[{label}]", "KiB")
+    alloc = Measurement(f"alloc_peak[{label}]", "KiB")
+
+    for n in range(iterations + 3):
+        config = await turns.new_thread()
+        before = stored_bytes(turns.saver)
+        start = time.perf_counter()
+        await turns.turn(config)
+        elapsed = (time.perf_counter() - start) * 1000
+        if n < 3:
+            continue  # warm-up
+        latency.samples.append(elapsed)
+        written.samples.append((stored_bytes(turns.saver) - before) / KiB)
+        size.samples.append(await turns.checkpoint_size(config) / KiB)
+
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_iterations):
+            config = await turns.new_thread()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await turns.turn(config)
+            alloc.samples.append((tracemalloc.get_traced_memory()[1] - baseline) / KiB)
+    finally:
+        tracemalloc.stop()
+
+    return [latency, alloc, size, written]
+
+
+def counts(text: str) -> list[int]:
+    return [int(n) for n in text.split(",") if n]
+
+
+async def main() -> None:
+    p = parser("Per-turn overhead of the agent graph.", 30)
+    p.add_argument("--history", type=counts, default=[20, 100, 400])
+    p.add_argument("--tool-calls", type=counts, default=[1, 4, 8])
+    p.add_argument("--alloc-iterations", type=int, default=5)
+    args = p.parse_args()
+
+    measurements = []
+    for case in cases(args.history, args.tool_calls):
+        measurements += await measure(case, args.iterations, args.alloc_iterations)
+
+    report = build_report(
+        "graph_overhead",
+        measurements,
+        {
+            "iterations": args.iterations,
+            "alloc_iterations": args.alloc_iterations,
+            "history": args.history,
+            "tool_calls": args.tool_calls,
+        },
+    )
+    emit_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""Cold import time of the graph module, as every server worker pays it.
+
+Each iteration imports `--module` (default `svelte_langgraph.graph`, which
+Aegra loads at startup) in a fresh interpreter under `python -X importtime`
+and reads its per-module timings. Reported: the module's cumulative import
+time (`import`), and the cumulative time of the `--top` most expensive of
+its direct imports (`cumulative:<module>`), to see where the time goes. A
+module counts where it's first imported, so a later import of a module
+shows only what the earlier ones hadn't loaded yet.
+
+Run from apps/backend:
+
+    uv run python -m benchmarks.bench_import_time
+"""
+
+import subprocess
+import sys
+from collections import defaultdict
+
+from ._report import Measurement, build_report, emit_report, parser
+
+
+def import_times(module: str) -> dict[str, float]:
+    """Cumulative import ms of `module`, imported from scratch, and of each of
+    its direct imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, float] = {}
+    # Lines look like "import time:   self [us] | cumulative | imported package",
+    # the package indented by nesting level and listed after its imports.
+    for line in result.stderr.splitlines():
+        _, _, fields = line.partition("import time:")
+        self_us, _, rest = fields.partition("|")
+        cumulative_us, _, name = rest.partition("|")
+        if not self_us.strip().isdigit():
+            continue
+        ms = int(cumulative_us) / 1000
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            times[name.strip()] = ms
+        elif depth == 0 and name.strip() == module:
+            return {module: ms, **times}
+        elif depth == 0:
+            # Another top-level import, e.g. during interpreter startup.
+            times = {}
+    raise ValueError(f"{module} not found in the -X importtime output")
+
+
+def main() -> None:
+    p = parser("Cold import time of the graph module.", iterations=5)
+    p.add_argument("--module", default="svelte_langgraph.graph")
+    p.add_argument("--top", type=int, default=15)
+    args = p.parse_args()
+
+    samples: defaultdict[str, list[float]] = defaultdict(list)
+    for _ in range(args.iterations):
+        for name, ms in import_times(args.module).items():
+            samples[name].append(ms)
+
+    total = samples.pop(args.module)
+    heaviest = sorted(samples, key=lambda name: -min(samples[name]))[: args.top]
+    measurements = [Measurement("import", "ms", total)] + [
+        Measurement(f"cumulative:{name}", "ms", samples[name]) for name in heaviest
+    ]
+    report = build_report(
+        "import_time",
+        measurements,
+        {"iterations": args.iterations, "module": args.module, "top": args.top},
+    )
+    emit_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
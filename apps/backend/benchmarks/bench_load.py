@@ -0,0 +1,331 @@
+"""Load test against a running server: simulated users chatting end to end.
+
+Unlike the other benchmarks this one drives the real stack over HTTP: the
+Aegra server, `slow_mock.py` as the model provider and the OIDC mock for
+tokens. Start them first, e.g.:
+
+    moon run backend:ai-mock-e2e backend:oidc-mock backend:serve-e2e
+
+Each of a scenario's `users` signs in to the OIDC mock as its own user,
+then `iterations` times creates a thread and works through the scenario's
+`steps`, waiting `think_time_s` between them:
+
+- `{"message": "..."}` streams a run (`messages-tuple` mode, as the chat UI
+  does). Messages that `e2e_responses.json` answers with tool calls
+  (`change_phase`, `get_weather`) exercise the tools;
+- `{"phase": "..."}` switches phase through `POST /threads/{id}/state-sync`.
+
+Users start spread over `ramp_up_s`. Scenarios are defined in
+`load_scenarios.json` (or `--scenarios`) and picked with `--scenario`.
+
+Reported: thread creation, time to first token, run and phase switch
+latency, run throughput and the error rate. With `--server-pid` (the Aegra
+process; its child processes count too), also the server's CPU use (% of
+one core) and resident memory, sampled from /proc, so Linux only.
+
+Run from apps/backend:
+
+    uv run python -m benchmarks.bench_load --scenario smoke
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+from langgraph_sdk import get_client
+from langgraph_sdk.client import LangGraphClient
+
+from ._report import Measurement, build_report, emit_report, parser
+
+SCENARIOS = Path(__file__).with_name("load_scenarios.json")
+
+# Any client id and redirect URI will do: the OIDC mock doesn't require
+# clients to register.
+OIDC_CLIENT_ID = "load-test"
+OIDC_REDIRECT_URI = "http://localhost/callback"
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    users: int
+    iterations: int
+    steps: list[dict[str, str]]
+    ramp_up_s: float = 0.0
+    think_time_s: float = 0.0
+    description: str = ""
+
+
+def load_scenario(path: Path, name: str) -> Scenario:
+    scenarios = json.loads(path.read_text())["scenarios"]
+    if name not in scenarios:
+        raise ValueError(
+            f"Unknown scenario {name!r} in {path}. Must be one of: {sorted(scenarios)}"
+        )
+    scenario = Scenario(name=name, **scenarios[name])
+    for step in scenario.steps:
+        if len(step) != 1 or not step.keys() <= {"message", "phase"}:
+            raise ValueError(
+                f"Scenario {name!r}: each step must be either "
+                f'{{"message": ...}} or {{"phase": ...}}, got {step!r}'
+            )
+    if scenario.users < 1 or scenario.iterations < 1:
+        raise ValueError(f"Scenario {name!r}: users and iterations must be >= 1")
+    return scenario
+
+
+async def get_token(http: httpx.AsyncClient, issuer: str, subject: str) -> str:
+    """An ID token for `subject` from the OIDC mock, through the authorization
+    code flow without the browser: the mock issues a code for whichever
+    subject the form posts."""
+    authorize = await http.post(
+        f"{issuer}/oauth2/authorize",
+        params={
+            "client_id": OIDC_CLIENT_ID,
+            "redirect_uri": OIDC_REDIRECT_URI,
+            "response_type": "code",
+            "scope": "openid",
+        },
+        data={"sub": subject},
+    )
+    if authorize.status_code != 302:
+        raise RuntimeError(
+            f"OIDC mock at {issuer} didn't issue a code ({authorize.status_code})"
+        )
+    [code] = parse_qs(urlsplit(authorize.headers["location"]).query)["code"]
+    token = await http.post(
+        f"{issuer}/oauth2/token",
+        data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": OIDC_REDIRECT_URI,
+            "client_id": OIDC_CLIENT_ID,
+            "client_secret": "unused",
+        },
+    )
+    token.raise_for_status()
+    # The backend validates the ID token, as the frontend sends it.
+    return token.json()["id_token"]
+
+
+class Results:
+    """Everything the simulated users measured, in ms."""
+
+    def __init__(self) -> None:
+        self.create_thread: list[float] = []
+        self.ttft: list[float] = []
+        self.run: list[float] = []
+        self.phase_switch: list[float] = []
+        self.attempts = 0
+        self.errors: Counter[str] = Counter()
+
+    def error(self, kind: str) -> None:
+        self.errors[kind] += 1
+
+
+def _is_ai_text(part_data: Any) -> bool:
+    # `messages-tuple` events carry [message chunk, metadata].
+    if not isinstance(part_data, list) or not part_data:
+        return False
+    chunk = part_data[0]
+    return (
+        isinstance(chunk, dict)
+        and chunk.get("type") in ("ai", "AIMessageChunk")
+        and bool(chunk.get("content"))
+    )
+
+
+async def stream_run(client: LangGraphClient, thread_id: str, text: str) -> float:
+    """Stream a run of `text` on the thread; return ms to its first AI text
+    (or to the end if it had none)."""
+    start = time.perf_counter()
+    first_text: float | None = None
+    async for part in client.runs.stream(
+        thread_id,
+        "chat",
+        input={"messages": [{"type": "human", "content": text}]},
+        stream_mode="messages-tuple",
+    ):
+        if part.event == "error":
+            raise RuntimeError(f"run failed: {part.data}")
+        if first_text is None and part.event == "messages" and _is_ai_text(part.data):
+            first_text = time.perf_counter()
+    return ((first_text or time.perf_counter()) - start) * 1000
+
+
+async def simulate_user(
+    scenario: Scenario, url: str, token: str, delay: float, results: Results
+) -> None:
+    await asyncio.sleep(delay)
+    client = get_client(
+        url=url,
+        api_key=None,
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=300.0,
+    )
+    async with client:
+        for _ in range(scenario.iterations):
+            results.attempts += 1
+            start = time.perf_counter()
+            try:
+                thread = await client.threads.create()
+            except Exception as e:
+                results.error(f"create_thread:{type(e).__name__}")
+                continue
+            results.create_thread.append((time.perf_counter() - start) * 1000)
+
+            for step in scenario.steps:
+                await asyncio.sleep(scenario.think_time_s)
+                results.attempts += 1
+                start = time.perf_counter()
+                try:
+                    if "message" in step:
+                        ttft = await stream_run(
+                            client, thread["thread_id"], step["message"]
+                        )
+                        results.ttft.append(ttft)
+                        results.run.append((time.perf_counter() - start) * 1000)
+                    else:
+                        await client.http.post(
+                            f"/threads/{thread['thread_id']}/state-sync",
+                            json={"values": {"phase": step["phase"]}},
+                        )
+                        results.phase_switch.append(
+                            (time.perf_counter() - start) * 1000
+                        )
+                except Exception as e:
+                    results.error(f"{next(iter(step))}:{type(e).__name__}")
+
+
+class ProcessSampler:
+    """CPU (% of one core) and resident memory (MB) of a process and its
+    descendants, read from /proc every `interval` seconds."""
+
+    def __init__(self, pid: int, interval: float = 0.5) -> None:
+        if not Path(f"/proc/{pid}/stat").exists():
+            raise ValueError(f"No process {pid} in /proc (Linux only)")
+        self.pid = pid
+        self.interval = interval
+        self.cpu: list[float] = []
+        self.rss: list[float] = []
+        self._ticks = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+
+    def _pids(self, pid: int) -> list[int]:
+        pids = [pid]
+        for children in Path(f"/proc/{pid}/task").glob("*/children"):
+            for child in children.read_text().split():
+                pids += self._pids(int(child))
+        return pids
+
+    def _read(self) -> tuple[float, float]:
+        """Total CPU seconds and resident MB."""
+        cpu = rss = 0.0
+        for pid in self._pids(self.pid):
+            try:
+                # Fields after the parenthesized command name, which may
+                # contain spaces; utime and stime are the 12th and 13th.
+                stat = Path(f"/proc/{pid}/stat").read_text()
+                fields = stat.rsplit(")", 1)[1].split()
+                cpu += (int(fields[11]) + int(fields[12])) / self._ticks
+                pages = int(Path(f"/proc/{pid}/statm").read_text().split()[1])
+                rss += pages * self._page_size / 2**20
+            except (FileNotFoundError, ProcessLookupError):
+                continue  # exited since it was listed
+        return cpu, rss
+
+    async def run(self) -> None:
+        cpu, at = self._read()[0], time.perf_counter()
+        while True:
+            await asyncio.sleep(self.interval)
+            now_cpu, rss = self._read()
+            now = time.perf_counter()
+            self.cpu.append((now_cpu - cpu) / (now - at) * 100)
+            self.rss.append(rss)
+            cpu, at = now_cpu, now
+
+
+async def main() -> None:
+    # --iterations and --users override the scenario's.
+    p = parser("Load test of the running server with simulated users.", 0)
+    p.add_argument("--scenario", default="smoke")
+    p.add_argument("--scenarios", type=Path, default=SCENARIOS)
+    p.add_argument("--url", default="http://localhost:2026")
+    p.add_argument("--issuer", default="http://localhost:8080")
+    p.add_argument(
+        "--server-pid", type=int, help="Sample the server's CPU and memory (Linux)."
+    )
+    p.add_argument("--users", type=int)
+    args = p.parse_args()
+
+    scenario = load_scenario(args.scenarios, args.scenario)
+    if args.iterations:
+        scenario = replace(scenario, iterations=args.iterations)
+    users = args.users or scenario.users
+    sampler = ProcessSampler(args.server_pid) if args.server_pid else None
+
+    async with httpx.AsyncClient(timeout=30.0) as http:
+        tokens = await asyncio.gather(
+            *(get_token(http, args.issuer, f"load-user-{n}") for n in range(users))
+        )
+
+    results = Results()
+    sampling = asyncio.create_task(sampler.run()) if sampler else None
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            simulate_user(
+                scenario, args.url, token, n * scenario.ramp_up_s / users, results
+            )
+            for n, token in enumerate(tokens)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    if sampling:
+        sampling.cancel()
+
+    errors = sum(results.errors.values())
+    for kind, count in results.errors.most_common():
+        print(f"  error {kind}: {count}", file=sys.stderr)
+
+    measurements = [
+        Measurement("create_thread", "ms", results.create_thread),
+        Measurement("time_to_first_token", "ms", results.ttft),
+        Measurement("run", "ms", results.run),
+        Measurement("phase_switch", "ms", results.phase_switch),
+        Measurement("throughput", "runs/s", [len(results.run) / elapsed], "higher"),
+        Measurement("error_rate", "%", [errors / max(results.attempts, 1) * 100]),
+    ]
+    if sampler:
+        measurements += [
+            Measurement("server_cpu", "%", sampler.cpu),
+            Measurement("server_rss", "MB", sampler.rss),
+        ]
+
+    report = build_report(
+        "load",
+        [m for m in measurements if m.samples],
+        {
+            "scenario": scenario.name,
+            "users": users,
+            "iterations": scenario.iterations,
+            "steps": len(scenario.steps),
+            "ramp_up_s": scenario.ramp_up_s,
+            "think_time_s": scenario.think_time_s,
+            "duration_s": round(elapsed, 3),
+            "errors": dict(results.errors),
+        },
+    )
+    emit_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+"""Throughput of `slow_mock.py`, to show the mock isn't what a load test
+measures.
+
+Starts the mock with uvicorn in a subprocess (`MOCK_STREAM_DELAY` from
+`--delay-ms`) and streams `--concurrency` chat completions of `--chunks`
+chunks each at once, `--iterations` times. Every stream should take
+`(chunks + 1) * delay`; what it takes beyond that is overhead. (With a
+`--profile` other than `constant`, see `mock_profiles.py`, the streams are
+paced by that profile instead, and overheads only compare runs of the same
+profile.) While the overhead stays small and the mock's CPU use (% of one
+core, sampled from /proc, so Linux only) below 100%, the mock keeps up and
+any slowdown in a load test is the backend's.
+
+Reported: time to the first chunk and overhead per stream, chunks per
+second per round, and the mock's CPU use and resident memory.
+
+Run from apps/backend:
+
+    uv run python -m benchmarks.bench_slow_mock
+"""
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from ._report import Measurement, build_report, emit_report, parser
+from .bench_load import ProcessSampler
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_up(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def stream(port: int, chunks: int, profile: str) -> tuple[float, float, int]:
+    """Stream one completion; return ms to its first chunk, total ms, and
+    the number of chunks.
+
+    Plain HTTP/1.1 over asyncio streams rather than httpx: on a small
+    machine a full client spends more CPU per chunk than the mock does, and
+    would be the bottleneck instead.
+    """
+    # mockai echoes the last user message, one character per chunk.
+    body = json.dumps(
+        {
+            "model": "mock",
+            "stream": True,
+            "messages": [{"role": "user", "content": "x" * chunks}],
+        }
+    ).encode()
+    request = (
+        b"POST /openai/chat/completions HTTP/1.1\r\n"
+        b"Host: 127.0.0.1\r\n"
+        b"Content-Type: application/json\r\n"
+        b"X-Mock-Profile: %s\r\n"
+        b"Content-Length: %d\r\n"
+        b"Connection: close\r\n\r\n" % (profile.encode(), len(body))
+    ) + body
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(request)
+    first: float | None = None
+    received = 0
+    try:
+        status = await reader.readline()
+        if b" 200 " not in status:
+            raise RuntimeError(f"mock answered {status.decode().strip()!r}")
+        while line := await reader.readline():
+            if line.startswith(b"data: "):
+                first = first or time.perf_counter()
+                received += 1
+    finally:
+        writer.close()
+    end = time.perf_counter()
+    return ((first or end) - start) * 1000, (end - start) * 1000, received
+
+
+async def main() -> None:
+    p = parser("Concurrent streams served by slow_mock.", 3)
+    p.add_argument("--concurrency", type=int, default=1000)
+    p.add_argument("--chunks", type=int, default=20)
+    p.add_argument("--delay-ms", type=float, default=50.0)
+    p.add_argument("--profile", default="constant")
+    args = p.parse_args()
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "slow_mock:app", "--port", str(port)],
+        cwd=BACKEND,
+        env={**os.environ, "MOCK_STREAM_DELAY": str(args.delay_ms / 1000)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        await wait_until_up(port)
+        sampler = ProcessSampler(server.pid, interval=0.25)
+        sampling = asyncio.create_task(sampler.run())
+
+        ttfc = Measurement("first_chunk", "ms")
+        overhead = Measurement("stream_overhead", "ms")
+        rate = Measurement("chunks_per_second", "chunks/s", better="higher")
+        # A chunk per character plus [DONE], each followed by a delay.
+        ideal = (args.chunks + 1) * args.delay_ms
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *(
+                    stream(port, args.chunks, args.profile)
+                    for _ in range(args.concurrency)
+                )
+            )
+            elapsed = time.perf_counter() - start
+            for first, total, _ in results:
+                ttfc.samples.append(first)
+                overhead.samples.append(total - ideal)
+            rate.samples.append(sum(n for *_, n in results) / elapsed)
+        sampling.cancel()
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = build_report(
+        "slow_mock",
+        [
+            ttfc,
+            overhead,
+            rate,
+            Measurement("mock_cpu", "%", sampler.cpu),
+            Measurement("mock_rss", "MB", sampler.rss),
+        ],
+        {
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "chunks": args.chunks,
+            "delay_ms": args.delay_ms,
+            "profile": args.profile,
+        },
+    )
+    emit_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
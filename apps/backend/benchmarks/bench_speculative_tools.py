@@ -0,0 +1,99 @@
+"""Turn latency with and without speculative tool execution.
+
+The fake model streams a message with `--calls` `get_weather` tool calls
+followed by `--text-tokens` tokens of text, one chunk every `--interval-ms`;
+each tool takes `--tool-ms`. Without speculation every tool starts after the
+last chunk; with it each starts as soon as its own arguments are complete, so
+the tool latency overlaps the rest of the stream.
+
+Reported per mode: wall time of a full turn (tool-call message, tools, final
+answer).
+
+Run from apps/backend:
+
+    uv run python -m benchmarks.bench_speculative_tools
+"""
+
+import asyncio
+import os
+from itertools import cycle
+from unittest.mock import patch
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from svelte_langgraph.tool_cache import get_tool_cache
+from svelte_langgraph.tools import change_phase
+
+from ._fakes import PacedChatModel, fake_graph
+from ._report import Measurement, build_report, emit_report, parser, time_async
+
+
+async def main() -> None:
+    p = parser("Turn latency vs. speculative tool execution.", 20)
+    p.add_argument("--calls", type=int, default=3)
+    p.add_argument("--text-tokens", type=int, default=10)
+    p.add_argument("--interval-ms", type=float, default=10.0)
+    p.add_argument("--tool-ms", type=float, default=100.0)
+    args = p.parse_args()
+
+    async def get_weather(city: str) -> str:
+        """Get weather for a given city."""
+        await asyncio.sleep(args.tool_ms / 1000)
+        return f"It's always sunny in {city}!"
+
+    tool_calls = AIMessage(
+        " ".join(["Checking."] * args.text_tokens),
+        tool_calls=[
+            {"name": "get_weather", "args": {"city": f"City {n}"}, "id": f"call_{n}"}
+            for n in range(args.calls)
+        ],
+    )
+    answer = AIMessage("It's sunny everywhere.")
+
+    measurements = []
+    for speculative in (False, True):
+        model = PacedChatModel(
+            messages=cycle([tool_calls, answer]), interval=args.interval_ms / 1000
+        )
+        env = {"TOOL_SPECULATIVE_EXECUTION": "1" if speculative else ""}
+        with patch.dict(os.environ, env):
+            graph = fake_graph(model, [get_weather, change_phase])
+
+        async def turn() -> None:
+            # get_weather's results are cached; every turn must pay for them.
+            get_tool_cache().clear()
+            config = RunnableConfig(configurable={"thread_id": str(uuid4())})
+            async for _ in graph.astream(
+                {"messages": [HumanMessage("Weather?")]},
+                config,
+                stream_mode="messages",
+            ):
+                pass
+
+        label = "on" if speculative else "off"
+        measurements.append(
+            Measurement(
+                f"turn[speculative={label}]",
+                "ms",
+                await time_async(turn, args.iterations),
+            )
+        )
+
+    report = build_report(
+        "speculative_tools",
+        measurements,
+        {
+            "iterations": args.iterations,
+            "calls": args.calls,
+            "text_tokens": args.text_tokens,
+            "interval_ms": args.interval_ms,
+            "tool_ms": args.tool_ms,
+        },
+    )
+    emit_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""Latency of a phase change: `state_only_submit` run vs. direct state update.
+
+The run path is what the frontend's `stateSync` triggers today: a full graph
+invocation that executes `phase_gate` and jumps to end. The direct path is
+`apply_state_update`, which writes through the same reducers with
+`aupdate_state`. Both run against the production graph with an in-memory
+checkpointer and a fake model (neither path calls it), on a thread that
+already holds `--history` chat turns. Server-side costs the run path also
+pays under Aegra -- run queueing, run bookkeeping in Postgres, SSE setup --
+are not included, so this is a lower bound on the difference.
+
+Run from apps/backend:
+
+    uv run python -m benchmarks.bench_state_update
+"""
+
+import asyncio
+from itertools import cycle
+from uuid import uuid4
+
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from svelte_langgraph.phase import VALID_PHASES
+from svelte_langgraph.state_update import apply_state_update
+
+from ._fakes import fake_graph, fake_model
+from ._report import Measurement, build_report, emit_report, parser, time_async
+
+
+async def main() -> None:
+    p = parser("Phase change latency: state_only_submit run vs. state update.")
+    p.add_argument("--history", type=int, default=10, help="Prior chat turns.")
+    args = p.parse_args()
+
+    graph = fake_graph(fake_model())
+    phases = cycle(sorted(VALID_PHASES))
+
+    async def thread() -> str:
+        thread_id = str(uuid4())
+        config = RunnableConfig(configurable={"thread_id": thread_id})
+        for n in range(args.history):
+            await graph.ainvoke({"messages": [HumanMessage(f"turn {n}")]}, config)
+        return thread_id
+
+    run_config = RunnableConfig(
+        configurable={"thread_id": await thread(), "state_only_submit": True}
+    )
+    update_config = RunnableConfig(configurable={"thread_id": await thread()})
+
+    async def via_run() -> None:
+        await graph.ainvoke({"phase": next(phases)}, run_config)
+
+    async def via_update() -> None:
+        await apply_state_update(graph, update_config, {"phase": next(phases)})
+
+    measurements = [
+        Measurement(
+            "state_only_submit_run", "ms", await time_async(via_run, args.iterations)
+        ),
+        Measurement(
+            "apply_state_update", "ms", await time_async(via_update, args.iterations)
+        ),
+    ]
+    report = build_report(
+        "state_update",
+        measurements,
+        {"iterations": args.iterations, "history": args.history},
+    )
+    emit_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""SSE event count and CPU per response, with and without chunk coalescing.
+
+Streams one `--tokens`-token answer per iteration through the production
+graph with `stream_mode="messages"`, serializing every event to JSON the way
+a server would before writing it to the socket. The fake model emits a token
+every `--interval-ms`, so time-based flushing is exercised as it would be
+against a fast provider.
+
+Reported per window: events per response, CPU ms per response (process time,
+so the paced sleeps don't count) and time to first token.
+
+Run from apps/backend:
+
+    uv run python -m benchmarks.bench_stream_coalescing
+"""
+
+import asyncio
+import json
+import time
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from svelte_langgraph.streaming import CoalescingChatModel
+
+from ._fakes import PacedChatModel, fake_graph
+from ._report import Measurement, build_report, emit_report, parser
+
+
+async def stream_once(graph, tokens_expected: str) -> tuple[int, float, float]:
+    """Return (events, cpu_ms, ttft_ms) for one streamed response."""
+    config = RunnableConfig(configurable={"thread_id": str(uuid4())})
+    events = 0
+    ttft_ms = 0.0
+    text = ""
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    async for message, metadata in graph.astream(
+        {"messages": [HumanMessage("hi")]}, config, stream_mode="messages"
+    ):
+        if not events:
+            ttft_ms = (time.perf_counter() - wall_start) * 1000
+        events += 1
+        text += message.text
+        json.dumps([message.model_dump(), metadata], default=str)
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+    assert text == tokens_expected, "coalescing must not change the streamed text"
+    return events, cpu_ms, ttft_ms
+
+
+async def main() -> None:
+    p = parser("SSE events and CPU per response vs. coalescing window.", 20)
+    p.add_argument("--tokens", type=int, default=300)
+    p.add_argument("--interval-ms", type=float, default=2.0)
+    p.add_argument("--windows-ms", type=float, nargs="+", default=[0.0, 20.0, 50.0])
+    args = p.parse_args()
+
+    answer = " ".join(f"tok{n}" for n in range(args.tokens))
+    measurements = []
+    for window_ms in args.windows_ms:
+        inner = PacedChatModel(
+            messages=iter([AIMessage(answer)] * args.iterations),
+            interval=args.interval_ms / 1000,
+        )
+        model = (
+            CoalescingChatModel(inner=inner, window=window_ms / 1000)
+            if window_ms > 0
+            else inner
+        )
+        graph = fake_graph(model)  # type: ignore[arg-type]
+
+        events = Measurement(f"events[window={window_ms:g}ms]", "events")
+        cpu = Measurement(f"cpu_per_response[window={window_ms:g}ms]", "ms")
+        ttft = Measurement(f"ttft[window={window_ms:g}ms]", "ms")
+        for _ in range(args.iterations):
+            n, cpu_ms, ttft_ms = await stream_once(graph, answer)
+            events.samples.append(n)
+            cpu.samples.append(cpu_ms)
+            ttft.samples.append(ttft_ms)
+        measurements += [events, cpu, ttft]
+
+    report = build_report(
+        "stream_coalescing",
+        measurements,
+        {
+            "iterations": args.iterations,
+            "tokens": args.tokens,
+            "interval_ms": args.interval_ms,
+            "windows_ms": args.windows_ms,
+        },
+    )
+    emit_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""Cost of tool setup: once at startup vs. on every run.
+
+Startup: building the tool objects and serializing their schemas for every
+phase from scratch (`prepare_tool_schemas` on empty caches), as a server
+does once. Per run: building the graph, as Aegra does for every run, with
+the plain tool functions `create_agent` has to convert (`functions`) vs. the
+prebuilt tools (`prebuilt`); and binding one model call's tools by
+serializing every tool (`serialize_per_call`) vs. the cached phase schemas
+(`cached_schemas`). Finally a whole run on a fake model, graph build
+included, with each kind of tools.
+
+Run from apps/backend:
+
+    uv run python -m benchmarks.bench_tool_setup
+"""
+
+import asyncio
+import time
+from collections.abc import Callable, Sequence
+from uuid import uuid4
+
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from svelte_langgraph import phase_tools, tools
+from svelte_langgraph.phase_tools import phase_tool_schemas, prepare_tool_schemas
+from svelte_langgraph.tools import TOOL_FUNCTIONS, get_tool_policies, get_tools
+
+from ._fakes import fake_graph, fake_model
+from ._report import Measurement, build_report, emit_report, parser, time_async
+
+
+def time_sync(fn: Callable[[], object], iterations: int) -> list[float]:
+    """Call `fn` `iterations` times; return per-call wall ms."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def cold_prepare() -> None:
+    tools._tools = None
+    phase_tools.clear_tool_schema_cache()
+    prepare_tool_schemas()
+
+
+async def main() -> None:
+    p = parser("Tool setup cost at startup vs. per run.", iterations=100)
+    args = p.parse_args()
+
+    startup = time_sync(cold_prepare, args.iterations)
+    model = fake_model()
+    prebuilt, policies = get_tools(), get_tool_policies()
+
+    def serialize_per_call() -> None:
+        [convert_to_openai_tool(tool) for tool in prebuilt]
+
+    def cached_schemas() -> None:
+        phase_tool_schemas("research", prebuilt, policies)
+
+    async def run(tool_set: Sequence[BaseTool | Callable]) -> None:
+        graph = fake_graph(model, tool_set)
+        config = RunnableConfig(configurable={"thread_id": str(uuid4())})
+        await graph.ainvoke({"messages": [HumanMessage("Hi")]}, config)
+
+    measurements = [
+        Measurement("startup_prepare_tools", "ms", startup),
+        Measurement(
+            "make_graph_functions",
+            "ms",
+            time_sync(lambda: fake_graph(model, TOOL_FUNCTIONS), args.iterations),
+        ),
+        Measurement(
+            "make_graph_prebuilt",
+            "ms",
+            time_sync(lambda: fake_graph(model, prebuilt), args.iterations),
+        ),
+        Measurement(
+            "bind_serialize_per_call",
+            "ms",
+            time_sync(serialize_per_call, args.iterations),
+        ),
+        Measurement(
+            "bind_cached_schemas", "ms", time_sync(cached_schemas, args.iterations)
+        ),
+        Measurement(
+            "run_functions",
+            "ms",
+            await time_async(lambda: run(TOOL_FUNCTIONS), args.iterations),
+        ),
+        Measurement(
+            "run_prebuilt",
+            "ms",
+            await time_async(lambda: run(prebuilt), args.iterations),
+        ),
+    ]
+    report = build_report("tool_setup", measurements, {"iterations": args.iterations})
+    emit_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""Weather lookups with and without micro-batching.
+
+`--users` concurrent turns each look up `--cities` cities in parallel, the
+way `ToolNode` runs a message's parallel `get_weather` calls. The fake
+provider takes `--latency-ms` per request however many cities it covers, and
+serves at most `--provider-concurrency` requests at a time, like an upstream
+API with a connection or rate limit.
+
+Reported per mode: wall time of one round and provider requests per round.
+
+Run from apps/backend:
+
+    uv run python -m benchmarks.bench_weather_batching
+"""
+
+import asyncio
+from collections.abc import Mapping, Sequence
+
+from svelte_langgraph.weather import FakeWeatherProvider, WeatherBatcher
+
+from ._report import Measurement, build_report, emit_report, parser, time_async
+
+
+class LimitedProvider(FakeWeatherProvider):
+    """`FakeWeatherProvider` serving at most `concurrency` requests at once."""
+
+    def __init__(self, latency: float, concurrency: int) -> None:
+        super().__init__(latency)
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def lookup(self, cities: Sequence[str]) -> Mapping[str, str]:
+        async with self._slots:
+            return await super().lookup(cities)
+
+
+async def main() -> None:
+    p = parser("Weather lookups vs. micro-batching.", 20)
+    p.add_argument("--users", type=int, default=10)
+    p.add_argument("--cities", type=int, default=4)
+    p.add_argument("--latency-ms", type=float, default=50.0)
+    p.add_argument("--provider-concurrency", type=int, default=4)
+    p.add_argument("--window-ms", type=float, default=10.0)
+    args = p.parse_args()
+
+    cities = [
+        [f"City {user}-{n}" for n in range(args.cities)] for user in range(args.users)
+    ]
+    measurements = []
+    for window_ms in (0.0, args.window_ms):
+        provider = LimitedProvider(args.latency_ms / 1000, args.provider_concurrency)
+        batcher = WeatherBatcher(provider, window=window_ms / 1000)
+
+        async def round_() -> None:
+            await asyncio.gather(
+                *(batcher.lookup(city) for user in cities for city in user)
+            )
+
+        label = f"window={window_ms:g}ms"
+        wall = Measurement(f"round[{label}]", "ms")
+        wall.samples = await time_async(round_, args.iterations, warmup=0)
+        requests = Measurement(f"requests_per_round[{label}]", "requests")
+        requests.samples = [provider.requests / args.iterations] * args.iterations
+        measurements += [wall, requests]
+
+    report = build_report(
+        "weather_batching",
+        measurements,
+        {
+            "iterations": args.iterations,
+            "users": args.users,
+            "cities": args.cities,
+            "latency_ms": args.latency_ms,
+            "provider_concurrency": args.provider_concurrency,
+            "window_ms": args.window_ms,
+        },
+    )
+    emit_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
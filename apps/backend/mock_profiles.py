@@ -0,0 +1,304 @@
+"""Latency profiles for `slow_mock.py`: how fast, how steadily and how
+reliably the mock model answers.
+
+A profile has:
+
+- ``ttft_ms``: the wait before the first chunk of a streamed response (or
+  before a whole non-streamed one);
+- ``token_ms``: the wait after each chunk;
+- ``stall_probability`` and ``stall_ms``: the chance that a chunk is followed
+  by a stall as well, and how long it lasts;
+- ``error_rate``, ``error_statuses`` and ``retry_after_s``: the chance that a
+  request is refused outright, with one of the statuses (default 429, 500
+  and 503, picked at random) and a ``Retry-After`` header, as a rate-limited
+  or overloaded provider does;
+- ``models``: the model names that get the profile by default.
+
+Waits are distributions in milliseconds: ``{"dist": "constant", "value":
+10}``, ``{"dist": "uniform", "low": 5, "high": 20}``, ``{"dist": "normal",
+"mean": 25, "stdev": 5}``, ``{"dist": "lognormal", "median": 400, "sigma":
+0.5}`` or ``{"dist": "exponential", "mean": 30}``, or a plain number for a
+constant. Negative draws count as zero.
+
+A request gets the profile named by its ``X-Mock-Profile`` header, else the
+first profile whose ``models`` has its model, else ``MOCK_PROFILE``. The
+built-in ``constant`` profile, the default, waits ``MOCK_STREAM_DELAY``
+after each chunk and nothing else, as the mock did before profiles; see
+``BUILTIN_PROFILES`` for the others. ``MOCK_PROFILES`` names a JSON file of
+``{"<name>": {<profile>}}`` that adds profiles or replaces built-in ones, and
+``MOCK_SEED`` seeds the random draws for repeatable runs.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+from collections.abc import AsyncIterator, Iterable, Mapping
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_HEADER = b"x-mock-profile"
+
+# Parameter names of each distribution, in the order `sample` takes them.
+DISTRIBUTIONS: dict[str, tuple[str, ...]] = {
+    "constant": ("value",),
+    "uniform": ("low", "high"),
+    "normal": ("mean", "stdev"),
+    "lognormal": ("median", "sigma"),
+    "exponential": ("mean",),
+}
+
+rng = random.Random(os.getenv("MOCK_SEED"))
+
+
+@dataclass(frozen=True)
+class Distribution:
+    kind: str = "constant"
+    params: tuple[float, ...] = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: Any) -> "Distribution":
+        if isinstance(spec, int | float):
+            return cls("constant", (float(spec),))
+        if not isinstance(spec, Mapping) or spec.get("dist") not in DISTRIBUTIONS:
+            raise ValueError(
+                f"Invalid distribution {spec!r}: must be a number or an object "
+                f'with "dist" one of {list(DISTRIBUTIONS)}'
+            )
+        names = DISTRIBUTIONS[spec["dist"]]
+        if set(spec) != {"dist", *names}:
+            raise ValueError(f"Distribution {spec['dist']!r} takes {list(names)}")
+        params = tuple(float(spec[name]) for name in names)
+        if spec["dist"] in ("lognormal", "exponential") and params[0] <= 0:
+            raise ValueError(f"Distribution {spec!r}: {names[0]} must be > 0")
+        return cls(spec["dist"], params)
+
+    def sample(self) -> float:
+        """A draw, in seconds."""
+        match self.kind, self.params:
+            case "uniform", (low, high):
+                ms = rng.uniform(low, high)
+            case "normal", (mean, stdev):
+                ms = rng.gauss(mean, stdev)
+            case "lognormal", (median, sigma):
+                ms = rng.lognormvariate(math.log(median), sigma)
+            case "exponential", (mean,):
+                ms = rng.expovariate(1 / mean)
+            case _, (value,):
+                ms = value
+            case _:
+                raise AssertionError(self)
+        return max(ms, 0.0) / 1000
+
+
+ZERO = Distribution()
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    ttft_ms: Distribution = ZERO
+    token_ms: Distribution = ZERO
+    stall_probability: float = 0.0
+    stall_ms: Distribution = ZERO
+    error_rate: float = 0.0
+    error_statuses: tuple[int, ...] = (429, 500, 503)
+    retry_after_s: float = 1.0
+    models: tuple[str, ...] = ()
+
+    @classmethod
+    def parse(cls, name: str, spec: Mapping[str, Any]) -> "Profile":
+        known = {f.name for f in fields(cls)} - {"name"}
+        if unknown := set(spec) - known:
+            raise ValueError(
+                f"Profile {name!r}: unknown fields {sorted(unknown)}; "
+                f"must be among {sorted(known)}"
+            )
+        values: dict[str, Any] = {}
+        for key, value in spec.items():
+            if key.endswith("_ms"):
+                values[key] = Distribution.parse(value)
+            elif key in ("error_statuses", "models"):
+                values[key] = tuple(value)
+            else:
+                values[key] = float(value)
+        profile = cls(name, **values)
+        for key in ("stall_probability", "error_rate"):
+            if not 0 <= getattr(profile, key) <= 1:
+                raise ValueError(f"Profile {name!r}: {key} must be in [0, 1]")
+        return profile
+
+    def next_wait(self) -> float:
+        """Seconds to wait after a chunk, stalls included."""
+        wait = self.token_ms.sample()
+        if self.stall_probability and rng.random() < self.stall_probability:
+            wait += self.stall_ms.sample()
+        return wait
+
+
+# In ms, as in a profile file. `constant` is added by `load_profiles`.
+BUILTIN_PROFILES: dict[str, dict[str, Any]] = {
+    "fast": {
+        "ttft_ms": {"dist": "lognormal", "median": 200, "sigma": 0.3},
+        "token_ms": {"dist": "normal", "mean": 10, "stdev": 3},
+    },
+    "typical": {
+        "ttft_ms": {"dist": "lognormal", "median": 600, "sigma": 0.5},
+        "token_ms": {"dist": "lognormal", "median": 25, "sigma": 0.4},
+        "stall_probability": 0.002,
+        "stall_ms": {"dist": "uniform", "low": 500, "high": 2000},
+    },
+    "slow": {
+        "ttft_ms": {"dist": "lognormal", "median": 2000, "sigma": 0.6},
+        "token_ms": {"dist": "lognormal", "median": 60, "sigma": 0.5},
+        "stall_probability": 0.01,
+        "stall_ms": {"dist": "uniform", "low": 1000, "high": 5000},
+    },
+    "flaky": {
+        "ttft_ms": {"dist": "lognormal", "median": 600, "sigma": 0.5},
+        "token_ms": {"dist": "lognormal", "median": 25, "sigma": 0.4},
+        "error_rate": 0.1,
+        "retry_after_s": 1,
+    },
+}
+
+
+def load_profiles(stream_delay: float) -> dict[str, Profile]:
+    """The built-in profiles (`constant` waiting `stream_delay` seconds per
+    chunk), and those of the `MOCK_PROFILES` file."""
+    specs: dict[str, Any] = {
+        "constant": {"token_ms": stream_delay * 1000},
+        **BUILTIN_PROFILES,
+    }
+    if path := os.getenv("MOCK_PROFILES", "").strip():
+        specs.update(json.loads(Path(path).read_text()))
+    return {name: Profile.parse(name, spec) for name, spec in specs.items()}
+
+
+def default_profile(profiles: Mapping[str, Profile]) -> Profile:
+    name = os.getenv("MOCK_PROFILE", "").strip() or "constant"
+    if name not in profiles:
+        raise ValueError(
+            f"Unknown MOCK_PROFILE {name!r}. Must be one of: {sorted(profiles)}"
+        )
+    return profiles[name]
+
+
+# The profile of the request being served, set by `LatencyProfileMiddleware`.
+current_profile: ContextVar[Profile | None] = ContextVar(
+    "current_profile", default=None
+)
+
+
+async def paced(chunks: Iterable[str], profile: Profile) -> AsyncIterator[str]:
+    """Yield `chunks` with the profile's waits before the first and after
+    each one.
+
+    Waits are kept against a schedule from the start of the stream, so a
+    busy event loop doesn't add its lag to every one of them.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + profile.ttft_ms.sample()
+    for chunk in chunks:
+        # Non-positive when behind schedule: yields to the loop, no wait.
+        await asyncio.sleep(deadline - loop.time())
+        yield chunk
+        deadline += profile.next_wait()
+    await asyncio.sleep(deadline - loop.time())
+
+
+class LatencyProfileMiddleware:
+    """Pick each request's profile (see the module docstring), fail it as
+    the profile's `error_rate` says, and otherwise serve it under the
+    profile: non-streamed responses after its TTFT, streamed ones through
+    `paced`."""
+
+    def __init__(
+        self, app: ASGIApp, profiles: Mapping[str, Profile], default: Profile
+    ) -> None:
+        self.app = app
+        self.profiles = profiles
+        self.default = default
+
+    def select(self, header: bytes | None, model: object) -> Profile:
+        if header is not None:
+            # KeyError for an unknown profile: a mistake in the test setup.
+            return self.profiles[header.decode()]
+        for profile in self.profiles.values():
+            if model in profile.models:
+                return profile
+        return self.default
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        # The model is in the body: read it all, then replay it to the app.
+        buffered: list[Message] = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            buffered.append(message)
+            more_body = message.get("more_body", False)
+        try:
+            body = json.loads(b"".join(m.get("body", b"") for m in buffered))
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            body = {}
+
+        try:
+            profile = self.select(
+                dict(scope["headers"]).get(PROFILE_HEADER), body.get("model")
+            )
+        except KeyError as e:
+            response = JSONResponse(
+                {"error": {"message": f"Unknown mock profile {e}", "code": 400}},
+                status_code=400,
+            )
+            await response(scope, receive, send)
+            return
+
+        if profile.error_rate and rng.random() < profile.error_rate:
+            await self._refuse(profile, scope, receive, send)
+            return
+
+        async def replay() -> Message:
+            return buffered.pop(0) if buffered else await receive()
+
+        if not body.get("stream"):
+            await asyncio.sleep(profile.ttft_ms.sample())
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, replay, send)
+        finally:
+            current_profile.reset(token)
+
+    async def _refuse(
+        self, profile: Profile, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        status = rng.choice(profile.error_statuses)
+        kind = "rate_limit_error" if status == 429 else "server_error"
+        response = JSONResponse(
+            {
+                "error": {
+                    "message": f"Injected by mock profile {profile.name!r}",
+                    "type": kind,
+                    "code": status,
+                }
+            },
+            status_code=status,
+            headers={
+                # Whole seconds per RFC 9110; OpenAI clients prefer the ms.
+                "retry-after": str(math.ceil(profile.retry_after_s)),
+                "retry-after-ms": str(round(profile.retry_after_s * 1000)),
+            },
+        )
+        await response(scope, receive, send)
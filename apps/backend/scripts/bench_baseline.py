@@ -0,0 +1,298 @@
+"""Store benchmark reports as baselines and compare new runs against them.
+
+Benchmark reports (the JSON the `benchmarks/` modules write with
+`--output`) are saved per commit, with the machine they ran on:
+
+    uv run python scripts/bench_baseline.py save report.json [...]
+    uv run python scripts/bench_baseline.py list
+    uv run python scripts/bench_baseline.py compare report.json [...] --baseline main
+
+`save` stores each report as `<store>/<commit>/<benchmark>.json` (default
+store `.benchmarks/`, commit `HEAD`; a dirty work tree is recorded as such).
+`compare` matches each report's results by name against the baseline's
+report of the same benchmark, where `--baseline` is a stored commit (or a
+prefix of one), a git ref, or `latest`, the most recently saved baseline.
+
+A result regressed when its median moved in the worse direction (up for
+"lower is better", e.g. latency or memory; down for "higher is better",
+e.g. throughput) by more than `--threshold` (default 10%) of the baseline,
+and by more than `--sigmas` (default 2) standard errors of the difference,
+so noisy results need a larger change. `compare` prints a table of every
+result and exits with status 1 if any regressed.
+
+Results only compare on the same machine: `compare` warns when the
+baseline's machine differs.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+BACKEND = Path(__file__).resolve().parents[1]
+DEFAULT_STORE = BACKEND / ".benchmarks"
+
+
+def git(*args: str) -> str:
+    result = subprocess.run(
+        ["git", *args], cwd=BACKEND, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+def machine() -> dict[str, Any]:
+    """What the results depend on besides the code."""
+    info: dict[str, Any] = {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+    try:
+        for line in Path("/proc/cpuinfo").read_text().splitlines():
+            if line.startswith("model name"):
+                info["cpu_model"] = line.split(":", 1)[1].strip()
+                break
+    except OSError:
+        pass
+    return info
+
+
+# What must match for results to be comparable.
+MACHINE_KEYS = ("hostname", "machine", "cpu_count", "cpu_model", "python")
+
+
+def save(store: Path, reports: list[Path], commit: str | None) -> None:
+    sha = git("rev-parse", commit or "HEAD")
+    meta = {
+        "commit": sha,
+        "dirty": commit is None and bool(git("status", "--porcelain")),
+        "saved_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "machine": machine(),
+    }
+    directory = store / sha
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in reports:
+        report = json.loads(path.read_text())
+        target = directory / f"{report['benchmark']}.json"
+        target.write_text(json.dumps({"meta": meta, "report": report}, indent=2))
+        print(f"bench_baseline: saved {report['benchmark']} as {target}")
+
+
+def baselines(store: Path) -> list[Path]:
+    """Stored commits, most recently saved last."""
+    if not store.is_dir():
+        return []
+    saved = [d for d in store.iterdir() if d.is_dir() and any(d.glob("*.json"))]
+    return sorted(saved, key=lambda d: max(f.stat().st_mtime for f in d.glob("*.json")))
+
+
+def list_baselines(store: Path) -> None:
+    for directory in baselines(store):
+        for path in sorted(directory.glob("*.json")):
+            meta = json.loads(path.read_text())["meta"]
+            dirty = " (dirty)" if meta["dirty"] else ""
+            print(
+                f"{meta['commit'][:12]}{dirty}  {meta['saved_at']}  "
+                f"{meta['machine']['hostname']}  {path.stem}"
+            )
+
+
+def find_baseline(store: Path, name: str) -> Path:
+    saved = baselines(store)
+    if not saved:
+        sys.exit(f"bench_baseline: no baselines in {store}; `save` some first.")
+    if name == "latest":
+        return saved[-1]
+    matches = [d for d in saved if d.name.startswith(name)]
+    if not matches:
+        try:
+            sha = git("rev-parse", "--verify", "--quiet", f"{name}^{{commit}}")
+        except subprocess.CalledProcessError:
+            sha = ""
+        matches = [d for d in saved if d.name == sha]
+    if len(matches) != 1:
+        found = "several" if matches else "no"
+        sys.exit(f"bench_baseline: {found} stored baselines match {name!r}.")
+    return matches[0]
+
+
+@dataclass
+class Comparison:
+    benchmark: str
+    name: str
+    unit: str
+    baseline: float | None
+    current: float | None
+    change: float | None  # relative, positive = worse
+    status: str  # ok, regressed, improved, new or missing
+
+
+def standard_error(result: dict[str, Any]) -> float:
+    return result["stdev"] / math.sqrt(result["n"]) if result["n"] else 0.0
+
+
+def compare_result(
+    base: dict[str, Any], current: dict[str, Any], threshold: float, sigmas: float
+) -> tuple[float, str]:
+    """Relative change (positive = worse) and status of one result."""
+    worse_sign = 1 if current["better"] == "lower" else -1
+    delta = (current["p50"] - base["p50"]) * worse_sign
+    if base["p50"]:
+        change = delta / abs(base["p50"])
+    else:
+        change = math.copysign(math.inf, delta) if delta else 0.0
+    noise = sigmas * math.hypot(standard_error(base), standard_error(current))
+    if abs(change) <= threshold or abs(delta) <= noise:
+        return change, "ok"
+    return change, "regressed" if change > 0 else "improved"
+
+
+def compare_report(
+    benchmark: str,
+    base: dict[str, Any] | None,
+    current: dict[str, Any],
+    threshold: float,
+    sigmas: float,
+) -> list[Comparison]:
+    base_results = {r["name"]: r for r in base["results"]} if base else {}
+    rows = []
+    for result in current["results"]:
+        name = result["name"]
+        if name not in base_results:
+            rows.append(
+                Comparison(
+                    benchmark, name, result["unit"], None, result["p50"], None, "new"
+                )
+            )
+            continue
+        before = base_results.pop(name)
+        change, status = compare_result(before, result, threshold, sigmas)
+        rows.append(
+            Comparison(
+                benchmark,
+                name,
+                result["unit"],
+                before["p50"],
+                result["p50"],
+                change,
+                status,
+            )
+        )
+    for name, before in base_results.items():
+        rows.append(
+            Comparison(
+                benchmark, name, before["unit"], before["p50"], None, None, "missing"
+            )
+        )
+    return rows
+
+
+def print_table(rows: list[Comparison]) -> None:
+    def number(value: float | None) -> str:
+        return "-" if value is None else f"{value:.3f}"
+
+    def percent(value: float | None) -> str:
+        if value is None:
+            return "-"
+        return f"{value:+.1%}" if math.isfinite(value) else f"{value:+}"
+
+    table = [("benchmark", "result", "unit", "baseline", "current", "worse by", "")]
+    table += [
+        (
+            r.benchmark,
+            r.name,
+            r.unit,
+            number(r.baseline),
+            number(r.current),
+            percent(r.change),
+            r.status.upper() if r.status == "regressed" else r.status,
+        )
+        for r in rows
+    ]
+    widths = [max(len(row[i]) for row in table) for i in range(len(table[0]))]
+    for row in table:
+        cells = [
+            cell.rjust(width) if 3 <= i <= 5 else cell.ljust(width)
+            for i, (cell, width) in enumerate(zip(row, widths))
+        ]
+        print("  ".join(cells).rstrip())
+
+
+def compare(
+    store: Path, reports: list[Path], baseline: str, threshold: float, sigmas: float
+) -> bool:
+    """Print the comparison; whether nothing regressed."""
+    directory = find_baseline(store, baseline)
+    rows: list[Comparison] = []
+    for path in reports:
+        report = json.loads(path.read_text())
+        stored = directory / f"{report['benchmark']}.json"
+        base = None
+        if stored.exists():
+            saved = json.loads(stored.read_text())
+            base = saved["report"]
+            if base["params"] != report["params"]:
+                print(
+                    f"bench_baseline: warning: {report['benchmark']} ran with "
+                    f"different parameters than the baseline.",
+                    file=sys.stderr,
+                )
+            here, there = machine(), saved["meta"]["machine"]
+            differs = [k for k in MACHINE_KEYS if here.get(k) != there.get(k)]
+            if differs:
+                print(
+                    f"bench_baseline: warning: baseline for {report['benchmark']} "
+                    f"ran on a different machine ({', '.join(differs)} differ).",
+                    file=sys.stderr,
+                )
+        rows += compare_report(report["benchmark"], base, report, threshold, sigmas)
+
+    print(f"Baseline {directory.name[:12]}, threshold {threshold:.0%}, {sigmas:g}σ")
+    print_table(rows)
+    regressed = [r for r in rows if r.status == "regressed"]
+    if regressed:
+        print(f"\n{len(regressed)} result(s) regressed.")
+    return not regressed
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(
+        description="Store benchmark baselines and compare runs against them."
+    )
+    p.add_argument("--store", type=Path, default=DEFAULT_STORE)
+    commands = p.add_subparsers(dest="command", required=True)
+
+    save_p = commands.add_parser("save", help="Store reports as the commit's baseline.")
+    save_p.add_argument("reports", type=Path, nargs="+")
+    save_p.add_argument("--commit", help="Commit the reports are for (default HEAD).")
+
+    commands.add_parser("list", help="List stored baselines.")
+
+    compare_p = commands.add_parser("compare", help="Compare reports to a baseline.")
+    compare_p.add_argument("reports", type=Path, nargs="+")
+    compare_p.add_argument("--baseline", default="latest")
+    compare_p.add_argument("--threshold", type=float, default=0.10)
+    compare_p.add_argument("--sigmas", type=float, default=2.0)
+
+    args = p.parse_args()
+    if args.command == "save":
+        save(args.store, args.reports, args.commit)
+    elif args.command == "list":
+        list_baselines(args.store)
+    elif not compare(
+        args.store, args.reports, args.baseline, args.threshold, args.sigmas
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
 """ai-mock wrapper with slow streaming and spec-correct tool-call chunks for E2E.
 
-Monkey-patches mockai's sync streaming generator to:
+Monkey-patches mockai's sync streaming generator, replacing it with an async
+one, to:
 
 1. Add a small delay between yielded SSE chunks, so useStream has a wide enough
    window for the stop button to be clickable and for server-side cancellation
-   to interrupt a still-running LangGraph node.
+   to interrupt a still-running LangGraph node. The delay is an
+   ``asyncio.sleep``: Starlette iterates a *sync* generator in its threadpool
+   (40 threads by default), so a ``time.sleep``-paced one held a thread per
+   stream and capped the mock at 40 concurrent streams. Async, a stream costs
+   no more than a timer between chunks, and thousands can run at once (see
+   ``benchmarks/bench_slow_mock.py``). How long it waits, before the first
+   chunk and after each, is up to the request's latency profile (see
+   ``mock_profiles.py``), which may also fail the request with a 429 or 5xx;
+   by default it waits ``MOCK_STREAM_DELAY`` after each chunk.
 
 2. Emit OpenAI-conformant streamed tool calls. Stock mockai repeats the tool
    call's ``id``/``name`` in every delta and omits the required ``index``
@@ -30,20 +39,35 @@ Usage (via moon backend:ai-mock-e2e):
 
 Environment:
     MOCK_STREAM_DELAY  Seconds between SSE chunks (default: 0.01 = 10ms)
+    MOCK_PROFILE       Latency profile of requests that don't pick one
+                       (default: constant, i.e. MOCK_STREAM_DELAY)
+    MOCK_PROFILES      JSON file of additional latency profiles
+    MOCK_SEED          Seed for the profiles' random draws
 """
 
 import json
 import os
 import time
+from collections.abc import AsyncIterator
 from typing import Any
 from uuid import uuid4
 
 import mockai.openai.services as _services
 
+from mock_profiles import (
+    LatencyProfileMiddleware,
+    current_profile,
+    default_profile,
+    load_profiles,
+    paced,
+)
+
 try:
     _DELAY = float(os.environ.get("MOCK_STREAM_DELAY", "0.01"))
 except (ValueError, TypeError):
     _DELAY = 0.01
+_PROFILES = load_profiles(_DELAY)
+_DEFAULT_PROFILE = default_profile(_PROFILES)
 _original_streaming_response = _services.streaming_response
 
 
@@ -109,7 +133,7 @@ def _tool_call_streaming_response(model: str, tool_calls: list[dict]):
     yield "data: [DONE]\n\n"
 
 
-def _patched_streaming_response(*args, **kwargs):
+def _patched_streaming_response(*args, **kwargs) -> AsyncIterator[str]:
     # Signature-agnostic: mockai passes (content, model, tool_calls) today, but
     # extract by position-or-keyword so a reordered or keyword-only upstream
     # call keeps working; unknown extra parameters pass through untouched.
@@ -123,9 +147,7 @@ def _patched_streaming_response(*args, **kwargs):
     else:
         source = _original_streaming_response(*args, **kwargs)
 
-    for chunk in source:
-        yield chunk
-        time.sleep(_DELAY)
+    return paced(source, current_profile.get() or _DEFAULT_PROFILE)
 
 
 _services.streaming_response = _patched_streaming_response
@@ -208,4 +230,8 @@ if len(_probe.output._to_dict_list()) != 2:  # type: ignore[union-attr]
 # replacement via module-level name lookup at call time.
 from mockai.server import app  # noqa: E402
 
+app.add_middleware(
+    LatencyProfileMiddleware, profiles=_PROFILES, default=_DEFAULT_PROFILE
+)
+
 __all__ = ["app"]
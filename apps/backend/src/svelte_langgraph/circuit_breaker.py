@@ -0,0 +1,244 @@
+"""Circuit breaker around model calls.
+
+When the provider is degraded, every run would otherwise wait out the full
+client timeout before failing, piling up stuck runs and open SSE connections.
+`CircuitBreaker` watches the outcome of recent model calls -- those of the
+last `LLM_CIRCUIT_WINDOW_S` seconds (default 60) -- counting errors and calls
+slower than `LLM_CIRCUIT_SLOW_CALL_S` (default 30) as bad. Once at least
+`LLM_CIRCUIT_MIN_CALLS` calls (default 10) were made and the bad share
+reaches `LLM_CIRCUIT_FAILURE_RATE` (default 0.5), the circuit opens:
+
+- open: model calls fail fast, ending the run with an AI message saying the
+  model is unavailable, for `LLM_CIRCUIT_OPEN_S` seconds (default 30);
+- half-open: the next call is let through as a probe while others still fail
+  fast. A good probe closes the circuit with a clean slate; a bad one opens it
+  again.
+
+A call cut short by the run's deadline (see `deadline.py`) counts as bad; a
+call cancelled for any other reason, e.g. a client disconnect, has no outcome.
+
+The breaker is process-wide, like the rate limits, and its state is exported
+as the `llm_circuit_breaker_state` Prometheus metric (on Aegra's `/metrics`
+when `ENABLE_PROMETHEUS_METRICS` is on), with fast-failed calls counted in
+`llm_circuit_breaker_rejected_calls_total`.
+"""
+
+import os
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from functools import cache
+from typing import TYPE_CHECKING, Literal
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import (
+    ModelCallResult,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain_core.messages import AIMessage
+
+from svelte_langgraph.deadline import deadline_expired
+
+if TYPE_CHECKING:
+    import prometheus_client
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+DEFAULT_FAILURE_RATE = 0.5
+DEFAULT_MIN_CALLS = 10
+DEFAULT_WINDOW_S = 60.0
+DEFAULT_SLOW_CALL_S = 30.0
+DEFAULT_OPEN_S = 30.0
+
+CIRCUIT_OPEN_MESSAGE = (
+    "The language model is unavailable at the moment, so I can't answer "
+    "right now. Please try again in a minute."
+)
+
+
+# The metrics are created, and prometheus_client imported, when the first
+# breaker is: the graph module, and thus this one, is imported at every
+# server start.
+@cache
+def _circuit_state() -> "prometheus_client.Enum":
+    import prometheus_client
+
+    return prometheus_client.Enum(
+        "llm_circuit_breaker_state",
+        "State of the circuit breaker around model calls.",
+        states=["closed", "open", "half_open"],
+    )
+
+
+@cache
+def _rejected_calls() -> "prometheus_client.Counter":
+    import prometheus_client
+
+    return prometheus_client.Counter(
+        "llm_circuit_breaker_rejected_calls",
+        "Model calls failed fast because the circuit was open.",
+    )
+
+
+class CircuitBreaker:
+    """Failure- and latency-rate circuit breaker; see the module docstring."""
+
+    def __init__(
+        self,
+        failure_rate: float = DEFAULT_FAILURE_RATE,
+        min_calls: int = DEFAULT_MIN_CALLS,
+        window: float = DEFAULT_WINDOW_S,
+        slow_call: float = DEFAULT_SLOW_CALL_S,
+        open_for: float = DEFAULT_OPEN_S,
+    ) -> None:
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.slow_call = slow_call
+        self.open_for = open_for
+        # (finished at, bad) per call in the window.
+        self._calls: deque[tuple[float, bool]] = deque()
+        self._state: CircuitState = "closed"
+        self._opened_at = 0.0
+        self._probing = False
+        _circuit_state().state(self._state)
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        def setting(name: str, default: float) -> float:
+            raw = os.getenv(name, "").strip()
+            return float(raw) if raw else default
+
+        return cls(
+            failure_rate=setting("LLM_CIRCUIT_FAILURE_RATE", DEFAULT_FAILURE_RATE),
+            min_calls=int(setting("LLM_CIRCUIT_MIN_CALLS", DEFAULT_MIN_CALLS)),
+            window=setting("LLM_CIRCUIT_WINDOW_S", DEFAULT_WINDOW_S),
+            slow_call=setting("LLM_CIRCUIT_SLOW_CALL_S", DEFAULT_SLOW_CALL_S),
+            open_for=setting("LLM_CIRCUIT_OPEN_S", DEFAULT_OPEN_S),
+        )
+
+    def _set_state(self, state: CircuitState) -> None:
+        self._state = state
+        _circuit_state().state(state)
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state == "open"
+            and time.monotonic() - self._opened_at >= self.open_for
+        ):
+            self._set_state("half_open")
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead. In half-open state the first caller
+        becomes the probe and must report back via `record` or `release`."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        _rejected_calls().inc()
+        return False
+
+    def release(self) -> None:
+        """A call that was allowed ended without an outcome (cancelled)."""
+        self._probing = False
+
+    def record(self, ok: bool, latency: float) -> None:
+        """Report an allowed call's outcome."""
+        bad = not ok or latency >= self.slow_call
+        now = time.monotonic()
+        if self._state == "half_open" and self._probing:
+            self._probing = False
+            self._calls.clear()
+            if bad:
+                self._open(now)
+            else:
+                self._set_state("closed")
+            return
+        if self._state != "closed":
+            # A call started before the circuit opened.
+            return
+
+        self._calls.append((now, bad))
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+        if len(self._calls) >= self.min_calls:
+            bad_calls = sum(1 for _, was_bad in self._calls if was_bad)
+            if bad_calls / len(self._calls) >= self.failure_rate:
+                self._calls.clear()
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self._set_state("open")
+
+
+_circuit_breaker: CircuitBreaker | None = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """The process-wide breaker, configured from the environment on first use."""
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        _circuit_breaker = CircuitBreaker.from_env()
+    return _circuit_breaker
+
+
+def reset_circuit_breaker() -> None:
+    """Forget the breaker, so the next use starts closed and re-reads the
+    environment."""
+    global _circuit_breaker
+    _circuit_breaker = None
+
+
+class CircuitBreakerMiddleware(AgentMiddleware):
+    """Fail model calls fast while the circuit is open; see the module
+    docstring."""
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelCallResult:
+        breaker = get_circuit_breaker()
+        if not breaker.allow():
+            return AIMessage(CIRCUIT_OPEN_MESSAGE)
+        start = time.monotonic()
+        try:
+            result = handler(request)
+        except Exception:
+            breaker.record(False, time.monotonic() - start)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record(True, time.monotonic() - start)
+        return result
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelCallResult:
+        breaker = get_circuit_breaker()
+        if not breaker.allow():
+            return AIMessage(CIRCUIT_OPEN_MESSAGE)
+        start = time.monotonic()
+        try:
+            result = await handler(request)
+        except Exception:
+            breaker.record(False, time.monotonic() - start)
+            raise
+        except BaseException:
+            if deadline_expired():
+                breaker.record(False, time.monotonic() - start)
+            else:
+                # Cancelled: no outcome, but a half-open probe must be let go.
+                breaker.release()
+            raise
+        breaker.record(True, time.monotonic() - start)
+        return result
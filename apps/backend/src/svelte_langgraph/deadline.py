@@ -0,0 +1,189 @@
+"""Per-run deadlines.
+
+A run may take at most `RUN_DEADLINE_S` seconds (no limit when unset). A
+caller can shorten that for one run via `configurable.run_deadline_s`, the
+same way `state_only_submit` is passed, but never extend it past the server's
+setting.
+
+`DeadlineMiddleware` fixes the run's deadline when the run starts and keeps
+it in private graph state, then enforces it on every call below it:
+
+- model calls get the remaining time as their timeout, which also bounds
+  waiting for rate limits and provider backoff;
+- tool calls are cancelled when it expires and the model receives an error
+  `ToolMessage`, as for a `ToolPolicy` timeout;
+- once it has passed, the next model call doesn't reach the model: the run
+  ends with an AI message saying it ran out of time, after whatever messages
+  and tool results the run already produced.
+
+Enforcement uses asyncio; sync invocations only end at the deadline between
+calls, like the other limits. A model call cut short is cancelled, so the
+middlewares below this one (e.g. the circuit breaker) can check
+`deadline_expired` to tell that from other cancellations.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from collections.abc import Awaitable, Callable
+from typing import Annotated, Any, NotRequired
+
+from langchain.agents.middleware import AgentMiddleware, AgentState
+from langchain.agents.middleware.types import (
+    ModelCallResult,
+    ModelRequest,
+    ModelResponse,
+    PrivateStateAttr,
+)
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.config import get_config
+from langgraph.prebuilt.tool_node import ToolCallRequest
+from langgraph.runtime import Runtime
+from langgraph.types import Command
+
+DEADLINE_MESSAGE = (
+    "I ran out of time before I could finish this answer. "
+    "Ask me to continue and I'll pick up where I left off."
+)
+TOOL_DEADLINE_MESSAGE = "Tool '{name}' was cancelled: the run ran out of time."
+
+
+class DeadlineState(AgentState[None]):
+    # Wall-clock time (time.time()) the current run must end by; None for no
+    # deadline. Set anew by every run, never part of the input or output.
+    run_deadline: NotRequired[Annotated[float | None, PrivateStateAttr]]
+
+
+def _parse_seconds(value: Any, source: str) -> float | None:
+    if value is None or value == "":
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{source} must be a number of seconds, got {value!r}")
+    if seconds <= 0:
+        raise ValueError(f"{source} must be positive, got {value!r}")
+    return seconds
+
+
+def run_budget(configurable: dict[str, Any]) -> float | None:
+    """Seconds the run may take: the shorter of `RUN_DEADLINE_S` and
+    `configurable.run_deadline_s`, None when neither is set."""
+    budgets = [
+        budget
+        for budget in (
+            _parse_seconds(os.getenv("RUN_DEADLINE_S", "").strip(), "RUN_DEADLINE_S"),
+            _parse_seconds(
+                configurable.get("run_deadline_s"), "configurable.run_deadline_s"
+            ),
+        )
+        if budget is not None
+    ]
+    return min(budgets) if budgets else None
+
+
+# The timeout of the model call in progress, if the run has a deadline.
+_model_call_timeout: contextvars.ContextVar[asyncio.Timeout | None] = (
+    contextvars.ContextVar("model_call_timeout", default=None)
+)
+
+
+def deadline_expired() -> bool:
+    """Whether the model call in progress is being cancelled because the run
+    reached its deadline."""
+    timeout = _model_call_timeout.get()
+    return timeout is not None and timeout.expired()
+
+
+def remaining(state: Any) -> float | None:
+    """Seconds left until the run's deadline (negative once it passed), None
+    without one."""
+    deadline = state.get("run_deadline")
+    return None if deadline is None else deadline - time.time()
+
+
+class DeadlineMiddleware(AgentMiddleware[DeadlineState, None, Any]):
+    """Enforce the run's deadline on model and tool calls; see the module
+    docstring."""
+
+    state_schema = DeadlineState
+
+    def before_agent(
+        self, state: DeadlineState, runtime: Runtime
+    ) -> dict[str, Any] | None:
+        budget = run_budget(get_config().get("configurable", {}))
+        deadline = None if budget is None else time.time() + budget
+        if deadline is None and state.get("run_deadline") is None:
+            return None
+        return {"run_deadline": deadline}
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelCallResult:
+        left = remaining(request.state)
+        if left is not None and left <= 0:
+            return AIMessage(DEADLINE_MESSAGE)
+        return handler(request)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelCallResult:
+        left = remaining(request.state)
+        if left is None:
+            return await handler(request)
+        if left <= 0:
+            return AIMessage(DEADLINE_MESSAGE)
+        timeout = asyncio.timeout(left)
+        token = _model_call_timeout.set(timeout)
+        try:
+            async with timeout:
+                return await handler(request)
+        except TimeoutError:
+            if not timeout.expired():
+                raise
+            return AIMessage(DEADLINE_MESSAGE)
+        finally:
+            _model_call_timeout.reset(token)
+
+    def _expired(self, request: ToolCallRequest) -> ToolMessage:
+        call = request.tool_call
+        return ToolMessage(
+            TOOL_DEADLINE_MESSAGE.format(name=call["name"]),
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        left = remaining(request.state)
+        if left is not None and left <= 0:
+            return self._expired(request)
+        return handler(request)
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        left = remaining(request.state)
+        if left is None:
+            return await handler(request)
+        if left <= 0:
+            return self._expired(request)
+        timeout = asyncio.timeout(left)
+        try:
+            async with timeout:
+                return await handler(request)
+        except TimeoutError:
+            if not timeout.expired():
+                raise
+            return self._expired(request)
@@ -1,5 +1,5 @@
 from collections.abc import Awaitable, Callable, Sequence
-from typing import Annotated, Any, cast
+from typing import TYPE_CHECKING, Annotated, Any, cast
 
 from langchain.agents import create_agent
 from langchain.agents.middleware import AgentMiddleware, AgentState, before_agent
@@ -9,7 +9,6 @@ from langchain.agents.middleware.types import (
     ModelResponse,
 )
 from langchain_core.messages import AnyMessage, BaseMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
 
 from langgraph.config import get_config
@@ -18,10 +17,31 @@ from langgraph.runtime import Runtime
 
 # Absolute imports required: Aegra loads this file by path (outside the
 # package), so relative imports would fail at server startup.
-from svelte_langgraph.models import get_chat_model
-from svelte_langgraph.phase import DEFAULT_PHASE, VALID_PHASES, Phase
-from svelte_langgraph.reducers import last_value
-from svelte_langgraph.tools import get_tools
+from svelte_langgraph.circuit_breaker import CircuitBreakerMiddleware
+from svelte_langgraph.deadline import DeadlineMiddleware
+from svelte_langgraph.instrumentation import (
+    InstrumentationMiddleware,
+    get_span_exporter,
+    span,
+)
+from svelte_langgraph.message_archive import MessageArchiveMiddleware
+from svelte_langgraph.models import current_models, get_chat_model
+from svelte_langgraph.phase import DEFAULT_PHASE, Phase, validate_phase
+from svelte_langgraph.phase_tools import PhaseToolsMiddleware
+from svelte_langgraph.rate_limit import RateLimitMiddleware
+from svelte_langgraph.reducers import bounded_messages, last_value
+from svelte_langgraph.routing import ModelRoutingMiddleware
+from svelte_langgraph.speculative import (
+    SpeculativeToolMiddleware,
+    speculative_tools_enabled,
+)
+from svelte_langgraph.stream_latency import StreamLatencyMiddleware
+from svelte_langgraph.tool_cache import ToolCacheMiddleware
+from svelte_langgraph.tool_limits import ToolLimitsMiddleware
+from svelte_langgraph.tools import get_tool_policies, get_tools
+
+if TYPE_CHECKING:
+    from langchain_core.prompts import ChatPromptTemplate
 
 
 # AgentState is generic over the structured-response type since langchain 1.3;
@@ -32,13 +52,20 @@ class AgentExtendedState(AgentState[None]):
     # write, instead of LangGraph raising InvalidUpdateError -- see
     # reducers.py for the mechanism.
     phase: Annotated[Phase, last_value]
+    # Keeps the checkpoint to the most recent CHECKPOINT_MAX_MESSAGES
+    # messages; MessageArchiveMiddleware keeps the full history.
+    messages: Annotated[list[AnyMessage], bounded_messages]
 
 
 SYSTEM_PROMPT = "You are a helpful assistant. Address the user as {user_name}."
 INITIAL_MESSAGE = "Hi, how are you doing?"
 
 
-def get_prompt_template() -> ChatPromptTemplate:
+def get_prompt_template() -> "ChatPromptTemplate":
+    # Imported on first use: langchain_core.prompts pulls in jinja2 and yaml,
+    # a good part of this module's import time (see tests/test_import_time.py).
+    from langchain_core.prompts import ChatPromptTemplate
+
     return ChatPromptTemplate(
         [
             ("system", SYSTEM_PROMPT),
@@ -68,7 +95,11 @@ def get_prompt(
     )
 
 
-@before_agent(can_jump_to=["end"], state_schema=AgentExtendedState)
+# No `state_schema=AgentExtendedState` here: create_agent merges schemas at a
+# type's first position in the middleware list, so middleware schemas after
+# phase_gate would override `messages`' reducer with plain `add_messages`.
+# `make_graph` passes AgentExtendedState as the agent's state schema instead.
+@before_agent(can_jump_to=["end"])  # type: ignore[arg-type]
 def phase_gate(state: AgentExtendedState, runtime: Runtime) -> dict | None:
     """Validate phase and decide whether this run should reach the model.
 
@@ -91,26 +122,25 @@ def phase_gate(state: AgentExtendedState, runtime: Runtime) -> dict | None:
       `state["messages"]` can't tell that apart from a genuine new submission,
       hence the explicit marker above.
     """
-    update: dict = {}
+    with span("phase_gate"):
+        update: dict = {}
 
-    phase = state.get("phase")
-    if phase is None:
-        update["phase"] = DEFAULT_PHASE
-    elif phase not in VALID_PHASES:
-        raise ValueError(
-            f"Invalid phase {phase!r}. Must be one of: {sorted(VALID_PHASES)}"
-        )
+        phase = state.get("phase")
+        if phase is None:
+            update["phase"] = DEFAULT_PHASE
+        else:
+            validate_phase(phase)
 
-    if get_config().get("configurable", {}).get("state_only_submit"):
-        update["jump_to"] = "end"
-        return update
+        if get_config().get("configurable", {}).get("state_only_submit"):
+            update["jump_to"] = "end"
+            return update
 
-    messages = state.get("messages", [])
-    if not messages or not isinstance(messages[-1], HumanMessage):
-        update["jump_to"] = "end"
-        return update
+        messages = state.get("messages", [])
+        if not messages or not isinstance(messages[-1], HumanMessage):
+            update["jump_to"] = "end"
+            return update
 
-    return update or None
+        return update or None
 
 
 class PromptMiddleware(AgentMiddleware[AgentExtendedState, None, Any]):
@@ -120,9 +150,10 @@ class PromptMiddleware(AgentMiddleware[AgentExtendedState, None, Any]):
 
     def _request_with_prompt(self, request: ModelRequest) -> ModelRequest:
         state = cast(AgentExtendedState, request.state)
+        with span("prompt"):
+            messages = list(get_prompt(state, get_config()))
         return request.override(
-            system_message=None,
-            messages=cast(list[AnyMessage], list(get_prompt(state, get_config()))),
+            system_message=None, messages=cast(list[AnyMessage], messages)
         )
 
     def wrap_model_call(
@@ -143,9 +174,42 @@ class PromptMiddleware(AgentMiddleware[AgentExtendedState, None, Any]):
 def make_graph(
     config: RunnableConfig,
 ) -> CompiledStateGraph:
+    tools = get_tools()
+    policies = get_tool_policies()
+    models = current_models()
+    middleware: list[AgentMiddleware[Any, Any, Any]] = [
+        # First, so its before_agent hook runs even when phase_gate ends the run.
+        MessageArchiveMiddleware(),
+        phase_gate,
+        StreamLatencyMiddleware(models),
+    ]
+    if get_span_exporter() is not None:
+        # Outside the deadline, so calls it cuts short are recorded too.
+        middleware.append(InstrumentationMiddleware(models))
+    middleware += [
+        # Outermost model and tool wrapper: the deadline bounds everything
+        # below it, including rate-limit waits and tool queueing.
+        DeadlineMiddleware(),
+        PromptMiddleware(),
+        PhaseToolsMiddleware(policies),
+        # Inside the prompt, so it sees the prompt the model will, and
+        # outside routing, whose latency shouldn't include throttling.
+        # An open circuit fails fast before spending rate-limit budget; a call
+        # that is retried through 429s counts as one outcome.
+        CircuitBreakerMiddleware(),
+        RateLimitMiddleware(),
+        ModelRoutingMiddleware(models),
+    ]
+    if speculative_tools_enabled():
+        # Outermost tool wrapper: a claimed speculative call returns its
+        # result directly, having already gone through the cache and limits.
+        middleware.append(SpeculativeToolMiddleware(tools, policies))
+    # Cache outside limits, so hits and shared in-flight calls take no slot.
+    middleware += [ToolCacheMiddleware(policies), ToolLimitsMiddleware(policies)]
+
     return create_agent(
         model=get_chat_model(),
-        tools=get_tools(),
-        middleware=[phase_gate, PromptMiddleware()],
+        tools=tools,
+        middleware=middleware,
         state_schema=AgentExtendedState,
     )
@@ -0,0 +1,273 @@
+"""Hedged model requests: fall back to a second model when the first is slow
+or failing.
+
+Provider latency has a long tail; an occasional request sits for seconds
+before its first token while an identical one would have answered at once.
+`HedgedChatModel` sends each call to a `primary` model and, if no first chunk
+with content (text or tool-call chunks, see `streaming.has_content`) has
+arrived within `hedge_after` seconds, fires the same call at a `fallback`
+model (an alternate model or provider) as well. Whichever produces such a
+chunk first wins and is streamed, along with the empty chunks (e.g. OpenAI's
+role-only opening chunk) it sent before; the other request is cancelled,
+which closes its HTTP response. A primary that fails before its first chunk
+with content starts the fallback right away instead of waiting out the
+deadline.
+
+Once a winner has streamed its first chunk with content the hedge is over:
+an error later in its stream propagates as usual, since its partial output
+has already reached the client.
+
+Configured through `CHAT_FALLBACK_MODEL_NAME` / `CHAT_FALLBACK_MODEL_KWARGS`
+and `CHAT_HEDGE_AFTER_MS`; see `models.ModelSet`.
+"""
+
+import asyncio
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    Sequence,
+)
+from contextlib import aclosing
+from typing import Any, TypeVar, cast
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableBinding
+from langchain_core.tools import BaseTool
+
+from .streaming import has_content
+
+DEFAULT_HEDGE_AFTER_MS = 2000.0
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def hedged_stream(
+    primary: Callable[[], AsyncIterator[T]],
+    fallback: Callable[[], AsyncIterator[T]],
+    hedge_after: float,
+    decides: Callable[[T], bool] = lambda item: True,
+) -> AsyncGenerator[T, None]:
+    """Stream the items of whichever of `primary()` and `fallback()` first
+    yields an item that `decides` the race (any item by default), as
+    described in the module docstring; items before it are held back until
+    then. A stream that ends without one wins when it ends.
+
+    `fallback()` is only called once the hedge fires. Each stream is drained
+    by its own task, where it is also closed: streams holding an HTTP response
+    open must stay in a single task.
+    """
+    events: asyncio.Queue[tuple[int, object]] = asyncio.Queue()
+    tasks: list[asyncio.Task[None]] = []
+
+    async def drain(index: int, stream: AsyncIterator[T]) -> None:
+        try:
+            async for item in stream:
+                events.put_nowait((index, item))
+        except Exception as e:
+            events.put_nowait((index, e))
+        else:
+            events.put_nowait((index, _DONE))
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def start(factory: Callable[[], AsyncIterator[T]]) -> None:
+        tasks.append(asyncio.create_task(drain(len(tasks), factory())))
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + hedge_after
+    errors: list[Exception] = []
+    held: dict[int, list[T]] = {}
+    start(primary)
+    try:
+        while True:
+            timeout = max(0.0, deadline - loop.time()) if len(tasks) == 1 else None
+            try:
+                index, item = await asyncio.wait_for(events.get(), timeout)
+            except TimeoutError:
+                start(fallback)
+                continue
+            if isinstance(item, Exception):
+                errors.append(item)
+                if len(tasks) == 1:
+                    start(fallback)
+                elif len(errors) == len(tasks):
+                    error = errors[0]
+                    error.add_note(f"The fallback model failed as well: {errors[1]!r}")
+                    raise error
+                continue
+            if item is _DONE or decides(cast(T, item)):
+                winner = index
+                break
+            held.setdefault(index, []).append(cast(T, item))
+
+        for index, task in enumerate(tasks):
+            if index != winner:
+                task.cancel()
+        for early in held.get(winner, []):
+            yield early
+        while item is not _DONE:
+            if isinstance(item, Exception):
+                raise item
+            yield item  # type: ignore[misc]
+            index, item = await events.get()
+            while index != winner:
+                # Anything the loser queued before it was cancelled.
+                index, item = await events.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _bound_tool_kwargs(
+    model: BaseChatModel, tools: Sequence[Any], kwargs: dict[str, Any]
+) -> dict[str, Any]:
+    """The kwargs `model.bind_tools(tools, **kwargs)` binds."""
+    bound = model.bind_tools(tools, **kwargs)
+    if not isinstance(bound, RunnableBinding):
+        raise TypeError(
+            f"{type(model).__name__}.bind_tools returned "
+            f"{type(bound).__name__}, expected a RunnableBinding"
+        )
+    return dict(bound.kwargs)
+
+
+async def _once(result: Callable[[], Awaitable[T]]) -> AsyncIterator[T]:
+    yield await result()
+
+
+class HedgedChatModel(BaseChatModel):
+    """Chat model that hedges each call between `primary` and `fallback`.
+
+    Like `CoalescingChatModel`, it calls the wrapped models' `_astream` /
+    `_agenerate` directly, so callbacks only see the winning output. Tools are
+    bound to each model at bind time, as every provider formats them its own
+    way, and each call gets the kwargs bound for its model. Without streaming, the whole response
+    stands in for the first chunk. The sync paths don't hedge; they only fall
+    back to `fallback` when `primary` raises.
+    """
+
+    primary: BaseChatModel
+    fallback: BaseChatModel
+    hedge_after: float = DEFAULT_HEDGE_AFTER_MS / 1000
+
+    @property
+    def _llm_type(self) -> str:
+        return f"hedged-{self.primary._llm_type}"
+
+    def _get_ls_params(self, stop: list[str] | None = None, **kwargs: Any):
+        return self.primary._get_ls_params(stop=stop, **kwargs)
+
+    def bind_tools(
+        self,
+        tools: Sequence[dict[str, Any] | type | Any | BaseTool],
+        **kwargs: Any,
+    ) -> Runnable[LanguageModelInput, AIMessage]:
+        return self.bind(
+            hedge_primary_kwargs=_bound_tool_kwargs(self.primary, tools, kwargs),
+            hedge_fallback_kwargs=_bound_tool_kwargs(self.fallback, tools, kwargs),
+        )
+
+    def _kwargs_for(self, model: BaseChatModel, kwargs: dict[str, Any]) -> dict:
+        """`kwargs` for a call to `model`, with the tools bound for it."""
+        kwargs = dict(kwargs)
+        primary = kwargs.pop("hedge_primary_kwargs", None) or {}
+        fallback = kwargs.pop("hedge_fallback_kwargs", None) or {}
+        return {**(primary if model is self.primary else fallback), **kwargs}
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        try:
+            return self.primary._generate(
+                messages, stop=stop, **self._kwargs_for(self.primary, kwargs)
+            )
+        except Exception:
+            return self.fallback._generate(
+                messages, stop=stop, **self._kwargs_for(self.fallback, kwargs)
+            )
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        def attempt(model: BaseChatModel) -> Callable[[], AsyncIterator[ChatResult]]:
+            return lambda: _once(
+                lambda: model._agenerate(
+                    messages, stop=stop, **self._kwargs_for(model, kwargs)
+                )
+            )
+
+        race = hedged_stream(
+            attempt(self.primary), attempt(self.fallback), self.hedge_after
+        )
+        async with aclosing(race):
+            async for result in race:
+                return result
+        raise RuntimeError("Hedged generation produced no result")
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        source = self.primary._stream(
+            messages, stop=stop, **self._kwargs_for(self.primary, kwargs)
+        )
+        try:
+            first = next(source, None)
+        except Exception:
+            source = self.fallback._stream(
+                messages, stop=stop, **self._kwargs_for(self.fallback, kwargs)
+            )
+            first = next(source, None)
+        if first is None:
+            return
+        yield first
+        yield from source
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        def attempt(
+            model: BaseChatModel,
+        ) -> Callable[[], AsyncIterator[ChatGenerationChunk]]:
+            return lambda: model._astream(
+                messages, stop=stop, **self._kwargs_for(model, kwargs)
+            )
+
+        race = hedged_stream(
+            attempt(self.primary),
+            attempt(self.fallback),
+            self.hedge_after,
+            decides=has_content,
+        )
+        async with aclosing(race):
+            async for chunk in race:
+                yield chunk
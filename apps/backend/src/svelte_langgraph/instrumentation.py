@@ -0,0 +1,464 @@
+"""Latency spans for the parts of a run, sent to a pluggable exporter.
+
+A slow run is hard to break down from its total time alone. With an
+exporter configured, each run records these spans, each carrying the run's
+`thread_id` and `run_id`:
+
+- `phase_gate`: the `phase_gate` hook at the start of the run;
+- `prompt`: building the model input in `PromptMiddleware`;
+- `model_call`: one model call, from entering the middleware stack to the
+  reply, labelled with its `phase` and `model` (as in `routing.py`) and a
+  `status` of `ok` or `error`;
+- `queue`: the part of a model call before the model starts -- the prompt,
+  the circuit breaker, rate limits and provider backoff;
+- `first_token`: from the model starting to its first streamed chunk, for
+  streamed calls;
+- `generation`: from the model starting to the reply;
+- `tool`: one tool call, labelled with its `tool` name and `status`.
+
+`INSTRUMENTATION_EXPORTER` picks the exporter:
+
+- `console`: logs each span as JSON;
+- `file`: appends each span as a JSON line to `INSTRUMENTATION_FILE`;
+- `prometheus`: the `agent_span_duration_seconds` histogram, by span and
+  model or tool (on Aegra's `/metrics` when `ENABLE_PROMETHEUS_METRICS` is
+  on);
+- `otel`: OpenTelemetry spans on the global tracer provider, which Aegra sets
+  up from `OTEL_TARGETS`, e.g. for an OTLP collector.
+
+Any other `SpanExporter` can be plugged in with `set_span_exporter`. Without
+one (the default), `make_graph` leaves `InstrumentationMiddleware` out and
+`span` does nothing but check for an exporter.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Protocol, cast
+from uuid import UUID
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import (
+    ModelCallResult,
+    ModelRequest,
+    ModelResponse,
+    ToolCallRequest,
+)
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.messages import BaseMessage, ToolMessage
+from langgraph.config import get_config
+from langgraph.types import Command
+
+from svelte_langgraph.models import ModelSet
+from svelte_langgraph.phase import DEFAULT_PHASE
+from svelte_langgraph.routing import model_label
+
+if TYPE_CHECKING:
+    import prometheus_client
+    from opentelemetry.trace import TracerProvider
+
+logger = logging.getLogger(__name__)
+
+SpanValue = str | int | float
+
+# Histogram buckets (seconds) from sub-millisecond hooks to long generations.
+DURATION_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+
+@dataclass(frozen=True)
+class Span:
+    """One timed part of a run. `start` is wall-clock time (epoch seconds),
+    `duration` in seconds."""
+
+    name: str
+    start: float
+    duration: float
+    attributes: Mapping[str, SpanValue] = field(default_factory=dict)
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None: ...
+
+
+class LogSpanExporter:
+    """Logs each span as a JSON object."""
+
+    def export(self, span: Span) -> None:
+        logger.info(json.dumps(asdict(span)))
+
+
+class FileSpanExporter:
+    """Appends each span to `path` as a JSON line."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(asdict(span)) + "\n"
+        with self._lock, self.path.open("a") as f:
+            f.write(line)
+
+
+@cache
+def _span_histogram() -> "prometheus_client.Histogram":
+    import prometheus_client
+
+    return prometheus_client.Histogram(
+        "agent_span_duration_seconds",
+        "Duration of the parts of agent runs.",
+        ["span", "target"],
+        buckets=DURATION_BUCKETS,
+    )
+
+
+class PrometheusSpanExporter:
+    """Observes each span in the `agent_span_duration_seconds` histogram,
+    labelled by span name and its model or tool, if any."""
+
+    def export(self, span: Span) -> None:
+        target = span.attributes.get("model") or span.attributes.get("tool") or ""
+        _span_histogram().labels(span.name, str(target)).observe(span.duration)
+
+
+class OtelSpanExporter:
+    """Records each span as an OpenTelemetry span, on `tracer_provider` or
+    the global one."""
+
+    def __init__(self, tracer_provider: "TracerProvider | None" = None) -> None:
+        from opentelemetry import trace
+
+        self._tracer = trace.get_tracer(__name__, tracer_provider=tracer_provider)
+
+    def export(self, span: Span) -> None:
+        start_ns = int(span.start * 1e9)
+        otel_span = self._tracer.start_span(
+            span.name, start_time=start_ns, attributes=dict(span.attributes)
+        )
+        otel_span.end(end_time=start_ns + int(span.duration * 1e9))
+
+
+def exporter_from_env() -> SpanExporter | None:
+    kind = os.getenv("INSTRUMENTATION_EXPORTER", "").strip().lower()
+    if not kind:
+        return None
+    if kind == "console":
+        return LogSpanExporter()
+    if kind == "file":
+        path = os.getenv("INSTRUMENTATION_FILE", "").strip()
+        if not path:
+            raise ValueError("INSTRUMENTATION_EXPORTER=file needs INSTRUMENTATION_FILE")
+        return FileSpanExporter(Path(path))
+    if kind == "prometheus":
+        return PrometheusSpanExporter()
+    if kind == "otel":
+        return OtelSpanExporter()
+    raise ValueError(
+        "INSTRUMENTATION_EXPORTER must be one of console, file, prometheus, "
+        f"otel, got {kind!r}"
+    )
+
+
+_exporter: SpanExporter | None = None
+_exporter_loaded = False
+
+
+def get_span_exporter() -> SpanExporter | None:
+    """The process-wide exporter, from the environment on first use."""
+    global _exporter, _exporter_loaded
+    if not _exporter_loaded:
+        _exporter = exporter_from_env()
+        _exporter_loaded = True
+    return _exporter
+
+
+def set_span_exporter(exporter: SpanExporter | None) -> None:
+    """Send spans to `exporter` from now on; None turns instrumentation off."""
+    global _exporter, _exporter_loaded
+    _exporter, _exporter_loaded = exporter, True
+
+
+def reset_span_exporter() -> None:
+    """Forget the exporter, so the next use reads the environment afresh."""
+    global _exporter, _exporter_loaded
+    _exporter, _exporter_loaded = None, False
+
+
+def run_attributes() -> dict[str, SpanValue]:
+    """The current run's `thread_id` and `run_id`, those that are known."""
+    try:
+        config = get_config()
+    except RuntimeError:
+        return {}
+    configurable = config.get("configurable", {})
+    ids = {
+        "thread_id": configurable.get("thread_id"),
+        # Aegra sets both; a run started directly only has the root one.
+        "run_id": configurable.get("run_id") or config.get("run_id"),
+    }
+    return {key: str(value) for key, value in ids.items() if value is not None}
+
+
+class _Clock:
+    """Converts `time.perf_counter` readings to wall-clock times."""
+
+    def __init__(self) -> None:
+        self.wall = time.time()
+        self.start = time.perf_counter()
+
+    def at(self, counter: float) -> float:
+        return self.wall + (counter - self.start)
+
+
+def _export(
+    exporter: SpanExporter,
+    name: str,
+    start: float,
+    end: float,
+    clock: _Clock,
+    attributes: Mapping[str, SpanValue],
+) -> None:
+    try:
+        exporter.export(Span(name, clock.at(start), end - start, attributes))
+    except Exception as e:
+        # Instrumentation must never fail a run.
+        logger.warning(f"Exporting span {name!r} failed: {e}")
+
+
+@contextmanager
+def span(name: str, **attributes: SpanValue) -> Iterator[None]:
+    """Record the enclosed block as span `name`, if an exporter is set."""
+    exporter = get_span_exporter()
+    if exporter is None:
+        yield
+        return
+    clock = _Clock()
+    try:
+        yield
+    finally:
+        attributes = {**run_attributes(), **attributes}
+        _export(exporter, name, clock.start, time.perf_counter(), clock, attributes)
+
+
+class TokenTimer(BaseCallbackHandler):
+    """Callback handler timing one model call from the provider's side: when
+    the (first) model started, its first streamed chunk, its first chunk with
+    text (tool-call chunks have none) and the gaps between chunks, as
+    `time.perf_counter` readings."""
+
+    # Called in the event loop rather than a thread, for accurate times.
+    run_inline = True
+
+    def __init__(self) -> None:
+        self.model_start: float | None = None
+        self.first_token: float | None = None
+        self.first_text: float | None = None
+        self.last_token: float | None = None
+        self.gaps: list[float] = []
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        if self.model_start is None:
+            self.model_start = time.perf_counter()
+
+    def on_llm_new_token(self, token: Any, **kwargs: Any) -> None:
+        now = time.perf_counter()
+        if self.last_token is None:
+            self.first_token = now
+        else:
+            self.gaps.append(now - self.last_token)
+        if token and self.first_text is None:
+            self.first_text = now
+        self.last_token = now
+
+
+@contextmanager
+def timing_tokens() -> Iterator[TokenTimer]:
+    """Attach a `TokenTimer` to the current node's callbacks, which the model
+    call made within the block inherits."""
+    timer = TokenTimer()
+    callbacks = get_config().get("callbacks")
+    if not isinstance(callbacks, BaseCallbackManager):
+        # No callbacks configured (e.g. outside a graph): nothing to time.
+        yield timer
+        return
+    callbacks.add_handler(timer, inherit=True)
+    try:
+        yield timer
+    finally:
+        callbacks.remove_handler(timer)
+
+
+def _tool_status(result: ToolMessage | Command) -> str:
+    if isinstance(result, ToolMessage) and result.status == "error":
+        return "error"
+    return "ok"
+
+
+class InstrumentationMiddleware(AgentMiddleware):
+    """Record the `model_call`, `queue`, `first_token`, `generation` and
+    `tool` spans; see the module docstring.
+
+    `models` is the `ModelSet` the graph was built with, to label calls by
+    model as `ModelRoutingMiddleware` routes them.
+    """
+
+    def __init__(self, models: ModelSet) -> None:
+        super().__init__()
+        self._models = models
+
+    def _model_attributes(self, request: ModelRequest) -> dict[str, SpanValue]:
+        phase = cast(str, request.state.get("phase") or DEFAULT_PHASE)
+        return {
+            **run_attributes(),
+            "phase": phase,
+            "model": model_label(self._models, phase),
+        }
+
+    def _export_model_spans(
+        self,
+        exporter: SpanExporter,
+        clock: _Clock,
+        timer: TokenTimer,
+        attributes: dict[str, SpanValue],
+        ok: bool,
+    ) -> None:
+        end = time.perf_counter()
+        status = "ok" if ok else "error"
+        _export(
+            exporter,
+            "model_call",
+            clock.start,
+            end,
+            clock,
+            {**attributes, "status": status},
+        )
+        started = timer.model_start
+        if started is None:
+            # Ended before reaching the model (circuit open, rate limited).
+            return
+        _export(exporter, "queue", clock.start, started, clock, attributes)
+        if timer.first_token is not None:
+            _export(
+                exporter, "first_token", started, timer.first_token, clock, attributes
+            )
+        _export(
+            exporter,
+            "generation",
+            started,
+            end,
+            clock,
+            {**attributes, "status": status},
+        )
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelCallResult:
+        exporter = get_span_exporter()
+        if exporter is None:
+            return handler(request)
+        attributes = self._model_attributes(request)
+        clock = _Clock()
+        ok = False
+        with timing_tokens() as timer:
+            try:
+                result = handler(request)
+                ok = True
+                return result
+            finally:
+                self._export_model_spans(exporter, clock, timer, attributes, ok)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelCallResult:
+        exporter = get_span_exporter()
+        if exporter is None:
+            return await handler(request)
+        attributes = self._model_attributes(request)
+        clock = _Clock()
+        ok = False
+        with timing_tokens() as timer:
+            try:
+                result = await handler(request)
+                ok = True
+                return result
+            finally:
+                self._export_model_spans(exporter, clock, timer, attributes, ok)
+
+    def _export_tool_span(
+        self,
+        exporter: SpanExporter,
+        clock: _Clock,
+        request: ToolCallRequest,
+        result: ToolMessage | Command | None,
+    ) -> None:
+        attributes = {
+            **run_attributes(),
+            "tool": request.tool_call["name"],
+            "status": "error" if result is None else _tool_status(result),
+        }
+        _export(exporter, "tool", clock.start, time.perf_counter(), clock, attributes)
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        exporter = get_span_exporter()
+        if exporter is None:
+            return handler(request)
+        clock = _Clock()
+        result = None
+        try:
+            result = handler(request)
+            return result
+        finally:
+            self._export_tool_span(exporter, clock, request, result)
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        exporter = get_span_exporter()
+        if exporter is None:
+            return await handler(request)
+        clock = _Clock()
+        result = None
+        try:
+            result = await handler(request)
+            return result
+        finally:
+            self._export_tool_span(exporter, clock, request, result)
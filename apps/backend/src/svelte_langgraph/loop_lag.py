@@ -0,0 +1,223 @@
+"""Event-loop lag, and what was blocking the loop.
+
+Every user's stream is served by the one event loop, so anything synchronous
+on the request path -- token verification (`auth._decode_and_validate`),
+prompt formatting (`graph.get_prompt`), sync tools such as `change_phase`,
+parsing model config in `get_chat_model` -- stalls all of them while it runs.
+`LoopLagMonitor` measures how late the loop is:
+
+- lag: a task sleeps `interval` at a time and records how much later than
+  that it wakes up, in the `event_loop_lag_seconds` histogram (on Aegra's
+  `/metrics` when `ENABLE_PROMETHEUS_METRICS` is on) and in the most recent
+  samples, whose percentiles are also the `event_loop_lag_recent_seconds`
+  gauge (by `quantile`) and are served at `GET /loop-lag` (see `webapp.py`);
+- blocks: a watchdog thread checks that the task keeps waking up. Once the
+  loop has been stuck for more than `threshold`, it captures the stack of
+  the loop's thread -- the code that's blocking it -- logs it as a warning,
+  counts it in `event_loop_blocks_total`, and keeps the most recent ones in
+  `blocks`. One stack per block, however long it lasts. Stacks stay in the
+  logs: `GET /loop-lag`, open to any signed-in user, only says when blocks
+  happened and for how long.
+
+The watchdog needs the GIL to take the stack, so code that blocks inside a
+C extension without releasing it is caught when it returns to Python.
+
+Off unless `LOOP_LAG_MONITOR` is set; the web app's lifespan then runs it,
+sampling every `LOOP_LAG_INTERVAL_MS` (default 100) and capturing blocks
+longer than `LOOP_LAG_THRESHOLD_MS` (default 100).
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from functools import cache
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import prometheus_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_MS = 100.0
+DEFAULT_THRESHOLD_MS = 100.0
+
+# Lag samples kept for the percentiles, 5 minutes at the default interval.
+MAX_SAMPLES = 3000
+MAX_BLOCKS = 20
+
+QUANTILES = (0.5, 0.95, 0.99)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+@cache
+def _lag_histogram() -> "prometheus_client.Histogram":
+    import prometheus_client
+
+    return prometheus_client.Histogram(
+        "event_loop_lag_seconds",
+        "How much later than scheduled the event loop ran a sleeping task.",
+        buckets=LAG_BUCKETS,
+    )
+
+
+@cache
+def _lag_gauge() -> "prometheus_client.Gauge":
+    import prometheus_client
+
+    return prometheus_client.Gauge(
+        "event_loop_lag_recent_seconds",
+        "Percentiles of the most recent event loop lag samples.",
+        ["quantile"],
+    )
+
+
+@cache
+def _blocks_counter() -> "prometheus_client.Counter":
+    import prometheus_client
+
+    return prometheus_client.Counter(
+        "event_loop_blocks",
+        "Times the event loop was blocked for longer than the threshold.",
+    )
+
+
+@dataclass(frozen=True)
+class Block:
+    """A block of the loop, caught by the watchdog. `at` is wall-clock time
+    (epoch seconds), `blocked_seconds` how long the loop had been stuck
+    then, and `stack` the loop thread's stack at that moment."""
+
+    at: float
+    blocked_seconds: float
+    stack: str
+
+
+class LoopLagMonitor:
+    """Measure the running loop's lag and catch what blocks it; see the
+    module docstring. `interval` and `threshold` are in seconds."""
+
+    def __init__(self, interval: float, threshold: float) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.samples: deque[float] = deque(maxlen=MAX_SAMPLES)
+        self.count = 0
+        self.blocks: deque[Block] = deque(maxlen=MAX_BLOCKS)
+        # When the sampling task last ran (time.monotonic()), for the watchdog.
+        self._beat = time.monotonic()
+        self._loop_thread: int | None = None
+        gauge = _lag_gauge()
+        for q in QUANTILES:
+            gauge.labels(str(q)).set_function(lambda q=q: self.percentile(q * 100))
+
+    def record(self, lag: float) -> None:
+        self.samples.append(lag)
+        self.count += 1
+        _lag_histogram().observe(lag)
+
+    def percentile(self, pct: float) -> float:
+        # Nearest rank, as in `stream_latency.py`.
+        ordered = sorted(self.samples)
+        rank = max(1, round(pct / 100 * len(ordered)))
+        return ordered[rank - 1] if ordered else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "threshold_seconds": self.threshold,
+            "lag": {
+                "count": self.count,
+                "p50_seconds": self.percentile(50),
+                "p95_seconds": self.percentile(95),
+                "p99_seconds": self.percentile(99),
+                "max_seconds": max(self.samples, default=0.0),
+            },
+            "blocks": [
+                {"at": block.at, "blocked_seconds": block.blocked_seconds}
+                for block in self.blocks
+            ],
+        }
+
+    async def run(self) -> None:
+        """Sample the running loop until cancelled."""
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        stop = threading.Event()
+        threading.Thread(
+            target=self._watch, args=(stop,), name="loop-lag-watchdog", daemon=True
+        ).start()
+        try:
+            while True:
+                due = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                self._beat = time.monotonic()
+                self.record(max(loop.time() - due, 0.0))
+        finally:
+            stop.set()
+
+    def _watch(self, stop: threading.Event) -> None:
+        caught = None  # The beat whose block was already captured.
+        while not stop.wait(min(self.interval, self.threshold) / 2):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked > self.threshold and beat != caught:
+                caught = beat
+                self._capture(blocked)
+
+    def _capture(self, blocked: float) -> None:
+        assert self._loop_thread is not None
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame))
+        self.blocks.append(Block(time.time(), blocked, stack))
+        _blocks_counter().inc()
+        logger.warning(
+            f"Event loop blocked for over {blocked * 1000:.0f}ms, in:\n{stack}"
+        )
+
+
+def _parse_ms(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    ms = float(raw) if raw else default
+    if ms <= 0:
+        raise ValueError(f"{name} must be positive, got {raw}")
+    return ms / 1000
+
+
+def monitor_from_env() -> LoopLagMonitor | None:
+    if os.getenv("LOOP_LAG_MONITOR", "").strip().lower() not in _TRUE_VALUES:
+        return None
+    return LoopLagMonitor(
+        interval=_parse_ms("LOOP_LAG_INTERVAL_MS", DEFAULT_INTERVAL_MS),
+        threshold=_parse_ms("LOOP_LAG_THRESHOLD_MS", DEFAULT_THRESHOLD_MS),
+    )
+
+
+_monitor: LoopLagMonitor | None = None
+_monitor_loaded = False
+
+
+def get_loop_lag_monitor() -> LoopLagMonitor | None:
+    """The process-wide monitor, from the environment on first use; None
+    when off."""
+    global _monitor, _monitor_loaded
+    if not _monitor_loaded:
+        _monitor = monitor_from_env()
+        _monitor_loaded = True
+    return _monitor
+
+
+def reset_loop_lag_monitor() -> None:
+    """Forget the monitor, so the next `get_loop_lag_monitor` reads the
+    environment again."""
+    global _monitor, _monitor_loaded
+    _monitor, _monitor_loaded = None, False
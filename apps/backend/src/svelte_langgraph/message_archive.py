@@ -0,0 +1,224 @@
+"""Append-only archive of each thread's full message history.
+
+With `CHECKPOINT_MAX_MESSAGES` set, a thread's checkpoint keeps only its most
+recent messages (see `reducers.bounded_messages`), so checkpoint writes and
+thread loads stay the same size however long the thread gets. The full
+history lives on in the graph's store -- Aegra's Postgres store in
+production -- one item per message under the `("message_archive",
+thread_id)` namespace, numbered in order. `GET /threads/{thread_id}/messages`
+(see `webapp.py`) reads it a page at a time.
+
+Each message is archived once, whatever the thread's history does later:
+after a regenerate or a fork from an earlier checkpoint, the messages the
+branches share are already archived (by id, under `("message_archive",
+thread_id, "ids")`) and only the new branch's messages are added.
+
+Appending reads the thread's message count and writes it back, so appends to
+one thread (e.g. of a double submit, or a state-only update during a run)
+take turns on a per-thread lock. The lock is per process: a thread's runs
+are expected on one worker at a time.
+
+`MessageArchiveMiddleware` appends the messages it hasn't archived yet at
+the start of every run and around every model call, so every message is
+archived before a later write can drop it. Messages are archived
+whether or not a bound is set, so turning one on later loses nothing of
+threads that have had a run since; older messages of threads idle since
+before the archive existed are dropped unarchived.
+"""
+
+import asyncio
+import weakref
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any
+from uuid import uuid4
+
+from langchain.agents.middleware import AgentMiddleware, AgentState
+from langchain.agents.middleware.types import (
+    ExtendedModelResponse,
+    ModelCallResult,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+from langgraph.config import get_config
+from langgraph.runtime import Runtime
+from langgraph.store.base import BaseStore, GetOp, Item, PutOp
+
+ARCHIVE_NAMESPACE = "message_archive"
+# Key of the per-thread item holding the message count and last message id.
+META_KEY = "meta"
+# Sub-namespace of the archived message ids, each keying its index.
+IDS_NAMESPACE = "ids"
+MAX_PAGE_SIZE = 200
+
+
+def _key(index: int) -> str:
+    return f"{index:010d}"
+
+
+# By thread id; a lock goes away once no append holds or awaits it.
+_append_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _append_lock(thread_id: str) -> asyncio.Lock:
+    lock = _append_locks.get(thread_id)
+    if lock is None:
+        lock = _append_locks[thread_id] = asyncio.Lock()
+    return lock
+
+
+class MessageArchive:
+    """One store's message archive; see the module docstring."""
+
+    def __init__(self, store: BaseStore) -> None:
+        self.store = store
+
+    async def _meta(self, thread_id: str) -> dict[str, Any]:
+        item = await self.store.aget((ARCHIVE_NAMESPACE, thread_id), META_KEY)
+        return item.value if item is not None else {"count": 0, "last_id": None}
+
+    async def count(self, thread_id: str) -> int:
+        return (await self._meta(thread_id))["count"]
+
+    async def append(self, thread_id: str, messages: Sequence[BaseMessage]) -> int:
+        """Archive the messages of `messages`, a thread's current message
+        list, that aren't archived yet. Returns how many."""
+        async with _append_lock(thread_id):
+            return await self._append(thread_id, messages)
+
+    async def _append(self, thread_id: str, messages: Sequence[BaseMessage]) -> int:
+        meta = await self._meta(thread_id)
+        ids = [message.id for message in messages]
+        if meta["last_id"] in ids:
+            # The usual case: the list grew past the last archived message.
+            candidates = messages[ids.index(meta["last_id"]) + 1 :]
+            new = [message for message in candidates if message.id is not None]
+        else:
+            # The last archived message was dropped from the list, or the
+            # thread went back to an earlier checkpoint: look the ids up.
+            new = await self._unarchived(thread_id, messages)
+        if not new:
+            return 0
+        namespace = (ARCHIVE_NAMESPACE, thread_id)
+        count = meta["count"]
+        ops: list[PutOp] = []
+        for i, message in enumerate(new):
+            ops.append(
+                PutOp(
+                    namespace,
+                    _key(count + i),
+                    {"message": message_to_dict(message)},
+                    index=False,
+                )
+            )
+            ops.append(
+                PutOp(
+                    (*namespace, IDS_NAMESPACE),
+                    str(message.id),
+                    {"index": count + i},
+                    index=False,
+                )
+            )
+        ops.append(
+            PutOp(
+                namespace,
+                META_KEY,
+                {"count": count + len(new), "last_id": new[-1].id},
+                index=False,
+            )
+        )
+        await self.store.abatch(ops)
+        return len(new)
+
+    async def _unarchived(
+        self, thread_id: str, messages: Sequence[BaseMessage]
+    ) -> list[BaseMessage]:
+        with_ids = [message for message in messages if message.id is not None]
+        namespace = (ARCHIVE_NAMESPACE, thread_id, IDS_NAMESPACE)
+        items = await self.store.abatch(
+            [GetOp(namespace, str(message.id)) for message in with_ids]
+        )
+        return [message for message, item in zip(with_ids, items) if item is None]
+
+    async def page(
+        self, thread_id: str, offset: int = 0, limit: int = 50
+    ) -> list[BaseMessage]:
+        """Archived messages `offset` to `offset + limit` (at most
+        `MAX_PAGE_SIZE`), oldest first."""
+        count = await self.count(thread_id)
+        end = min(count, offset + min(limit, MAX_PAGE_SIZE))
+        namespace = (ARCHIVE_NAMESPACE, thread_id)
+        items = await self.store.abatch(
+            [GetOp(namespace, _key(index)) for index in range(offset, end)]
+        )
+        return messages_from_dict(
+            [item.value["message"] for item in items if isinstance(item, Item)]
+        )
+
+
+def _result_messages(result: ModelCallResult) -> list[BaseMessage]:
+    if isinstance(result, AIMessage):
+        return [result]
+    if isinstance(result, ExtendedModelResponse):
+        result = result.model_response
+    return list(result.result)
+
+
+class MessageArchiveMiddleware(AgentMiddleware):
+    """Archive a thread's messages before any step that might drop them from
+    the checkpoint; see the module docstring.
+
+    Needs the graph's store, which Aegra provides; without one (e.g. a graph
+    compiled without a store) nothing is archived. Archiving is async only;
+    sync invocations archive nothing.
+
+    Archiving hooks into the run's start and model calls only: an
+    `after_model` hook would add a node behind the model, which a state-only
+    update (see `state_update.py`) would then leave pending.
+    """
+
+    async def _archive(
+        self, messages: Sequence[BaseMessage], store: BaseStore | None
+    ) -> None:
+        thread_id = get_config().get("configurable", {}).get("thread_id")
+        if store is None or thread_id is None:
+            return
+        await MessageArchive(store).append(str(thread_id), messages)
+
+    def before_agent(self, state: AgentState, runtime: Runtime) -> None:
+        return None
+
+    async def abefore_agent(self, state: AgentState, runtime: Runtime) -> None:
+        await self._archive(state["messages"], runtime.store)
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelCallResult:
+        return handler(request)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelCallResult:
+        # Before: the tool results written since the last call. After: the
+        # reply, which no later hook of this run would see.
+        messages = list(request.state["messages"])
+        await self._archive(messages, request.runtime.store)
+        result = await handler(request)
+        replies = _result_messages(result)
+        for reply in replies:
+            if reply.id is None:
+                # The id add_messages would otherwise assign when writing it.
+                reply.id = str(uuid4())
+        await self._archive(messages + replies, request.runtime.store)
+        return result
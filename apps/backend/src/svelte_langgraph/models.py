@@ -1,10 +1,47 @@
+"""Chat model configuration and the registry of models built from it.
+
+All model settings -- `CHAT_MODEL_NAME` / `CHAT_MODEL_KWARGS`, the
+`CHAT_MODEL_ROUTES` table, the fallback and hedging settings and stream
+coalescing -- are parsed and validated once into an immutable `ModelConfig`.
+The `ModelRegistry` pairs the current config with a `ModelSet` that builds
+each configured model on first use and reuses it afterwards.
+
+Settings come from the environment, overlaid with the JSON object in
+`MODEL_CONFIG_FILE` if set. `ModelRegistry.reload` re-reads them and, if they
+are valid, swaps in a new `ModelSet` in one assignment; a config that fails
+validation is logged and the current one kept. Runs that already started
+keep the `ModelSet` (and thus the models) they began with, so in-flight
+streams are never disturbed. Reloads are triggered by `SIGHUP` or by changes
+to `MODEL_CONFIG_FILE` (see `watch_model_config`), both set up by the web
+app's lifespan in `webapp.py`. Either way `reload` runs in a thread, since
+building the new models imports provider packages and creates their clients;
+the swap is a single assignment, so it's safe from there.
+"""
+
+import asyncio
 import json
+import logging
 import os
+import signal
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
 from typing import Any
 
 from langchain.chat_models import BaseChatModel, init_chat_model
 from langchain.chat_models.base import _BUILTIN_PROVIDERS
 
+from .hedging import DEFAULT_HEDGE_AFTER_MS, HedgedChatModel
+from .phase import Phase, validate_phase
+from .streaming import DEFAULT_MAX_CHARS, CoalescingChatModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = "gpt-4o-mini"
+DEFAULT_CONFIG_POLL_SECONDS = 2.0
+
 
 def _has_known_provider_prefix(model_name: str) -> bool:
     """Check whether `model_name` has a `{provider}:` prefix that langchain's
@@ -25,28 +62,306 @@ def _has_known_provider_prefix(model_name: str) -> bool:
 _RESERVED_CHAT_MODEL_KWARGS = {"model", "model_provider"}
 
 
-def get_chat_model() -> BaseChatModel:
-    model_name = os.getenv("CHAT_MODEL_NAME", "gpt-4o-mini")
-
-    raw_kwargs = os.getenv("CHAT_MODEL_KWARGS")
-    raw_kwargs = raw_kwargs.strip() if raw_kwargs else ""
-    kwargs: Any = json.loads(raw_kwargs) if raw_kwargs else {}
+def validate_model_kwargs(kwargs: object, source: str, name_source: str) -> dict:
+    """Check parsed model kwargs from `source` (e.g. `CHAT_MODEL_KWARGS`);
+    `name_source` is where the model and provider are selected instead."""
     if not isinstance(kwargs, dict):
-        raise ValueError(
-            f"CHAT_MODEL_KWARGS must be a JSON object, got {type(kwargs).__name__}"
-        )
+        raise ValueError(f"{source} must be a JSON object, got {type(kwargs).__name__}")
 
     reserved_keys_used = _RESERVED_CHAT_MODEL_KWARGS & kwargs.keys()
     if reserved_keys_used:
         offending_key = sorted(reserved_keys_used)[0]
         raise ValueError(
-            f"CHAT_MODEL_KWARGS must not include {offending_key!r}; select the "
-            "model and provider via CHAT_MODEL_NAME instead."
+            f"{source} must not include {offending_key!r}; select the "
+            f"model and provider via {name_source} instead."
+        )
+    return kwargs
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """A model name and the kwargs it is built with."""
+
+    name: str
+    kwargs: Mapping[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "kwargs", MappingProxyType(dict(self.kwargs)))
+
+    @property
+    def key(self) -> str:
+        return json.dumps([self.name, dict(self.kwargs)], sort_keys=True, default=str)
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    """Every model setting, parsed and validated."""
+
+    default: ModelSpec
+    routes: Mapping[Phase, ModelSpec] = field(default_factory=dict)
+    fallback: ModelSpec | None = None
+    hedge_after: float = DEFAULT_HEDGE_AFTER_MS / 1000
+    coalesce_window: float = 0.0
+    coalesce_max_chars: int = DEFAULT_MAX_CHARS
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "routes", MappingProxyType(dict(self.routes)))
+
+
+def _parse_model_kwargs(raw: str | None, source: str, name_source: str) -> dict:
+    raw = raw.strip() if raw else ""
+    kwargs: Any = json.loads(raw) if raw else {}
+    return validate_model_kwargs(kwargs, source, name_source)
+
+
+def parse_model_routes(raw: str) -> dict[Phase, ModelSpec]:
+    """Parse a `CHAT_MODEL_ROUTES` value: per phase, a model name or
+    `{"name": ..., "kwargs": {...}}` (see `routing.py`)."""
+    table: Any = json.loads(raw) if raw.strip() else {}
+    if not isinstance(table, dict):
+        raise ValueError(
+            f"CHAT_MODEL_ROUTES must be a JSON object, got {type(table).__name__}"
+        )
+
+    routes: dict[Phase, ModelSpec] = {}
+    for phase, spec in table.items():
+        source = f"CHAT_MODEL_ROUTES[{phase!r}]"
+        if isinstance(spec, str):
+            spec = {"name": spec}
+        if not isinstance(spec, dict) or not isinstance(spec.get("name"), str):
+            raise ValueError(
+                f"{source} must be a model name or an object with a 'name'"
+            )
+        unknown = sorted(spec.keys() - {"name", "kwargs"})
+        if unknown:
+            raise ValueError(f"{source} has unknown keys {unknown}")
+        kwargs = validate_model_kwargs(
+            spec.get("kwargs", {}), f"{source}['kwargs']", f"{source}['name']"
+        )
+        routes[validate_phase(phase)] = ModelSpec(spec["name"], kwargs)
+    return routes
+
+
+def parse_model_config(settings: Mapping[str, str]) -> ModelConfig:
+    """Build a `ModelConfig` from environment-style `settings`."""
+
+    def setting(name: str) -> str:
+        return (settings.get(name) or "").strip()
+
+    default = ModelSpec(
+        settings.get("CHAT_MODEL_NAME", DEFAULT_MODEL_NAME),
+        _parse_model_kwargs(
+            settings.get("CHAT_MODEL_KWARGS"), "CHAT_MODEL_KWARGS", "CHAT_MODEL_NAME"
+        ),
+    )
+
+    # Hedging is opt-in: with a fallback configured, a primary that is slow
+    # to its first token or fails outright is raced against the fallback.
+    fallback = None
+    if fallback_name := setting("CHAT_FALLBACK_MODEL_NAME"):
+        fallback = ModelSpec(
+            fallback_name,
+            _parse_model_kwargs(
+                settings.get("CHAT_FALLBACK_MODEL_KWARGS"),
+                "CHAT_FALLBACK_MODEL_KWARGS",
+                "CHAT_FALLBACK_MODEL_NAME",
+            ),
+        )
+    hedge_after_ms = float(setting("CHAT_HEDGE_AFTER_MS") or DEFAULT_HEDGE_AFTER_MS)
+
+    # Coalescing is off unless CHAT_STREAM_COALESCE_MS is a positive number of
+    # milliseconds; 20-50 ms keeps streaming visually smooth.
+    coalesce_ms = float(setting("CHAT_STREAM_COALESCE_MS") or 0)
+    raw_max_chars = setting("CHAT_STREAM_COALESCE_MAX_CHARS")
+
+    return ModelConfig(
+        default=default,
+        routes=parse_model_routes(setting("CHAT_MODEL_ROUTES")),
+        fallback=fallback,
+        hedge_after=hedge_after_ms / 1000,
+        coalesce_window=max(coalesce_ms, 0.0) / 1000,
+        coalesce_max_chars=int(raw_max_chars) if raw_max_chars else DEFAULT_MAX_CHARS,
+    )
+
+
+def read_model_settings() -> dict[str, str]:
+    """The environment, overlaid with the JSON object in `MODEL_CONFIG_FILE`.
+
+    Non-string values in the file (e.g. `CHAT_MODEL_KWARGS` written as an
+    object) are taken as their JSON encoding.
+    """
+    settings = dict(os.environ)
+    path = settings.get("MODEL_CONFIG_FILE", "").strip()
+    if path:
+        overrides: Any = json.loads(Path(path).read_text())
+        if not isinstance(overrides, dict):
+            raise ValueError(
+                f"MODEL_CONFIG_FILE must contain a JSON object, got "
+                f"{type(overrides).__name__}"
+            )
+        settings.update(
+            (k, v if isinstance(v, str) else json.dumps(v))
+            for k, v in overrides.items()
         )
+    return settings
+
+
+def _init_model(spec: ModelSpec) -> BaseChatModel:
+    kwargs = {"temperature": 0.9, **spec.kwargs}
+
+    if _has_known_provider_prefix(spec.name):
+        return init_chat_model(spec.name, **kwargs)
+    return init_chat_model(spec.name, model_provider="openai", **kwargs)
+
+
+class ModelSet:
+    """The models of one `ModelConfig`, each built on first use."""
+
+    def __init__(self, config: ModelConfig) -> None:
+        self.config = config
+        self._models: dict[ModelSpec, BaseChatModel] = {}
+        # Shared by every model that hedges, so they share its client.
+        self._fallback: BaseChatModel | None = None
+        # Warm-up's steps build models in two threads at once.
+        self._lock = threading.Lock()
+
+    def model(self, spec: ModelSpec | None = None) -> BaseChatModel:
+        """The model for `spec` (the default model if omitted), wrapped for
+        hedging and stream coalescing as configured."""
+        spec = spec or self.config.default
+        model = self._models.get(spec)
+        if model is None:
+            with self._lock:
+                model = self._models.get(spec)
+                if model is None:
+                    model = self._models[spec] = self._build(spec)
+        return model
+
+    def build_all(self) -> list[BaseChatModel]:
+        """Build the default model and every routed one, if not built yet."""
+        specs = [self.config.default, *self.config.routes.values()]
+        return [self.model(spec) for spec in dict.fromkeys(specs)]
+
+    def _build(self, spec: ModelSpec) -> BaseChatModel:
+        config = self.config
+        model = _init_model(spec)
+        if config.fallback is not None:
+            if self._fallback is None:
+                self._fallback = _init_model(config.fallback)
+            model = HedgedChatModel(
+                primary=model, fallback=self._fallback, hedge_after=config.hedge_after
+            )
+        if config.coalesce_window > 0:
+            model = CoalescingChatModel(
+                inner=model,
+                window=config.coalesce_window,
+                max_chars=config.coalesce_max_chars,
+            )
+        return model
+
+
+class ModelRegistry:
+    """Holds the current `ModelSet`; see the module docstring."""
+
+    def __init__(self, config: ModelConfig) -> None:
+        self._current = ModelSet(config)
+
+    @classmethod
+    def from_settings(cls) -> "ModelRegistry":
+        return cls(parse_model_config(read_model_settings()))
+
+    def current(self) -> ModelSet:
+        return self._current
+
+    def reload(self) -> bool:
+        """Re-read the settings and swap in a new `ModelSet` if they changed.
+
+        Returns whether a new config was swapped in; a config that doesn't
+        parse, or whose models can't be built (e.g. a provider whose package
+        isn't installed), is logged and leaves the current one in place.
+        """
+        try:
+            config = parse_model_config(read_model_settings())
+            if config == self._current.config:
+                return False
+            models = ModelSet(config)
+            models.build_all()
+        except Exception as e:
+            logger.error(f"Model config reload failed, keeping the current one: {e}")
+            return False
+        self._current = models
+        logger.info("Model config reloaded")
+        return True
 
-    kwargs.setdefault("temperature", 0.9)
 
-    if _has_known_provider_prefix(model_name):
-        return init_chat_model(model_name, **kwargs)
+_registry: ModelRegistry | None = None
 
-    return init_chat_model(model_name, model_provider="openai", **kwargs)
+
+def get_model_registry() -> ModelRegistry:
+    """The process-wide registry, loaded on first use."""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry.from_settings()
+    return _registry
+
+
+def reset_model_registry() -> None:
+    """Forget the registry, so the next use loads the settings afresh."""
+    global _registry
+    _registry = None
+
+
+def current_models() -> ModelSet:
+    return get_model_registry().current()
+
+
+def get_chat_model() -> BaseChatModel:
+    """The default chat model of the current config."""
+    return current_models().model()
+
+
+async def watch_model_config(
+    registry: ModelRegistry,
+    path: Path,
+    interval: float = DEFAULT_CONFIG_POLL_SECONDS,
+) -> None:
+    """Reload `registry` whenever `path`'s modification time changes; runs
+    until cancelled."""
+
+    def mtime() -> float | None:
+        try:
+            return path.stat().st_mtime
+        except OSError:
+            return None
+
+    last = mtime()
+    while True:
+        await asyncio.sleep(interval)
+        current = mtime()
+        if current != last:
+            last = current
+            await asyncio.to_thread(registry.reload)
+
+
+# Reloads started by `SIGHUP`, kept so they aren't garbage collected.
+_signal_reloads: set[asyncio.Task] = set()
+
+
+def install_reload_signal(registry: ModelRegistry) -> bool:
+    """Reload `registry` on `SIGHUP`. Returns whether the handler could be
+    installed (not on Windows, nor outside the main thread)."""
+    loop = asyncio.get_running_loop()
+
+    def reload() -> None:
+        task = loop.create_task(asyncio.to_thread(registry.reload))
+        _signal_reloads.add(task)
+        task.add_done_callback(_signal_reloads.discard)
+
+    try:
+        loop.add_signal_handler(signal.SIGHUP, reload)
+    except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+        return False
+    return True
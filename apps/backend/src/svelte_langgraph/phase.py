@@ -4,8 +4,21 @@ Lives in its own module so both graph.py and tools.py can import it without
 creating an import cycle.
 """
 
-from typing import Literal, get_args
+from typing import Literal, cast, get_args
 
 Phase = Literal["research", "draft", "review"]
 VALID_PHASES: frozenset[str] = frozenset(get_args(Phase))
 DEFAULT_PHASE: Phase = "research"
+
+
+def validate_phase(phase: object) -> Phase:
+    """Return `phase` narrowed to `Phase`, or raise ValueError if it isn't one.
+
+    Shared by `phase_gate` (run path) and `state_update` (state-only path) so
+    both reject exactly the same values with exactly the same message.
+    """
+    if phase not in VALID_PHASES:
+        raise ValueError(
+            f"Invalid phase {phase!r}. Must be one of: {sorted(VALID_PHASES)}"
+        )
+    return cast(Phase, phase)
@@ -0,0 +1,117 @@
+"""Phase-scoped tool binding.
+
+Every tool schema bound to a model call is paid for in prompt tokens on every
+turn, and the more tools the model is offered, the longer it takes to pick
+one. A tool's `ToolPolicy.phases` names the phases it is offered in;
+`PhaseToolsMiddleware` narrows each model call's tools to those of the
+current `phase` in state, plus `ALWAYS_AVAILABLE_TOOLS`.
+
+The narrowed tools are passed on as provider-ready (OpenAI-format) schemas,
+serialized once per phase and tool set and cached for the process, so
+binding them no longer rebuilds every schema from the tool's Pydantic model
+on each call. `prepare_tool_schemas` fills the cache for the agent's tools at
+server startup (see `warmup.py`). All tools stay registered with the tools
+node: a call of a tool the current phase doesn't offer (e.g. from a message
+written in an earlier phase) still runs.
+"""
+
+import json
+from collections.abc import Awaitable, Callable, Hashable, Mapping, Sequence
+from typing import Any, cast
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import (
+    ModelCallResult,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from svelte_langgraph.phase import DEFAULT_PHASE, VALID_PHASES, Phase
+from svelte_langgraph.tools import (
+    ALWAYS_AVAILABLE_TOOLS,
+    DEFAULT_TOOL_POLICY,
+    ToolPolicy,
+    get_tool_policies,
+    get_tools,
+)
+
+# Serialized tool lists by (phase, tools); a handful of entries per process.
+_schema_cache: dict[tuple[Hashable, ...], list[dict[str, Any]]] = {}
+
+
+def offered_in(phase: Phase, name: str, policy: ToolPolicy) -> bool:
+    return (
+        name in ALWAYS_AVAILABLE_TOOLS
+        or policy.phases is None
+        or phase in policy.phases
+    )
+
+
+def _tool_key(tool: BaseTool | dict[str, Any]) -> Hashable:
+    if isinstance(tool, dict):
+        return json.dumps(tool, sort_keys=True)
+    # The function behind the tool, not the tool object: create_agent builds
+    # new tool objects for every graph, the functions stay the same.
+    return (tool.name, getattr(tool, "coroutine", None) or getattr(tool, "func", None))
+
+
+def phase_tool_schemas(
+    phase: Phase,
+    tools: Sequence[BaseTool | dict[str, Any]],
+    policies: Mapping[str, ToolPolicy],
+) -> list[dict[str, Any]]:
+    """OpenAI-format schemas of the `tools` offered in `phase`, cached."""
+    key = (phase, *(_tool_key(tool) for tool in tools))
+    schemas = _schema_cache.get(key)
+    if schemas is None:
+        schemas = _schema_cache[key] = [
+            tool if isinstance(tool, dict) else convert_to_openai_tool(tool)
+            for tool in tools
+            if isinstance(tool, dict)
+            or offered_in(
+                phase, tool.name, policies.get(tool.name, DEFAULT_TOOL_POLICY)
+            )
+        ]
+    return schemas
+
+
+def prepare_tool_schemas() -> None:
+    """Serialize the agent's tools for every phase ahead of the first run,
+    e.g. at server startup."""
+    tools, policies = get_tools(), get_tool_policies()
+    for phase in sorted(VALID_PHASES):
+        phase_tool_schemas(cast(Phase, phase), tools, policies)
+
+
+def clear_tool_schema_cache() -> None:
+    _schema_cache.clear()
+
+
+class PhaseToolsMiddleware(AgentMiddleware):
+    """Offer each model call only the tools of the current phase, as cached
+    schemas; see the module docstring."""
+
+    def __init__(self, policies: Mapping[str, ToolPolicy]) -> None:
+        super().__init__()
+        self._policies = policies
+
+    def _narrow(self, request: ModelRequest) -> ModelRequest:
+        phase = cast(Phase, request.state.get("phase") or DEFAULT_PHASE)
+        schemas = phase_tool_schemas(phase, request.tools, self._policies)
+        return request.override(tools=list(schemas))
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelCallResult:
+        return handler(self._narrow(request))
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelCallResult:
+        return await handler(self._narrow(request))
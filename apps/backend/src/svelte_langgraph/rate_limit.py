@@ -0,0 +1,411 @@
+"""Rate limiting of model calls, per user and process-wide, and coordinated
+backoff on provider 429s.
+
+Token buckets cap requests and tokens per minute for each user (the
+authenticated `ctx.user.identity`, which Aegra passes to runs as
+`configurable.langgraph_auth_user`; not `configurable.user_id`, which Aegra
+only defaults and clients can set to anything) and for the whole process:
+
+- `LLM_RATE_LIMIT_USER_RPM` / `LLM_RATE_LIMIT_USER_TPM`
+- `LLM_RATE_LIMIT_GLOBAL_RPM` / `LLM_RATE_LIMIT_GLOBAL_TPM`
+
+Unset or 0 means unlimited. A call reserves one request and an estimate of
+its prompt tokens up front, and is charged the rest of its actual token usage
+once it returns. A call cancelled or failing before it reaches the provider
+gets its reservation back; one failing at the provider only its tokens. A
+call that would have to wait longer than `LLM_RATE_LIMIT_MAX_WAIT_S` (default
+30) for its reservation doesn't reach the model at all: the run ends with an
+AI message, asking the user to slow down if their own limits are the reason
+(so one user scripting hundreds of messages only ever throttles themselves),
+or saying the assistant is busy if it's the global ones.
+
+Provider 429s are coordinated through one process-wide `ProviderBackoff`.
+The first run to get one sets a pause from the response's `Retry-After`
+(exponential backoff without one, doubling only for 429s of calls started
+after the previous pause); every run waits out that pause before its next
+call, then retries, up to `LLM_RATE_LIMIT_MAX_RETRIES` (default 3) times.
+The process thus backs off once instead of each run retrying on its own. A
+pause longer than `LLM_RATE_LIMIT_MAX_WAIT_S` ends the run with the busy
+message instead.
+Provider clients retry 429s themselves too; set `"max_retries": 0` in
+`CHAT_MODEL_KWARGS` to leave retrying to this module alone.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import (
+    ModelCallResult,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain_core.messages import AIMessage
+from langgraph.config import get_config
+
+DEFAULT_MAX_WAIT_S = 30.0
+DEFAULT_MAX_RETRIES = 3
+# Cap on idle per-user buckets kept around; full (idle) ones are dropped.
+MAX_USER_BUCKETS = 4096
+# Backoff without a Retry-After: 1, 2, 4, ... seconds, at most 60.
+BASE_BACKOFF_S = 1.0
+MAX_BACKOFF_S = 60.0
+# Rough prompt-size estimate used until the provider reports usage.
+CHARS_PER_TOKEN = 4
+
+RATE_LIMITED_MESSAGE = (
+    "You're sending messages faster than I can answer them. "
+    "Please wait a moment and try again."
+)
+BUSY_MESSAGE = (
+    "I'm answering too many messages at the moment to get to yours. "
+    "Please try again in a minute."
+)
+
+
+class TokenBucket:
+    """Refills at `per_minute` per minute up to `per_minute`.
+
+    Reservations may take the bucket below zero; the deficit is the wait
+    before the reservation is covered, so waiters are served in order.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount`, returning the seconds until it is covered."""
+        self._refill()
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class _Limits:
+    scope: str  # "user" or "global"
+    rpm: float | None
+    tpm: float | None
+    buckets: dict[str, TokenBucket] = field(default_factory=dict)
+
+    def reserve(self, tokens: float) -> tuple[float, list[tuple[TokenBucket, float]]]:
+        """Reserve one request and `tokens`; the wait and what to refund."""
+        taken: list[tuple[TokenBucket, float]] = []
+        wait = 0.0
+        for kind, limit, amount in (("rpm", self.rpm, 1.0), ("tpm", self.tpm, tokens)):
+            if not limit:
+                continue
+            bucket = self.buckets.get(kind)
+            if bucket is None:
+                bucket = self.buckets[kind] = TokenBucket(limit)
+            wait = max(wait, bucket.reserve(amount))
+            taken.append((bucket, amount))
+        return wait, taken
+
+    def release(self, tokens: float) -> None:
+        """Give back one request and `tokens`."""
+        for kind, amount in (("rpm", 1.0), ("tpm", tokens)):
+            bucket = self.buckets.get(kind)
+            if bucket is not None:
+                bucket.refund(amount)
+
+    def charge(self, tokens: float) -> None:
+        """Adjust the token bucket by `tokens` (negative refunds)."""
+        bucket = self.buckets.get("tpm")
+        if bucket is not None:
+            if tokens >= 0:
+                bucket.reserve(tokens)
+            else:
+                bucket.refund(-tokens)
+
+    @property
+    def idle(self) -> bool:
+        return all(bucket.full for bucket in self.buckets.values())
+
+
+def _parse_limit(name: str) -> float | None:
+    raw = os.getenv(name, "").strip()
+    return float(raw) if raw and float(raw) > 0 else None
+
+
+class RateLimiter:
+    """Per-user and global token buckets; see the module docstring."""
+
+    def __init__(
+        self,
+        user_rpm: float | None = None,
+        user_tpm: float | None = None,
+        global_rpm: float | None = None,
+        global_tpm: float | None = None,
+        max_wait: float = DEFAULT_MAX_WAIT_S,
+    ) -> None:
+        self.user_rpm = user_rpm
+        self.user_tpm = user_tpm
+        self.max_wait = max_wait
+        self._global = _Limits("global", global_rpm, global_tpm)
+        self._users: dict[str, _Limits] = {}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        raw_max_wait = os.getenv("LLM_RATE_LIMIT_MAX_WAIT_S", "").strip()
+        return cls(
+            user_rpm=_parse_limit("LLM_RATE_LIMIT_USER_RPM"),
+            user_tpm=_parse_limit("LLM_RATE_LIMIT_USER_TPM"),
+            global_rpm=_parse_limit("LLM_RATE_LIMIT_GLOBAL_RPM"),
+            global_tpm=_parse_limit("LLM_RATE_LIMIT_GLOBAL_TPM"),
+            max_wait=float(raw_max_wait) if raw_max_wait else DEFAULT_MAX_WAIT_S,
+        )
+
+    def _user_limits(self, user: str) -> _Limits:
+        limits = self._users.get(user)
+        if limits is None:
+            if len(self._users) >= MAX_USER_BUCKETS:
+                self._users = {u: lim for u, lim in self._users.items() if not lim.idle}
+            limits = self._users[user] = _Limits("user", self.user_rpm, self.user_tpm)
+        return limits
+
+    def _scopes(self, user: str | None) -> list[_Limits]:
+        scopes = [self._global]
+        if user is not None and (self.user_rpm or self.user_tpm):
+            # The user's own limits first: a user over them then never takes
+            # global capacity.
+            scopes.insert(0, self._user_limits(user))
+        return scopes
+
+    async def acquire(self, user: str | None, tokens: float) -> str | None:
+        """Wait for one request and `tokens` of `user`'s and the global
+        budget. If that would take longer than `max_wait`, reserves nothing
+        and returns the scope (`"user"` or `"global"`) that is over; None once
+        reserved."""
+        wait = 0.0
+        taken: list[tuple[TokenBucket, float]] = []
+        try:
+            for limits in self._scopes(user):
+                scope_wait, scope_taken = limits.reserve(tokens)
+                taken += scope_taken
+                wait = max(wait, scope_wait)
+                if wait > self.max_wait:
+                    for bucket, amount in taken:
+                        bucket.refund(amount)
+                    return limits.scope
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            for bucket, amount in taken:
+                bucket.refund(amount)
+            raise
+        return None
+
+    def release(self, user: str | None, tokens: float) -> None:
+        """Give back a reservation whose call never reached the provider."""
+        for limits in self._scopes(user):
+            limits.release(tokens)
+
+    def charge(self, user: str | None, tokens: float) -> None:
+        """Correct the token budgets by `tokens` once actual usage is known."""
+        for limits in self._scopes(user):
+            limits.charge(tokens)
+
+
+def retry_after(error: BaseException) -> float | None:
+    """Seconds a provider's 429 asks to wait, from `retry-after-ms` or
+    `Retry-After` (seconds or an HTTP date)."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+    raw_ms = headers.get("retry-after-ms")
+    if raw_ms:
+        try:
+            return float(raw_ms) / 1000
+        except ValueError:
+            pass
+    raw = headers.get("retry-after")
+    if not raw:
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    if getattr(error, "status_code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+class ProviderBackoff:
+    """The process-wide pause after a provider 429; see the module docstring."""
+
+    def __init__(self) -> None:
+        self.until = 0.0
+        self._streak = 0
+        self._pause = 0.0  # The latest pause set without a Retry-After.
+
+    def delay(self) -> float:
+        return max(0.0, self.until - time.monotonic())
+
+    async def wait(self) -> None:
+        while (delay := self.delay()) > 0:
+            await asyncio.sleep(delay)
+
+    def rate_limited(self, error: BaseException, started: float) -> None:
+        """Record a 429 of a call started at `started` (`time.monotonic()`);
+        extends the pause, never shortens it.
+
+        Without a Retry-After, the pause doubles only for a call started
+        after the current pause ended: the calls that were in flight together
+        all hit the same limit, and one episode backs off once.
+        """
+        pause = retry_after(error)
+        if pause is None:
+            if started >= self.until:
+                self._pause = min(MAX_BACKOFF_S, BASE_BACKOFF_S * 2**self._streak)
+                self._streak += 1
+            pause = self._pause
+        self.until = max(self.until, time.monotonic() + pause)
+
+    def succeeded(self) -> None:
+        self._streak = 0
+
+
+_rate_limiter: RateLimiter | None = None
+provider_backoff = ProviderBackoff()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """The process-wide limiter, configured from the environment on first use."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter.from_env()
+    return _rate_limiter
+
+
+def reset_rate_limits() -> None:
+    """Drop all buckets and any backoff; the next use reads the environment."""
+    global _rate_limiter, provider_backoff
+    _rate_limiter = None
+    provider_backoff = ProviderBackoff()
+
+
+def _estimate_tokens(request: ModelRequest) -> int:
+    chars = sum(len(message.text) for message in request.messages)
+    if request.system_message is not None:
+        chars += len(request.system_message.text)
+    return math.ceil(chars / CHARS_PER_TOKEN)
+
+
+def _used_tokens(result: ModelCallResult) -> int | None:
+    messages: list[Any] = (
+        [result] if isinstance(result, AIMessage) else getattr(result, "result", [])
+    )
+    for message in reversed(messages):
+        if isinstance(message, AIMessage) and message.usage_metadata:
+            return message.usage_metadata.get("total_tokens")
+    return None
+
+
+def _authenticated_user() -> str | None:
+    """The identity of the user the run was authenticated as, if any."""
+    user = get_config().get("configurable", {}).get("langgraph_auth_user")
+    if isinstance(user, Mapping):
+        identity = user.get("identity")
+    else:
+        identity = getattr(user, "identity", None)
+    return identity if isinstance(identity, str) else None
+
+
+class RateLimitMiddleware(AgentMiddleware):
+    """Throttle model calls per user and globally, and back off together on
+    provider 429s; see the module docstring."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        raw_retries = os.getenv("LLM_RATE_LIMIT_MAX_RETRIES", "").strip()
+        self.max_retries = int(raw_retries) if raw_retries else DEFAULT_MAX_RETRIES
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelCallResult:
+        # Waiting needs the event loop; sync invocations run unthrottled.
+        return handler(request)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelCallResult:
+        limiter = get_rate_limiter()
+        user = _authenticated_user()
+        estimate = _estimate_tokens(request)
+        over = await limiter.acquire(user, estimate)
+        if over is not None:
+            return AIMessage(RATE_LIMITED_MESSAGE if over == "user" else BUSY_MESSAGE)
+
+        attempt = 0
+        sent = False
+
+        def give_back() -> None:
+            # No usage to charge for; a request that reached the provider
+            # still counts.
+            if sent:
+                limiter.charge(user, -estimate)
+            else:
+                limiter.release(user, estimate)
+
+        try:
+            while True:
+                if provider_backoff.delay() > limiter.max_wait:
+                    give_back()
+                    return AIMessage(BUSY_MESSAGE)
+                await provider_backoff.wait()
+                started = time.monotonic()
+                sent = True
+                try:
+                    result = await handler(request)
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                        raise
+                    provider_backoff.rate_limited(e, started)
+                    attempt += 1
+                    continue
+                break
+        except BaseException:
+            give_back()
+            raise
+        provider_backoff.succeeded()
+        used = _used_tokens(result)
+        if used is not None:
+            limiter.charge(user, used - estimate)
+        return result
@@ -14,9 +14,19 @@ deterministically to the most recently produced one instead of raising.
 `executor.map` preserves `tool_calls` order, so "last" here means the last
 tool call in the assistant message's `tool_calls` list -- matching the
 intuitive reading of e.g. "switch to draft, then switch to review".
+
+`bounded_messages` replaces the default `add_messages` reducer of `messages`
+to keep checkpoints from growing with the thread: it keeps only the most
+recent `CHECKPOINT_MAX_MESSAGES` messages, the rest living on in the message
+archive (see `message_archive.py`).
 """
 
-from typing import TypeVar
+import os
+from collections.abc import Sequence
+from typing import TypeVar, cast
+
+from langchain_core.messages import AnyMessage, ToolMessage
+from langgraph.graph.message import Messages, add_messages
 
 T = TypeVar("T")
 
@@ -37,3 +47,51 @@ def last_value(_left: T, right: T) -> T:
     the accumulated value by definition.
     """
     return right
+
+
+def checkpoint_max_messages() -> int | None:
+    """`CHECKPOINT_MAX_MESSAGES`, the number of messages a thread's checkpoint
+    keeps; None (unbounded) when unset."""
+    raw = os.getenv("CHECKPOINT_MAX_MESSAGES", "").strip()
+    if not raw:
+        return None
+    value = int(raw)
+    if value < 1:
+        raise ValueError(f"CHECKPOINT_MAX_MESSAGES must be positive, got {raw!r}")
+    return value
+
+
+def keep_recent(
+    messages: Sequence[AnyMessage], max_messages: int, keep_last: int = 0
+) -> list[AnyMessage]:
+    """The most recent `max_messages` of `messages`, but always at least the
+    last `keep_last` ones.
+
+    The cut never separates `ToolMessage`s from the AI message whose tool
+    calls they answer: if it would fall inside such a group, the whole group
+    is kept, so the result may run a little over `max_messages`.
+    """
+    cut = min(len(messages) - max_messages, len(messages) - keep_last)
+    if cut <= 0:
+        return list(messages)
+    while cut > 0 and isinstance(messages[cut], ToolMessage):
+        cut -= 1
+    return list(messages[cut:])
+
+
+def bounded_messages(left: Messages, right: Messages) -> list[AnyMessage]:
+    """Reducer: `add_messages`, then drop the oldest messages beyond
+    `CHECKPOINT_MAX_MESSAGES` (see `keep_recent`).
+
+    Only messages that were already in the channel are dropped, never the
+    ones being written, so `MessageArchiveMiddleware` (see
+    `message_archive.py`) has seen every dropped message in an earlier step
+    and archived it. A reducer can't archive them itself: LangGraph applies
+    writes outside any runnable context, so the thread isn't known here.
+    """
+    merged = cast(list[AnyMessage], add_messages(left, right))
+    max_messages = checkpoint_max_messages()
+    if max_messages is None:
+        return merged
+    written = len(right) if isinstance(right, list) else 1
+    return keep_recent(merged, max_messages, keep_last=written)
@@ -0,0 +1,173 @@
+"""Per-phase model routing and usage reporting.
+
+The phases have different needs: quick research back-and-forth is fine on a
+cheap, fast model, while drafting can justify a bigger one. `CHAT_MODEL_ROUTES`
+maps phases to models as a JSON object, each value either a model name or
+`{"name": ..., "kwargs": {...}}` with the same meaning as `CHAT_MODEL_NAME` /
+`CHAT_MODEL_KWARGS`:
+
+    CHAT_MODEL_ROUTES='{"research": "gpt-4o-mini",
+                        "draft": {"name": "gpt-4o", "kwargs": {"temperature": 0.7}}}'
+
+Phases without a route use the default model. `ModelRoutingMiddleware` picks
+the route from the `phase` in state on every model call, so a `change_phase`
+takes effect on the very next call of the same run. The table is part of the
+model config (see `models.py`): parsed once, and its models built once per
+route and reused.
+
+Every model call's latency and token usage are recorded per phase and model
+(by name, routed or not, so a reload that changes the default model starts
+new totals) in `model_usage`, served at `GET /model-usage` (see `webapp.py`), so routing
+decisions can be measured.
+"""
+
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Any, cast
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import (
+    ExtendedModelResponse,
+    ModelCallResult,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain_core.messages import AIMessage
+
+from svelte_langgraph.models import ModelSet
+from svelte_langgraph.phase import DEFAULT_PHASE, Phase
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelUsage:
+    """Totals for the model calls of one phase on one model."""
+
+    calls: int = 0
+    errors: int = 0
+    latency_seconds: float = 0.0
+    max_latency_seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        ok = self.calls - self.errors
+        return {
+            **asdict(self),
+            "mean_latency_seconds": self.latency_seconds / self.calls
+            if self.calls
+            else 0.0,
+            "mean_output_tokens": self.output_tokens / ok if ok else 0.0,
+        }
+
+
+class ModelUsageStats:
+    """Process-wide model call totals, by phase and model."""
+
+    def __init__(self) -> None:
+        self._usage: dict[tuple[str, str], ModelUsage] = {}
+
+    def record(
+        self,
+        phase: str,
+        model: str,
+        latency: float,
+        message: AIMessage | None,
+        error: bool = False,
+    ) -> None:
+        usage = self._usage.setdefault((phase, model), ModelUsage())
+        usage.calls += 1
+        usage.errors += error
+        usage.latency_seconds += latency
+        usage.max_latency_seconds = max(usage.max_latency_seconds, latency)
+        if message is not None and message.usage_metadata:
+            usage.input_tokens += message.usage_metadata.get("input_tokens", 0)
+            usage.output_tokens += message.usage_metadata.get("output_tokens", 0)
+
+    def get(self, phase: str, model: str) -> ModelUsage | None:
+        return self._usage.get((phase, model))
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        return [
+            {"phase": phase, "model": model, **usage.as_dict()}
+            for (phase, model), usage in sorted(self._usage.items())
+        ]
+
+    def clear(self) -> None:
+        self._usage.clear()
+
+
+model_usage = ModelUsageStats()
+
+
+def _ai_message(result: ModelCallResult) -> AIMessage | None:
+    if isinstance(result, AIMessage):
+        return result
+    if isinstance(result, ExtendedModelResponse):
+        result = result.model_response
+    return next((m for m in reversed(result.result) if isinstance(m, AIMessage)), None)
+
+
+def model_label(models: ModelSet, phase: str) -> str:
+    """How calls in `phase` are labelled by model: the name of the model
+    they run on, routed or the default."""
+    return (models.config.routes.get(cast(Phase, phase)) or models.config.default).name
+
+
+class ModelRoutingMiddleware(AgentMiddleware):
+    """Route each model call by the current phase and record its usage; see
+    the module docstring.
+
+    Routes come from `models`, the `ModelSet` current when the graph was
+    built, so a config reload never switches models halfway through a run.
+    """
+
+    def __init__(self, models: ModelSet) -> None:
+        super().__init__()
+        self._models = models
+
+    def _route(self, request: ModelRequest) -> tuple[ModelRequest, str, str]:
+        phase = cast(str, request.state.get("phase") or DEFAULT_PHASE)
+        route = self._models.config.routes.get(cast(Phase, phase))
+        if route is None:
+            return request, phase, self._models.config.default.name
+        return request.override(model=self._models.model(route)), phase, route.name
+
+    def _record(
+        self, phase: str, model: str, start: float, result: ModelCallResult | None
+    ) -> None:
+        latency = time.perf_counter() - start
+        message = _ai_message(result) if result is not None else None
+        model_usage.record(phase, model, latency, message, error=result is None)
+        logger.debug("Model call in phase %s on %s took %.3fs", phase, model, latency)
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelCallResult:
+        request, phase, model = self._route(request)
+        start = time.perf_counter()
+        result: ModelCallResult | None = None
+        try:
+            result = handler(request)
+            return result
+        finally:
+            self._record(phase, model, start, result)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelCallResult:
+        request, phase, model = self._route(request)
+        start = time.perf_counter()
+        result: ModelCallResult | None = None
+        try:
+            result = await handler(request)
+            return result
+        finally:
+            self._record(phase, model, start, result)
@@ -0,0 +1,278 @@
+"""Speculative tool execution while the model is still streaming.
+
+`create_agent` only runs tools once the whole assistant message has streamed,
+so when the model emits several tool calls (or tool calls followed by text)
+the first call sits idle until the last token. `SpeculativeToolMiddleware`
+watches the model's streamed chunks and starts each call to a tool whose
+`ToolPolicy.speculative` is set as soon as its arguments parse as a complete
+JSON object.
+
+Results are not written anywhere early. The tools node still runs every tool
+call of the finished message, in `tool_calls` order; for a call that was
+started early it awaits the speculative result instead of starting the tool
+again. Ordering -- and thus `last_value` resolution of state writes such as
+`change_phase` -- is exactly that of a non-speculative run. If the model call
+fails, or the finished message doesn't contain a speculated call with the same
+arguments, the speculative execution is cancelled.
+
+Speculation needs the model to stream, which is the case for server runs
+(`stream_mode="messages"`); a non-streamed call simply doesn't speculate.
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import UUID
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import (
+    ModelCallResult,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolCall, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk, GenerationChunk
+from langchain_core.tools import BaseTool
+from langchain_core.tools import tool as create_tool
+from langchain_core.tracers.context import register_configure_hook
+from langgraph.config import get_config
+from langgraph.prebuilt.tool_node import ToolCallRequest
+from langgraph.types import Command
+from pydantic import ValidationError
+
+from svelte_langgraph.tool_cache import run_cached
+from svelte_langgraph.tool_limits import run_with_policy
+from svelte_langgraph.tools import DEFAULT_TOOL_POLICY, ToolPolicy
+
+# How long a finished model call's speculative results wait for the tools node
+# before being dropped. The tools node normally runs right after the model
+# node; this only bounds what a run that dies in between can leave behind.
+CLAIM_TIMEOUT = 60.0
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+def speculative_tools_enabled() -> bool:
+    """Whether `TOOL_SPECULATIVE_EXECUTION` opts in to speculation."""
+    return os.getenv("TOOL_SPECULATIVE_EXECUTION", "").strip().lower() in _TRUE_VALUES
+
+
+@dataclass
+class _PartialToolCall:
+    id: str | None = None
+    name: str | None = None
+    args: str = ""
+    dispatched: bool = False
+
+    def complete_args(self) -> dict[str, Any] | None:
+        """The arguments, if they already form a complete JSON object."""
+        # Cheap pre-check: a JSON object can only be complete once it ends in
+        # `}`, so most chunks skip the parse entirely.
+        if not self.args.rstrip().endswith("}"):
+            return None
+        try:
+            args = json.loads(self.args)
+        except json.JSONDecodeError:
+            return None
+        return args if isinstance(args, dict) else None
+
+
+class _ToolCallCollector(AsyncCallbackHandler):
+    """Assembles streamed tool-call chunks and dispatches each call once its
+    arguments are complete."""
+
+    def __init__(self, dispatch: Callable[[ToolCall], None]) -> None:
+        self._dispatch = dispatch
+        self._partial: dict[tuple[UUID, int | str], _PartialToolCall] = {}
+        self.dispatched: list[str] = []
+
+    async def on_llm_new_token(
+        self,
+        token: str | list[str | dict[str, Any]],
+        *,
+        chunk: GenerationChunk | ChatGenerationChunk | None = None,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        if not isinstance(chunk, ChatGenerationChunk):
+            return
+        message = chunk.message
+        if not isinstance(message, AIMessageChunk):
+            return
+
+        for tc in message.tool_call_chunks:
+            # Chunks of one call share an index; only the first carries the
+            # id and name.
+            index = tc.get("index")
+            key = (run_id, index if index is not None else tc.get("id") or "")
+            partial = self._partial.setdefault(key, _PartialToolCall())
+            partial.id = partial.id or tc.get("id")
+            partial.name = partial.name or tc.get("name")
+            partial.args += tc.get("args") or ""
+            if partial.dispatched or partial.id is None or partial.name is None:
+                continue
+
+            args = partial.complete_args()
+            if args is not None:
+                partial.dispatched = True
+                self.dispatched.append(partial.id)
+                self._dispatch(ToolCall(name=partial.name, args=args, id=partial.id))
+
+
+# Set for the duration of a model call; LangChain's callback configuration
+# then attaches the collector to the model run without touching its config.
+_collector: contextvars.ContextVar[_ToolCallCollector | None] = contextvars.ContextVar(
+    "speculative_tool_collector", default=None
+)
+register_configure_hook(_collector, inheritable=True)
+
+
+@dataclass
+class _Speculation:
+    args: dict[str, Any]
+    task: asyncio.Task[Any]
+    expiry: asyncio.TimerHandle | None = field(default=None)
+
+    def cancel(self) -> None:
+        self.task.cancel()
+        if self.task.done() and not self.task.cancelled():
+            # Already finished: mark a failure as retrieved so asyncio doesn't
+            # log it as unhandled; nobody will claim it.
+            self.task.exception()
+        if self.expiry is not None:
+            self.expiry.cancel()
+
+
+def _final_tool_calls(response: ModelCallResult) -> list[ToolCall]:
+    messages = response.result if isinstance(response, ModelResponse) else [response]
+    return [
+        tc
+        for message in messages
+        if isinstance(message, AIMessage)
+        for tc in message.tool_calls
+    ]
+
+
+class SpeculativeToolMiddleware(AgentMiddleware):
+    """Start speculative-policy tools while their tool call is still streaming;
+    see the module docstring."""
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool | Callable],
+        policies: Mapping[str, ToolPolicy],
+    ) -> None:
+        super().__init__()
+        self._tools: dict[str, tuple[BaseTool, ToolPolicy]] = {}
+        for t in tools:
+            base_tool = t if isinstance(t, BaseTool) else create_tool(t)
+            policy = policies.get(base_tool.name, DEFAULT_TOOL_POLICY)
+            if policy.speculative:
+                self._tools[base_tool.name] = (base_tool, policy)
+        # Speculations by thread and tool call id, from dispatch until the
+        # tools node claims them. Some providers (and the mock) number call
+        # ids per response, e.g. `call_0`, so the id alone would let
+        # concurrent runs sharing this middleware claim each other's results.
+        self._pending: dict[tuple[str | None, str], _Speculation] = {}
+
+    def _dispatch(self, call: ToolCall, thread_id: str | None) -> None:
+        entry = self._tools.get(call["name"])
+        call_id = call["id"]
+        if entry is None or call_id is None:
+            return
+        tool, policy = entry
+        # Run the tool outside the collector's context so its own callback
+        # runs don't pick the collector up. It goes through the cache and its
+        # policy's limits, exactly as in the tools node.
+        context = contextvars.copy_context()
+        context.run(_collector.set, None)
+        task = asyncio.create_task(
+            run_cached(
+                call,
+                tool,
+                policy,
+                lambda: run_with_policy(
+                    call,
+                    policy,
+                    thread_id,
+                    lambda: tool.ainvoke({**call, "type": "tool_call"}),
+                ),
+            ),
+            context=context,
+        )
+        self._pending[thread_id, call_id] = _Speculation(args=call["args"], task=task)
+
+    def _discard(self, key: tuple[str | None, str]) -> None:
+        speculation = self._pending.pop(key, None)
+        if speculation is not None:
+            speculation.cancel()
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelCallResult:
+        # Speculation needs the event loop; sync invocations run unchanged.
+        return handler(request)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelCallResult:
+        thread_id = get_config().get("configurable", {}).get("thread_id")
+        collector = _ToolCallCollector(lambda call: self._dispatch(call, thread_id))
+        token = _collector.set(collector)
+        try:
+            response = await handler(request)
+        except BaseException:
+            for call_id in collector.dispatched:
+                self._discard((thread_id, call_id))
+            raise
+        finally:
+            _collector.reset(token)
+
+        final_args = {tc["id"]: tc["args"] for tc in _final_tool_calls(response)}
+        loop = asyncio.get_running_loop()
+        for call_id in collector.dispatched:
+            key = (thread_id, call_id)
+            speculation = self._pending.get(key)
+            if speculation is None:
+                continue
+            if final_args.get(call_id) != speculation.args:
+                self._discard(key)
+            else:
+                speculation.expiry = loop.call_later(CLAIM_TIMEOUT, self._discard, key)
+        return response
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        return handler(request)
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        call_id = request.tool_call["id"]
+        thread_id = request.runtime.config.get("configurable", {}).get("thread_id")
+        speculation = self._pending.pop((thread_id, call_id), None) if call_id else None
+        if speculation is None:
+            return await handler(request)
+        if speculation.expiry is not None:
+            speculation.expiry.cancel()
+
+        try:
+            return await speculation.task
+        except ValidationError:
+            # The arguments didn't validate, so the tool never ran; let the
+            # regular path turn that into its usual error ToolMessage.
+            return await handler(request)
@@ -0,0 +1,62 @@
+"""State-only writes that bypass the run lifecycle.
+
+A phase change from the frontend used to go through a full run: Aegra queues
+it, loads the checkpoint, executes `phase_gate`, sees `state_only_submit` and
+jumps to end. `apply_state_update` instead writes the validated values
+straight to the checkpoint with `aupdate_state`, so they go through the same
+channel reducers (`last_value` for `phase`) as a write from a node, without
+scheduling a run, entering the agent node or binding a model.
+"""
+
+from collections.abc import Mapping
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.pregel import Pregel
+
+from svelte_langgraph.phase import validate_phase
+
+# Fields a client may write without a run. Anything else (notably `messages`)
+# must go through a real run so the agent sees it.
+STATE_SYNC_FIELDS: frozenset[str] = frozenset({"phase"})
+
+# The write is attributed to the model node. Its outgoing edge only routes to
+# `tools` when the last message carries tool calls, so on a settled thread the
+# resulting checkpoint has no pending `next` tasks -- exactly like the end of a
+# `state_only_submit` run. Attributing it to `phase_gate` (or letting LangGraph
+# pick on a fresh thread) would leave the model node pending instead.
+STATE_UPDATE_AS_NODE = "model"
+
+
+def validate_state_update(values: Mapping[str, Any]) -> dict[str, Any]:
+    """Check a state-only write and return it as a plain dict.
+
+    Raises:
+        ValueError: If `values` is empty, names a field outside
+            `STATE_SYNC_FIELDS`, or carries an invalid phase.
+    """
+    if not values:
+        raise ValueError("State update must set at least one field")
+
+    unknown = values.keys() - STATE_SYNC_FIELDS
+    if unknown:
+        raise ValueError(
+            f"State update may only set {sorted(STATE_SYNC_FIELDS)}, "
+            f"got {sorted(unknown)}"
+        )
+
+    update = dict(values)
+    if "phase" in update:
+        update["phase"] = validate_phase(update["phase"])
+    return update
+
+
+async def apply_state_update(
+    graph: Pregel, config: RunnableConfig, values: Mapping[str, Any]
+) -> RunnableConfig:
+    """Validate `values` and write them to the thread's latest checkpoint.
+
+    Returns the config of the new checkpoint, as `aupdate_state` does.
+    """
+    update = validate_state_update(values)
+    return await graph.aupdate_state(config, update, as_node=STATE_UPDATE_AS_NODE)
@@ -0,0 +1,230 @@
+"""Time to first token and inter-token latency of streamed runs.
+
+How fast the chat feels depends on how soon the answer starts and how
+smoothly it streams, more than on how long the run takes in total.
+`StreamLatencyMiddleware` measures, for runs streamed with the `messages`
+stream mode (as the chat UI does):
+
+- time to first token: from the start of the run to the first streamed AI
+  chunk with text. A run that first calls tools counts the tool calls too,
+  since the user waits through them. Recorded once per run;
+- inter-token gaps: the time between consecutive streamed chunks of each
+  model call.
+
+Both are labelled by phase and model, as in `routing.py`, and recorded in
+the Prometheus histograms `llm_time_to_first_token_seconds` and
+`llm_inter_token_gap_seconds` (on Aegra's `/metrics` when
+`ENABLE_PROMETHEUS_METRICS` is on, for alerting on p95 regressions). They
+are also kept in `stream_latency`, whose percentiles over the most recent
+samples are served at `GET /stream-latency` (see `webapp.py`).
+"""
+
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from functools import cache
+from typing import TYPE_CHECKING, Annotated, Any, NotRequired, cast
+
+from langchain.agents.middleware import AgentMiddleware, AgentState
+from langchain.agents.middleware.types import (
+    ModelCallResult,
+    ModelRequest,
+    ModelResponse,
+    PrivateStateAttr,
+)
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langgraph.runtime import Runtime
+
+from svelte_langgraph.instrumentation import TokenTimer, timing_tokens
+from svelte_langgraph.models import ModelSet
+from svelte_langgraph.phase import DEFAULT_PHASE
+from svelte_langgraph.routing import model_label
+
+if TYPE_CHECKING:
+    import prometheus_client
+
+# Samples kept per phase and model for the percentiles of `GET /stream-latency`.
+MAX_TTFT_SAMPLES = 1000
+MAX_GAP_SAMPLES = 10_000
+
+TTFT_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+GAP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class StreamLatencyState(AgentState[None]):
+    # Wall-clock time (time.time()) the current run started. Set anew by
+    # every run, never part of the input or output.
+    run_started: NotRequired[Annotated[float, PrivateStateAttr]]
+
+
+@cache
+def _ttft_histogram() -> "prometheus_client.Histogram":
+    import prometheus_client
+
+    return prometheus_client.Histogram(
+        "llm_time_to_first_token_seconds",
+        "Time from the start of a streamed run to its first AI token.",
+        ["phase", "model"],
+        buckets=TTFT_BUCKETS,
+    )
+
+
+@cache
+def _gap_histogram() -> "prometheus_client.Histogram":
+    import prometheus_client
+
+    return prometheus_client.Histogram(
+        "llm_inter_token_gap_seconds",
+        "Time between consecutive streamed chunks of a model call.",
+        ["phase", "model"],
+        buckets=GAP_BUCKETS,
+    )
+
+
+class _Series:
+    """The most recent samples of one measure, and how many there were."""
+
+    def __init__(self, max_samples: int) -> None:
+        self.samples: deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+
+    def add(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.samples.append(value)
+            self.count += 1
+
+    def summary(self) -> dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def percentile(pct: float) -> float:
+            # Nearest rank, as in the benchmarks' reports.
+            rank = max(1, round(pct / 100 * len(ordered)))
+            return ordered[rank - 1] if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "p50_seconds": percentile(50),
+            "p95_seconds": percentile(95),
+            "p99_seconds": percentile(99),
+            "max_seconds": ordered[-1] if ordered else 0.0,
+        }
+
+
+class StreamLatencyStats:
+    """Process-wide time to first token and inter-token gaps, by phase and
+    model."""
+
+    def __init__(self) -> None:
+        self._ttft: dict[tuple[str, str], _Series] = {}
+        self._gaps: dict[tuple[str, str], _Series] = {}
+
+    def record_ttft(self, phase: str, model: str, seconds: float) -> None:
+        series = self._ttft.setdefault((phase, model), _Series(MAX_TTFT_SAMPLES))
+        series.add([seconds])
+        _ttft_histogram().labels(phase, model).observe(seconds)
+
+    def record_gaps(self, phase: str, model: str, gaps: Sequence[float]) -> None:
+        if not gaps:
+            return
+        series = self._gaps.setdefault((phase, model), _Series(MAX_GAP_SAMPLES))
+        series.add(gaps)
+        histogram = _gap_histogram().labels(phase, model)
+        for gap in gaps:
+            histogram.observe(gap)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        empty = _Series(0)
+        snapshot = []
+        for phase, model in sorted(self._ttft.keys() | self._gaps.keys()):
+            key = (phase, model)
+            snapshot.append(
+                {
+                    "phase": phase,
+                    "model": model,
+                    "time_to_first_token": self._ttft.get(key, empty).summary(),
+                    "inter_token_gap": self._gaps.get(key, empty).summary(),
+                }
+            )
+        return snapshot
+
+    def clear(self) -> None:
+        self._ttft.clear()
+        self._gaps.clear()
+
+
+stream_latency = StreamLatencyStats()
+
+
+def _has_answered(messages: Sequence[AnyMessage]) -> bool:
+    """Whether the current run (the messages after the last human one)
+    already produced AI text, i.e. its first token."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return False
+        if isinstance(message, AIMessage) and message.text:
+            return True
+    return False
+
+
+class StreamLatencyMiddleware(AgentMiddleware[StreamLatencyState, None, Any]):
+    """Record time to first token and inter-token gaps; see the module
+    docstring.
+
+    `models` is the `ModelSet` the graph was built with, to label calls by
+    model as `ModelRoutingMiddleware` routes them.
+    """
+
+    state_schema = StreamLatencyState
+
+    def __init__(self, models: ModelSet) -> None:
+        super().__init__()
+        self._models = models
+
+    def before_agent(
+        self, state: StreamLatencyState, runtime: Runtime
+    ) -> dict[str, Any] | None:
+        return {"run_started": time.time()}
+
+    @contextmanager
+    def _measuring(self, request: ModelRequest) -> Iterator[None]:
+        state = cast(StreamLatencyState, request.state)
+        phase = cast(str, state.get("phase") or DEFAULT_PHASE)
+        model = model_label(self._models, phase)
+        run_started = state.get("run_started")
+        first_of_run = run_started is not None and not _has_answered(state["messages"])
+        # time.time() at one perf_counter() reading, to date the first token.
+        wall, counter = time.time(), time.perf_counter()
+        with timing_tokens() as timer:
+            yield
+        self._record(phase, model, timer, first_of_run, run_started, wall - counter)
+
+    def _record(
+        self,
+        phase: str,
+        model: str,
+        timer: TokenTimer,
+        first_of_run: bool,
+        run_started: float | None,
+        wall_offset: float,
+    ) -> None:
+        stream_latency.record_gaps(phase, model, timer.gaps)
+        if first_of_run and run_started is not None and timer.first_text is not None:
+            ttft = timer.first_text + wall_offset - run_started
+            stream_latency.record_ttft(phase, model, ttft)
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelCallResult:
+        with self._measuring(request):
+            return handler(request)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelCallResult:
+        with self._measuring(request):
+            return await handler(request)
@@ -0,0 +1,240 @@
+"""Coalescing of streamed model chunks before they become SSE events.
+
+With `stream_mode="messages"`, LangGraph turns every chunk a chat model
+yields into its own event, and Aegra serializes each one into a full JSON SSE
+frame with metadata. Fast models yield one chunk per provider delta, often a
+single token, so most of that work is per-frame overhead.
+
+`CoalescingChatModel` wraps a chat model and merges consecutive chunks before
+LangGraph sees them. Chunks are passed through immediately up to and
+including the first with content (text or tool-call chunks; providers such as
+OpenAI open with an empty, role-only chunk), so time-to-first-token is
+unchanged; after that, chunks are buffered and flushed
+once the buffer is `window` seconds old or holds `max_chars` characters of
+text and tool-call arguments, whichever comes first. A stalled provider
+therefore never delays already-received text by more than `window`.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Iterator, Sequence
+from typing import Any
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableBinding
+from langchain_core.tools import BaseTool
+
+DEFAULT_MAX_CHARS = 512
+
+
+def _chunk_size(chunk: ChatGenerationChunk) -> int:
+    message = chunk.message
+    size = len(message.text)
+    if isinstance(message, AIMessageChunk):
+        size += sum(len(tc.get("args") or "") for tc in message.tool_call_chunks)
+    return size
+
+
+def has_content(chunk: ChatGenerationChunk) -> bool:
+    """Whether `chunk` carries text or tool-call chunks, unlike the empty
+    role-only chunk some providers open a stream with."""
+    message = chunk.message
+    if message.text:
+        return True
+    return isinstance(message, AIMessageChunk) and bool(message.tool_call_chunks)
+
+
+def _is_final(chunk: ChatGenerationChunk) -> bool:
+    message = chunk.message
+    return isinstance(message, AIMessageChunk) and message.chunk_position == "last"
+
+
+class _Buffer:
+    """Accumulates chunks and decides when they must be flushed."""
+
+    def __init__(self, window: float, max_chars: int) -> None:
+        self.window = window
+        self.max_chars = max_chars
+        self.chunk: ChatGenerationChunk | None = None
+        self.deadline = 0.0
+
+    def add(self, chunk: ChatGenerationChunk, now: float) -> None:
+        if self.chunk is None:
+            self.chunk = chunk
+            self.deadline = now + self.window
+        else:
+            self.chunk = self.chunk + chunk
+
+    def full(self) -> bool:
+        return self.chunk is not None and (
+            _chunk_size(self.chunk) >= self.max_chars or _is_final(self.chunk)
+        )
+
+    def take(self) -> ChatGenerationChunk | None:
+        chunk, self.chunk = self.chunk, None
+        return chunk
+
+
+async def coalesce_chunks(
+    chunks: AsyncIterator[ChatGenerationChunk],
+    window: float,
+    max_chars: int = DEFAULT_MAX_CHARS,
+) -> AsyncGenerator[ChatGenerationChunk, None]:
+    """Merge a chunk stream as described in the module docstring.
+
+    The source is drained by a dedicated task into a queue: the wrapped model's
+    stream typically holds an HTTP response open across yields, and that must
+    stay in a single task rather than hop between the tasks a per-chunk
+    `wait_for` would create.
+    """
+    queue: asyncio.Queue[ChatGenerationChunk | Exception | None] = asyncio.Queue()
+
+    async def drain() -> None:
+        try:
+            async for chunk in chunks:
+                queue.put_nowait(chunk)
+        except Exception as e:
+            queue.put_nowait(e)
+        else:
+            queue.put_nowait(None)
+        finally:
+            # Close the source in this task, where it was iterated, when the
+            # consumer stops early.
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    loop = asyncio.get_running_loop()
+    producer = asyncio.create_task(drain())
+    buffer = _Buffer(window, max_chars)
+    started = False  # Whether a chunk with content went out yet.
+    try:
+        while True:
+            if buffer.chunk is None:
+                item = await queue.get()
+            else:
+                try:
+                    item = await asyncio.wait_for(
+                        queue.get(), max(0.0, buffer.deadline - loop.time())
+                    )
+                except TimeoutError:
+                    if (flushed := buffer.take()) is not None:
+                        yield flushed
+                    continue
+
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            if not started:
+                started = has_content(item)
+                yield item
+                continue
+
+            buffer.add(item, loop.time())
+            if buffer.full() or loop.time() >= buffer.deadline:
+                if (flushed := buffer.take()) is not None:
+                    yield flushed
+
+        if (flushed := buffer.take()) is not None:
+            yield flushed
+    finally:
+        producer.cancel()
+        try:
+            await producer
+        except asyncio.CancelledError:
+            pass
+
+
+class CoalescingChatModel(BaseChatModel):
+    """Chat model wrapper that streams `inner`'s output coalesced.
+
+    Calls `inner`'s `_astream`/`_agenerate` directly (without a run manager),
+    so callbacks -- and thus LangGraph's message stream -- only ever see the
+    wrapper's merged chunks, never the raw ones as well. Tool binding is
+    delegated to `inner` and the resulting provider-specific kwargs are stored
+    on the wrapper, to be passed back on every call.
+    """
+
+    inner: BaseChatModel
+    window: float
+    max_chars: int = DEFAULT_MAX_CHARS
+
+    @property
+    def _llm_type(self) -> str:
+        return f"coalescing-{self.inner._llm_type}"
+
+    def _get_ls_params(self, stop: list[str] | None = None, **kwargs: Any):
+        return self.inner._get_ls_params(stop=stop, **kwargs)
+
+    def bind_tools(
+        self,
+        tools: Sequence[dict[str, Any] | type | Any | BaseTool],
+        **kwargs: Any,
+    ) -> Runnable[LanguageModelInput, AIMessage]:
+        bound = self.inner.bind_tools(tools, **kwargs)
+        if not isinstance(bound, RunnableBinding):
+            raise TypeError(
+                f"{type(self.inner).__name__}.bind_tools returned "
+                f"{type(bound).__name__}, expected a RunnableBinding"
+            )
+        return self.bind(**bound.kwargs)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self.inner._generate(messages, stop=stop, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await self.inner._agenerate(messages, stop=stop, **kwargs)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # The sync path has no timer: a buffered chunk is flushed when the next
+        # one arrives late, or at the end. The server and the CLI both stream
+        # asynchronously; this only serves sync callers.
+        buffer = _Buffer(self.window, self.max_chars)
+        started = False
+        for chunk in self.inner._stream(messages, stop=stop, **kwargs):
+            if not started:
+                started = has_content(chunk)
+                yield chunk
+                continue
+            buffer.add(chunk, time.monotonic())
+            if buffer.full() or time.monotonic() >= buffer.deadline:
+                if (flushed := buffer.take()) is not None:
+                    yield flushed
+        if (flushed := buffer.take()) is not None:
+            yield flushed
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        source = self.inner._astream(messages, stop=stop, **kwargs)
+        async for chunk in coalesce_chunks(source, self.window, self.max_chars):
+            yield chunk
@@ -0,0 +1,224 @@
+"""Result cache for tool calls, per `ToolPolicy`.
+
+Identical tool calls repeat constantly -- `get_weather("Amsterdam")` from many
+users within minutes -- and each pays the full tool latency. A tool opts in
+with `ToolPolicy.cache_ttl`; its successful results are then kept in a
+process-wide LRU (`TOOL_CACHE_MAX_ENTRIES` entries, default 1024) under
+`(tool name, cache_key(args))`, and concurrent identical calls share a single
+in-flight execution.
+
+Only opt in tools whose result depends on nothing but their arguments: the
+cache is shared across users and threads. Tools that return a `Command` write
+graph state and are never cached, whatever their policy says; neither are
+error results, such as a timeout.
+
+A shared execution is the first caller's: it runs that call's rest of the
+tool middleware chain, so it holds that call's `ToolPolicy` concurrency slot
+(counted against the first caller's thread) and reports to that run's
+callbacks. When the first caller is cancelled -- its run stopped -- while
+others still wait, the execution carries on for them, still in that slot and
+reporting to the stopped run; it's only cancelled once no caller waits.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import time
+import typing
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolCall, ToolMessage
+from langchain_core.tools import BaseTool, StructuredTool
+from langgraph.prebuilt.tool_node import ToolCallRequest
+from langgraph.types import Command
+
+from svelte_langgraph.tools import DEFAULT_TOOL_POLICY, ToolPolicy
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def default_cache_key(args: Mapping[str, Any]) -> Hashable:
+    """Arguments as canonical JSON, so key order doesn't matter."""
+    return json.dumps(args, sort_keys=True, default=str)
+
+
+def returns_command(tool: BaseTool) -> bool:
+    """Whether `tool`'s function is annotated to return a `Command`."""
+    fn = (
+        (tool.coroutine or tool.func) if isinstance(tool, StructuredTool) else None
+    ) or getattr(tool, "_run", None)
+    return fn is not None and _annotated_command(fn)
+
+
+# Per function, as resolving the hints is slow and every cached call asks.
+@functools.cache
+def _annotated_command(fn: Callable[..., Any]) -> bool:
+    try:
+        hints = typing.get_type_hints(fn)
+    except (NameError, TypeError):
+        return False
+    annotation = hints.get("return")
+    return annotation is Command or typing.get_origin(annotation) is Command
+
+
+@dataclass
+class _InFlight:
+    task: asyncio.Task[ToolMessage | Command]
+    waiters: int = 0
+
+
+class ToolResultCache:
+    """Bounded LRU of tool results with per-entry expiry, plus the executions
+    currently in flight."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[float, ToolMessage]] = (
+            OrderedDict()
+        )
+        self._in_flight: dict[tuple[str, Hashable], _InFlight] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def get(self, key: tuple[str, Hashable]) -> ToolMessage | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, message = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return message
+
+    def put(self, key: tuple[str, Hashable], message: ToolMessage, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, message)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    async def call(
+        self,
+        call: ToolCall,
+        policy: ToolPolicy,
+        execute: Callable[[], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        """Answer `call` from the cache, from an identical call in flight, or
+        by awaiting `execute()` and caching its result."""
+        assert policy.cache_ttl is not None
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # In-flight tasks belong to the loop that started them.
+            self._loop = loop
+            self._in_flight.clear()
+
+        key_fn = policy.cache_key or default_cache_key
+        try:
+            key = (call["name"], key_fn(call["args"]))
+        except (KeyError, TypeError, ValueError):
+            # Arguments the key can't be derived from won't validate either;
+            # let the tool report that as usual.
+            return await execute()
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return _for_call(cached, call)
+        self.misses += 1
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = self._in_flight[key] = _InFlight(
+                asyncio.create_task(self._execute(key, policy.cache_ttl, execute))
+            )
+        in_flight.waiters += 1
+        try:
+            # Shielded: one caller being cancelled (its run stopped) mustn't
+            # cancel the execution the other callers are waiting for.
+            result = await asyncio.shield(in_flight.task)
+        finally:
+            in_flight.waiters -= 1
+            if in_flight.waiters == 0 and not in_flight.task.done():
+                in_flight.task.cancel()
+        return _for_call(result, call) if isinstance(result, ToolMessage) else result
+
+    async def _execute(
+        self,
+        key: tuple[str, Hashable],
+        ttl: float,
+        execute: Callable[[], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        try:
+            result = await execute()
+        finally:
+            self._in_flight.pop(key, None)
+        if isinstance(result, ToolMessage) and result.status != "error":
+            self.put(key, result, ttl)
+        return result
+
+
+def _for_call(message: ToolMessage, call: ToolCall) -> ToolMessage:
+    """`message` re-addressed to `call`, as a fresh message."""
+    return message.model_copy(update={"tool_call_id": call["id"], "id": None})
+
+
+_tool_cache: ToolResultCache | None = None
+
+
+def get_tool_cache() -> ToolResultCache:
+    """The process-wide cache, sized by `TOOL_CACHE_MAX_ENTRIES` on first use."""
+    global _tool_cache
+    if _tool_cache is None:
+        raw = os.getenv("TOOL_CACHE_MAX_ENTRIES", "").strip()
+        _tool_cache = ToolResultCache(
+            max_entries=int(raw) if raw else DEFAULT_MAX_ENTRIES
+        )
+    return _tool_cache
+
+
+async def run_cached(
+    call: ToolCall,
+    tool: BaseTool | None,
+    policy: ToolPolicy,
+    execute: Callable[[], Awaitable[ToolMessage | Command]],
+) -> ToolMessage | Command:
+    """Await `execute()` for `call`, through the cache if `policy` opts in."""
+    if policy.cache_ttl is None or tool is None or returns_command(tool):
+        return await execute()
+    return await get_tool_cache().call(call, policy, execute)
+
+
+class ToolCacheMiddleware(AgentMiddleware):
+    """Serve opted-in tool calls from the result cache; see the module
+    docstring."""
+
+    def __init__(self, policies: Mapping[str, ToolPolicy]) -> None:
+        super().__init__()
+        self._policies = policies
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        # In-flight sharing needs the event loop; sync invocations run
+        # unchanged.
+        return handler(request)
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        call = request.tool_call
+        policy = self._policies.get(call["name"], DEFAULT_TOOL_POLICY)
+        return await run_cached(call, request.tool, policy, lambda: handler(request))
@@ -0,0 +1,145 @@
+"""Timeouts and concurrency limits for tool calls, per `ToolPolicy`.
+
+Limits are process-wide: Aegra builds a fresh graph per run, so the slots live
+in a module-level `ToolLimiter` rather than on the middleware. A call first
+waits for a slot for its tool (`max_concurrency`) and for its tool within its
+thread (`max_concurrency_per_thread`), then runs; `timeout` covers both, so a
+burst of calls can't hold a run longer than the timeout either.
+
+Cancellation is plain asyncio cancellation. When the frontend's stop button
+cancels a run, the cancellation reaches the tools node's tasks and from there
+every call, queued or running, which frees its slot immediately. Sync tools
+run in an executor thread that can't be interrupted: the call returns (and
+frees its slot) at once, but the thread finishes on its own.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolCall, ToolMessage
+from langgraph.prebuilt.tool_node import ToolCallRequest
+from langgraph.types import Command
+
+from svelte_langgraph.tools import DEFAULT_TOOL_POLICY, ToolPolicy
+
+
+@dataclass
+class _Slots:
+    semaphore: asyncio.Semaphore
+    users: int = 0
+
+
+class ToolLimiter:
+    """Concurrency slots per tool and per (tool, thread).
+
+    Semaphores are created on first use and dropped again once no call holds
+    or waits for them, so idle threads cost nothing.
+    """
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._slots: dict[tuple[str, str | None], _Slots] = {}
+
+    @asynccontextmanager
+    async def _acquire(
+        self, key: tuple[str, str | None], limit: int
+    ) -> AsyncIterator[None]:
+        slots = self._slots.get(key)
+        if slots is None:
+            slots = self._slots[key] = _Slots(asyncio.Semaphore(limit))
+        slots.users += 1
+        try:
+            async with slots.semaphore:
+                yield
+        finally:
+            slots.users -= 1
+            if slots.users == 0 and self._slots.get(key) is slots:
+                del self._slots[key]
+
+    @asynccontextmanager
+    async def slot(
+        self, name: str, policy: ToolPolicy, thread_id: str | None
+    ) -> AsyncIterator[None]:
+        """Hold a slot for one call of tool `name` in `thread_id`."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Semaphores are bound to the loop they first wait on.
+            self._loop = loop
+            self._slots.clear()
+
+        async with AsyncExitStack() as stack:
+            # Per-thread slot first: a thread at its limit then waits without
+            # taking a global slot away from other threads.
+            if policy.max_concurrency_per_thread is not None and thread_id is not None:
+                await stack.enter_async_context(
+                    self._acquire((name, thread_id), policy.max_concurrency_per_thread)
+                )
+            if policy.max_concurrency is not None:
+                await stack.enter_async_context(
+                    self._acquire((name, None), policy.max_concurrency)
+                )
+            yield
+
+
+tool_limiter = ToolLimiter()
+
+
+async def run_with_policy(
+    call: ToolCall,
+    policy: ToolPolicy,
+    thread_id: str | None,
+    execute: Callable[[], Awaitable[ToolMessage | Command]],
+) -> ToolMessage | Command:
+    """Await `execute()` for `call` within `policy`'s limits.
+
+    Returns an error `ToolMessage` if `policy.timeout` expires; a
+    `TimeoutError` raised by the tool itself propagates as any other error.
+    """
+    if not policy.limited:
+        return await execute()
+
+    timeout = asyncio.timeout(policy.timeout)
+    try:
+        async with timeout:
+            async with tool_limiter.slot(call["name"], policy, thread_id):
+                return await execute()
+    except TimeoutError:
+        if not timeout.expired():
+            raise
+        assert policy.timeout is not None
+        return ToolMessage(
+            policy.timeout_message.format(name=call["name"], timeout=policy.timeout),
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+
+class ToolLimitsMiddleware(AgentMiddleware):
+    """Apply each tool's `ToolPolicy` limits to its calls; see the module
+    docstring."""
+
+    def __init__(self, policies: Mapping[str, ToolPolicy]) -> None:
+        super().__init__()
+        self._policies = policies
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        # Limits are enforced with asyncio; sync invocations run unchanged.
+        return handler(request)
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        call = request.tool_call
+        policy = self._policies.get(call["name"], DEFAULT_TOOL_POLICY)
+        thread_id = request.runtime.config.get("configurable", {}).get("thread_id")
+        return await run_with_policy(call, policy, thread_id, lambda: handler(request))
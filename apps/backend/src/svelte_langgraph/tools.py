@@ -1,19 +1,19 @@
-import asyncio
-import random
-from typing import Annotated, Callable, Sequence
+from dataclasses import dataclass
+from typing import Annotated, Any, Callable, Hashable, Mapping, Sequence
 
 from langchain_core.messages import ToolMessage
-from langchain_core.tools import InjectedToolCallId
+from langchain_core.tools import BaseTool, InjectedToolCallId
+from langchain_core.tools import tool as create_tool
 from langgraph.types import Command
 
 from .phase import Phase
+from .weather import get_weather_batcher
 
 
 async def get_weather(city: str) -> str:
     """Get weather for a given city."""
-    await asyncio.sleep(random.randint(1, 10))
-
-    return f"It's always sunny in {city}!"
+    # Batched with concurrent calls for other cities; see weather.py.
+    return await get_weather_batcher().lookup(city)
 
 
 def change_phase(
@@ -35,5 +35,91 @@ def change_phase(
     )
 
 
-def get_tools() -> Sequence[Callable]:
-    return [get_weather, change_phase]
+TOOL_FUNCTIONS: Sequence[Callable] = (get_weather, change_phase)
+
+_tools: tuple[BaseTool, ...] | None = None
+
+
+def get_tools() -> Sequence[BaseTool]:
+    """The agent's tools, built once per process.
+
+    `create_agent` turns plain functions into `StructuredTool`s, deriving a
+    Pydantic model from each signature and docstring, on every call -- i.e.
+    for every graph, which Aegra builds per run. Handing it ready tools
+    skips that.
+    """
+    global _tools
+    if _tools is None:
+        _tools = tuple(create_tool(function) for function in TOOL_FUNCTIONS)
+    return _tools
+
+
+@dataclass(frozen=True)
+class ToolPolicy:
+    """How the agent may execute a tool, beyond what its signature says.
+
+    `speculative` lets the tool start while the model is still streaming its
+    tool call (see speculative.py). Only set it for tools that are read-only
+    and take no injected state: the call may still be discarded, e.g. when the
+    model call fails.
+
+    `timeout` (seconds) bounds a call, including any wait for a concurrency
+    slot; a call that exceeds it is cancelled and answered with an error
+    `ToolMessage` built from `timeout_message`. `max_concurrency` caps
+    concurrent calls of the tool across the whole server,
+    `max_concurrency_per_thread` within one thread. See tool_limits.py.
+
+    `cache_ttl` (seconds) opts the tool in to the shared result cache, keyed
+    on `cache_key(args)` (canonical JSON of the arguments by default). Only
+    set it for tools whose result depends on nothing but their arguments. See
+    tool_cache.py.
+
+    `phases` limits the phases in which the model is offered the tool (all
+    when None), so other phases don't pay for its schema in every prompt.
+    The tools in `ALWAYS_AVAILABLE_TOOLS` are offered in every phase
+    regardless. See phase_tools.py.
+    """
+
+    speculative: bool = False
+    timeout: float | None = None
+    max_concurrency: int | None = None
+    max_concurrency_per_thread: int | None = None
+    timeout_message: str = "Error: {name} timed out after {timeout:g} seconds."
+    cache_ttl: float | None = None
+    cache_key: Callable[[Mapping[str, Any]], Hashable] | None = None
+    phases: frozenset[Phase] | None = None
+
+    @property
+    def limited(self) -> bool:
+        return (
+            self.timeout is not None
+            or self.max_concurrency is not None
+            or self.max_concurrency_per_thread is not None
+        )
+
+
+DEFAULT_TOOL_POLICY = ToolPolicy()
+
+# Offered in every phase whatever their policy says: without `change_phase`
+# the model could never leave a phase.
+ALWAYS_AVAILABLE_TOOLS: frozenset[str] = frozenset({"change_phase"})
+
+
+def get_tool_policies() -> Mapping[str, ToolPolicy]:
+    """Policies by tool name; tools not listed get `DEFAULT_TOOL_POLICY`."""
+    return {
+        "get_weather": ToolPolicy(
+            speculative=True,
+            timeout=15.0,
+            max_concurrency=64,
+            max_concurrency_per_thread=4,
+            cache_ttl=600.0,
+            cache_key=lambda args: str(args["city"]).strip().casefold(),
+            # Looking things up belongs to research and drafting, not review.
+            phases=frozenset({"research", "draft"}),
+        ),
+        # Returns a `Command` that writes state, so it must run in order with
+        # the other tool calls of its message. It is sync, so every call holds
+        # an executor thread.
+        "change_phase": ToolPolicy(timeout=5.0, max_concurrency=8),
+    }
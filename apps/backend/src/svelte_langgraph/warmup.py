@@ -0,0 +1,161 @@
+"""Startup warm-up, so a worker only takes traffic once it's warm.
+
+Left alone, the first runs after a start pay for everything built on first
+use: the tool schemas, the models and the first graph build (and the modules
+only runs import, see `tests/test_import_time.py`), the JWKS fetch behind
+the first token validation (`auth._get_jwks`), and the TLS handshake with
+the model provider. `warm_up` does all of that up front:
+
+- tools: builds the tools and their per-phase schemas;
+- graph: builds every configured model and the graph once, and the prompt;
+- jwks: fetches the OIDC issuer's JWKS, if `AUTH_OIDC_ISSUER` is set;
+- providers: opens a connection to each model's provider with a cheap
+  authenticated request (listing its models), for OpenAI-compatible clients,
+  whose connection pool later calls reuse. Other providers are skipped.
+
+The steps run concurrently, so one slow dependency doesn't leave the others
+cold. A failing step is retried until `WARMUP_TIMEOUT_S` seconds (default 30)
+are up; then the worker stops warming up and reports ready anyway, cold rather
+than never. The web app's lifespan runs `warm_up` in the background (see
+`webapp.py`), and its `GET /ready` answers 503 until `is_ready()`.
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable, Iterator
+from typing import Literal
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableConfig
+
+from . import auth
+from .graph import get_prompt_template, make_graph
+from .hedging import HedgedChatModel
+from .models import current_models
+from .phase_tools import prepare_tool_schemas
+from .streaming import CoalescingChatModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT_S = 30.0
+RETRY_INTERVAL_S = 1.0
+
+WarmupStatus = Literal["pending", "ready", "timed_out"]
+
+_status: WarmupStatus = "pending"
+
+
+def warmup_timeout() -> float:
+    raw = os.getenv("WARMUP_TIMEOUT_S", "").strip()
+    timeout = float(raw) if raw else DEFAULT_TIMEOUT_S
+    if timeout < 0:
+        raise ValueError(f"WARMUP_TIMEOUT_S must not be negative, got {raw}")
+    return timeout
+
+
+def warmup_status() -> WarmupStatus:
+    return _status
+
+
+def is_ready() -> bool:
+    """Whether warm-up is over, whether or not it finished in time."""
+    return _status != "pending"
+
+
+def reset_warmup() -> None:
+    """Back to not warmed up, so the next `warm_up` runs every step again."""
+    global _status
+    _status = "pending"
+
+
+def _build_graph() -> None:
+    current_models().build_all()
+    make_graph(RunnableConfig(configurable={}))
+    get_prompt_template()
+
+
+async def _warm_graph() -> None:
+    # Building takes a while the first time; keep the loop free for probes.
+    await asyncio.to_thread(_build_graph)
+
+
+async def _fetch_jwks() -> None:
+    if auth.oidc_issuer:
+        await auth._get_jwks()
+
+
+def _provider_models(model: BaseChatModel) -> Iterator[BaseChatModel]:
+    if isinstance(model, CoalescingChatModel):
+        yield from _provider_models(model.inner)
+    elif isinstance(model, HedgedChatModel):
+        yield from _provider_models(model.primary)
+        yield from _provider_models(model.fallback)
+    else:
+        yield model
+
+
+async def _open_provider_connections() -> None:
+    clients = {}
+    # Built in a thread, as in `_warm_graph`; whichever gets there first
+    # builds them and the other waits for it.
+    for model in await asyncio.to_thread(current_models().build_all):
+        for provider_model in _provider_models(model):
+            # `openai.AsyncOpenAI`, on ChatOpenAI and other OpenAI-compatible
+            # models.
+            client = getattr(provider_model, "root_async_client", None)
+            if client is not None:
+                clients.setdefault(str(client.base_url), client)
+    if not clients:
+        return
+
+    import openai
+
+    async def connect(client: "openai.AsyncOpenAI") -> None:
+        try:
+            await client.models.list()
+        except openai.APIStatusError:
+            # The provider answered, so the connection is open; some
+            # OpenAI-compatible servers just don't list models.
+            pass
+
+    await asyncio.gather(*(connect(client) for client in clients.values()))
+
+
+STEPS: dict[str, Callable[[], Awaitable[None]]] = {
+    "tools": lambda: asyncio.to_thread(prepare_tool_schemas),
+    "graph": _warm_graph,
+    "jwks": _fetch_jwks,
+    "providers": _open_provider_connections,
+}
+
+
+async def _run_step(name: str, step: Callable[[], Awaitable[None]]) -> None:
+    while True:
+        try:
+            await step()
+            return
+        except Exception as e:
+            logger.warning(f"Warm-up step {name!r} failed, retrying: {e}")
+        await asyncio.sleep(RETRY_INTERVAL_S)
+
+
+async def warm_up(timeout: float | None = None) -> bool:
+    """Run the warm-up steps concurrently within `timeout` seconds
+    (`WARMUP_TIMEOUT_S` if omitted), then mark the worker ready. Returns
+    whether every step succeeded in time."""
+    global _status
+    if timeout is None:
+        timeout = warmup_timeout()
+    try:
+        async with asyncio.timeout(timeout):
+            await asyncio.gather(
+                *(_run_step(name, step) for name, step in STEPS.items())
+            )
+    except TimeoutError:
+        logger.warning(f"Warm-up didn't finish in {timeout}s; reporting ready")
+        _status = "timed_out"
+        return False
+    logger.info("Warm-up done")
+    _status = "ready"
+    return True
@@ -0,0 +1,159 @@
+"""Weather lookups behind `get_weather`: a pluggable provider and a
+micro-batching layer in front of it.
+
+When a user asks about several cities the model emits parallel `get_weather`
+calls, which `ToolNode` runs concurrently. Rather than one provider request
+per call, `WeatherBatcher` collects the cities requested within a short
+window (`WEATHER_BATCH_WINDOW_MS`, default 10 ms; up to
+`WEATHER_BATCH_MAX_SIZE` per batch) into a single `WeatherProvider.lookup`
+and fans the answers back out to the waiting calls, and thus to their own
+`ToolMessage`s. A window of 0 turns batching off.
+
+The only provider so far is `FakeWeatherProvider` (`WEATHER_PROVIDER=fake`),
+whose per-request latency is set with `WEATHER_FAKE_LATENCY_MS`.
+"""
+
+import asyncio
+import os
+import random
+from collections.abc import Mapping, Sequence
+from typing import Protocol
+
+DEFAULT_BATCH_WINDOW_MS = 10.0
+DEFAULT_BATCH_MAX_SIZE = 16
+# The demo's original behavior: every lookup takes 1 to 10 seconds.
+DEFAULT_FAKE_LATENCY_MS = "1000-10000"
+
+
+class WeatherProvider(Protocol):
+    """A weather service that can answer for several cities in one request."""
+
+    async def lookup(self, cities: Sequence[str]) -> Mapping[str, str]:
+        """Return a description per city; every requested city must be present."""
+        ...
+
+
+class FakeWeatherProvider:
+    """Local stand-in for a weather API: it's always sunny.
+
+    Each request takes `latency` seconds, or a uniformly random duration if
+    `latency` is a `(low, high)` range, regardless of how many cities it
+    covers. `requests` counts the requests served.
+    """
+
+    def __init__(self, latency: float | tuple[float, float] = 0.0) -> None:
+        self.latency = latency
+        self.requests = 0
+
+    async def lookup(self, cities: Sequence[str]) -> Mapping[str, str]:
+        self.requests += 1
+        latency = (
+            random.uniform(*self.latency)
+            if isinstance(self.latency, tuple)
+            else self.latency
+        )
+        await asyncio.sleep(latency)
+        return {city: f"It's always sunny in {city}!" for city in cities}
+
+
+def _parse_latency_ms(raw: str) -> float | tuple[float, float]:
+    """`"250"` -> 0.25 s; `"1000-10000"` -> a (1.0, 10.0) s range."""
+    low, sep, high = raw.partition("-")
+    if sep:
+        return (float(low) / 1000, float(high) / 1000)
+    return float(raw) / 1000
+
+
+def make_weather_provider() -> WeatherProvider:
+    """The provider selected by `WEATHER_PROVIDER`."""
+    name = os.getenv("WEATHER_PROVIDER", "fake").strip()
+    if name == "fake":
+        raw = os.getenv("WEATHER_FAKE_LATENCY_MS", "").strip()
+        return FakeWeatherProvider(_parse_latency_ms(raw or DEFAULT_FAKE_LATENCY_MS))
+    raise ValueError(f"Unknown WEATHER_PROVIDER {name!r}. Must be one of: ['fake']")
+
+
+class WeatherBatcher:
+    """Combines lookups arriving within `window` seconds into one provider
+    request of at most `max_size` cities."""
+
+    def __init__(
+        self,
+        provider: WeatherProvider,
+        window: float = DEFAULT_BATCH_WINDOW_MS / 1000,
+        max_size: int = DEFAULT_BATCH_MAX_SIZE,
+    ) -> None:
+        self.provider = provider
+        self.window = window
+        self.max_size = max_size
+        self._pending: dict[str, list[asyncio.Future[str]]] = {}
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def lookup(self, city: str) -> str:
+        if self.window <= 0:
+            return (await self.provider.lookup([city]))[city]
+
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(city, []).append(future)
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(
+                self.window, self._flush
+            )
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.create_task(self._request(batch))
+            # Keep a reference until done; the loop only holds weak ones.
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _request(self, batch: dict[str, list[asyncio.Future[str]]]) -> None:
+        try:
+            results = await self.provider.lookup(list(batch))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for city, futures in batch.items():
+            for future in futures:
+                if future.done():
+                    # The waiting tool call was cancelled.
+                    continue
+                if city in results:
+                    future.set_result(results[city])
+                else:
+                    future.set_exception(
+                        LookupError(f"Weather provider returned nothing for {city!r}")
+                    )
+
+
+_batchers: dict[asyncio.AbstractEventLoop, WeatherBatcher] = {}
+
+
+def get_weather_batcher() -> WeatherBatcher:
+    """The batcher for the running event loop, configured from the environment
+    on first use."""
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        # Futures and timers belong to one loop; drop batchers of old ones.
+        _batchers.clear()
+        raw_window = os.getenv("WEATHER_BATCH_WINDOW_MS", "").strip()
+        raw_size = os.getenv("WEATHER_BATCH_MAX_SIZE", "").strip()
+        batcher = _batchers[loop] = WeatherBatcher(
+            make_weather_provider(),
+            window=float(raw_window or DEFAULT_BATCH_WINDOW_MS) / 1000,
+            max_size=int(raw_size) if raw_size else DEFAULT_BATCH_MAX_SIZE,
+        )
+    return batcher
@@ -0,0 +1,170 @@
+"""Custom HTTP routes mounted into the Aegra server (see `http.app` in aegra.json).
+
+Aegra merges this app's routes and lifespan with its own, then adds the
+protocol routes on top.
+"""
+
+import asyncio
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
+from typing import Any
+
+from aegra_api.api.threads import get_thread, update_thread_state
+from aegra_api.core.auth_deps import AuthenticatedUser
+from aegra_api.core.database import db_manager
+from aegra_api.core.health import readiness_check
+from aegra_api.core.orm import get_session
+from aegra_api.models import ThreadStateUpdate, ThreadStateUpdateResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Absolute imports required: Aegra loads this file by path (outside the
+# package), so relative imports would fail at server startup.
+from svelte_langgraph.loop_lag import get_loop_lag_monitor
+from svelte_langgraph.message_archive import MAX_PAGE_SIZE, MessageArchive
+from svelte_langgraph.models import (
+    DEFAULT_CONFIG_POLL_SECONDS,
+    get_model_registry,
+    install_reload_signal,
+    watch_model_config,
+)
+from svelte_langgraph.routing import model_usage
+from svelte_langgraph.state_update import STATE_UPDATE_AS_NODE, validate_state_update
+from svelte_langgraph.stream_latency import stream_latency
+from svelte_langgraph.warmup import is_ready, warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start warming up in the background (see `warmup.py`; `GET /ready`
+    answers 503 until it's done), and set up model config reloads: on
+    `SIGHUP`, and on changes to `MODEL_CONFIG_FILE` if set (polled every
+    `MODEL_CONFIG_POLL_SECONDS`). With `LOOP_LAG_MONITOR` on, also monitor
+    the event loop's lag (see `loop_lag.py`)."""
+    tasks: list[asyncio.Task] = [asyncio.create_task(warm_up())]
+    if monitor := get_loop_lag_monitor():
+        tasks.append(asyncio.create_task(monitor.run()))
+    registry = get_model_registry()
+    install_reload_signal(registry)
+    path = os.getenv("MODEL_CONFIG_FILE", "").strip()
+    if path:
+        raw_interval = os.getenv("MODEL_CONFIG_POLL_SECONDS", "").strip()
+        interval = float(raw_interval) if raw_interval else DEFAULT_CONFIG_POLL_SECONDS
+        tasks.append(
+            asyncio.create_task(watch_model_config(registry, Path(path), interval))
+        )
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+# Registered before Aegra's own `/ready`, which it therefore replaces.
+@app.get("/ready")
+async def get_readiness(request: Request) -> dict[str, str]:
+    """Readiness probe: 503 while the worker is warming up, then Aegra's own
+    check that the database and LangGraph backends are available."""
+    if not is_ready():
+        raise HTTPException(status_code=503, detail="Service not ready - warming up")
+    return await readiness_check(request)
+
+
+class StateSyncRequest(BaseModel):
+    values: dict[str, Any]
+
+
+@app.post("/threads/{thread_id}/state-sync")
+async def sync_thread_state(
+    thread_id: str,
+    body: StateSyncRequest,
+    user: AuthenticatedUser,
+    session: AsyncSession = Depends(get_session),
+) -> ThreadStateUpdateResponse:
+    """Apply a validated state-only write (e.g. a phase change) to a thread.
+
+    The lightweight alternative to a `state_only_submit` run: no run is
+    queued and the graph never executes. Values are validated up front (422
+    on failure), then written through Aegra's own state-update handler, which
+    scopes the thread to `user` and applies the write with `aupdate_state`.
+    """
+    try:
+        values = validate_state_update(body.values)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+
+    result = await update_thread_state(
+        thread_id=thread_id,
+        request=ThreadStateUpdate.model_validate(
+            {"values": values, "as_node": STATE_UPDATE_AS_NODE}
+        ),
+        user=user,
+        session=session,
+    )
+    assert isinstance(result, ThreadStateUpdateResponse)
+    return result
+
+
+@app.get("/model-usage")
+async def get_model_usage(user: AuthenticatedUser) -> list[dict[str, Any]]:
+    """Model call count, latency and token totals per phase and model since
+    the server started, for comparing `CHAT_MODEL_ROUTES` choices."""
+    return model_usage.snapshot()
+
+
+@app.get("/stream-latency")
+async def get_stream_latency(user: AuthenticatedUser) -> list[dict[str, Any]]:
+    """Time to first token and inter-token gap percentiles per phase and
+    model, over the most recent streamed runs (see `stream_latency.py`)."""
+    return stream_latency.snapshot()
+
+
+@app.get("/loop-lag")
+async def get_loop_lag(user: AuthenticatedUser) -> dict[str, Any]:
+    """Event loop lag percentiles over the most recent samples, and when the
+    most recent blocks happened and how long they lasted (their stacks are
+    only logged; see `loop_lag.py`); 404 unless `LOOP_LAG_MONITOR` is on."""
+    monitor = get_loop_lag_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=404, detail="Loop lag monitor is off")
+    return monitor.snapshot()
+
+
+def get_message_archive() -> MessageArchive:
+    return MessageArchive(db_manager.get_store())
+
+
+class MessagePage(BaseModel):
+    messages: list[dict[str, Any]]
+    total: int
+
+
+@app.get("/threads/{thread_id}/messages")
+async def get_thread_messages(
+    thread_id: str,
+    user: AuthenticatedUser,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_session),
+    archive: MessageArchive = Depends(get_message_archive),
+) -> MessagePage:
+    """A page of the thread's full message history, oldest first, from the
+    message archive (see `message_archive.py`) rather than the checkpoint,
+    which may only hold the most recent messages. `total` is the number of
+    archived messages, so the latest page starts at `total - limit`."""
+    # 404 unless the thread exists and belongs to `user`.
+    await get_thread(thread_id=thread_id, user=user, session=session)
+    messages = await archive.page(thread_id, offset, limit)
+    return MessagePage(
+        messages=[message.model_dump() for message in messages],
+        total=await archive.count(thread_id),
+    )
@@ -29,8 +29,15 @@ from openai.types.chat.chat_completion_message_tool_call import (
     Function,
 )
 
+from svelte_langgraph.circuit_breaker import reset_circuit_breaker
 from svelte_langgraph.graph import make_graph
+from svelte_langgraph.instrumentation import reset_span_exporter
+from svelte_langgraph.loop_lag import reset_loop_lag_monitor
+from svelte_langgraph.models import reset_model_registry
+from svelte_langgraph.rate_limit import reset_rate_limits
+from svelte_langgraph.tool_cache import get_tool_cache
 from svelte_langgraph.tools import change_phase
+from svelte_langgraph.warmup import reset_warmup
 
 DEFAULT_BASE_URL = "https://api.openai.com/v1"
 OPENROUTER_MOCK_BASE_URL = "https://mock-openrouter.test/api/v1"
@@ -78,9 +85,31 @@ PROVIDER_CASES = (
 )
 
 
-@pytest.fixture(params=PROVIDER_CASES, scope="module")
+CHAT_MODELS = (
+    None,
+    "claude-3-5-sonnet-latest",
+    "gpt-4o-mini",
+    "something-else-entirely",
+)
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    """Run every test against each provider case and chat model, except those
+    marked `single_provider`, which get the defaults of `provider_case` and
+    `chat_model`."""
+    if metafunc.definition.get_closest_marker("single_provider"):
+        return
+    if "provider_case" in metafunc.fixturenames:
+        metafunc.parametrize(
+            "provider_case", PROVIDER_CASES, indirect=True, scope="module"
+        )
+    if "chat_model" in metafunc.fixturenames:
+        metafunc.parametrize("chat_model", CHAT_MODELS, indirect=True)
+
+
+@pytest.fixture(scope="module")
 def provider_case(request) -> ProviderCase:
-    return request.param
+    return getattr(request, "param", PROVIDER_CASES[0])
 
 
 @pytest.fixture
@@ -91,11 +120,9 @@ def mock_completion(provider_case: ProviderCase):
         yield respx_mock.post("/chat/completions")
 
 
-@pytest.fixture(
-    params=[None, "claude-3-5-sonnet-latest", "gpt-4o-mini", "something-else-entirely"],
-)
+@pytest.fixture
 def chat_model(request):
-    yield request.param
+    yield getattr(request, "param", None)
 
 
 @pytest.fixture(
@@ -113,6 +140,65 @@ def env_setup(monkeypatch, provider_case: ProviderCase, chat_model):
         monkeypatch.setenv("CHAT_MODEL_NAME", chat_model)
 
 
+@pytest.fixture(autouse=True)
+def fresh_model_registry():
+    """Model settings are parsed once per process; make each test's
+    environment take effect."""
+    reset_model_registry()
+    yield
+    reset_model_registry()
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    """Rate limits and provider backoff are process-wide; start each test
+    without any."""
+    reset_rate_limits()
+    yield
+    reset_rate_limits()
+
+
+@pytest.fixture(autouse=True)
+def fresh_circuit_breaker():
+    """The circuit breaker is process-wide; start each test with it closed."""
+    reset_circuit_breaker()
+    yield
+    reset_circuit_breaker()
+
+
+@pytest.fixture(autouse=True)
+def fresh_span_exporter():
+    """The span exporter is process-wide; start each test without one."""
+    reset_span_exporter()
+    yield
+    reset_span_exporter()
+
+
+@pytest.fixture(autouse=True)
+def fresh_loop_lag_monitor():
+    """The loop lag monitor is process-wide; start each test without one."""
+    reset_loop_lag_monitor()
+    yield
+    reset_loop_lag_monitor()
+
+
+@pytest.fixture(autouse=True)
+def fresh_warmup():
+    """Readiness is process-wide; start each test not warmed up."""
+    reset_warmup()
+    yield
+    reset_warmup()
+
+
+@pytest.fixture(autouse=True)
+def clear_tool_cache():
+    """Tool results are cached process-wide; don't let them leak between
+    tests that swap in different tool implementations."""
+    get_tool_cache().clear()
+    yield
+    get_tool_cache().clear()
+
+
 async def get_weather(city: str) -> str:
     """Fast, deterministic mock for get_weather.
 
@@ -0,0 +1,123 @@
+"""Tests for comparing benchmark reports to baselines
+(`scripts/bench_baseline.py`)."""
+
+import json
+import math
+from pathlib import Path
+
+import pytest
+
+from scripts.bench_baseline import compare_report, compare_result, machine, main
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def result(
+    p50: float, better: str = "lower", stdev: float = 0.0, name: str = "turn"
+) -> dict:
+    """One result of a report, as `benchmarks/_report.py` writes it."""
+    return {
+        "name": name,
+        "unit": "ms",
+        "better": better,
+        "n": 25,
+        "p50": p50,
+        "stdev": stdev,
+    }
+
+
+def status(base: dict, current: dict) -> str:
+    return compare_result(base, current, threshold=0.10, sigmas=2.0)[1]
+
+
+@pytest.mark.parametrize(
+    ("base", "current", "better", "expected"),
+    [
+        (10, 12, "lower", "regressed"),
+        (10, 8, "lower", "improved"),
+        (10, 10.5, "lower", "ok"),
+        (100, 80, "higher", "regressed"),
+        (100, 120, "higher", "improved"),
+        (100, 95, "higher", "ok"),
+    ],
+)
+def test_changes_count_in_the_worse_direction(
+    base: float, current: float, better: str, expected: str
+) -> None:
+    assert status(result(base, better), result(current, better)) == expected
+
+
+def test_noisy_results_need_a_bigger_change() -> None:
+    # +20%, but within 2 standard errors (stdev 10 over 25 samples: 2 each).
+    noisy = status(result(10, stdev=10), result(12, stdev=10))
+    # The same change with steady samples.
+    steady = status(result(10, stdev=1), result(12, stdev=1))
+
+    assert (noisy, steady) == ("ok", "regressed")
+
+
+def test_zero_baseline() -> None:
+    change, worse = compare_result(result(0), result(1), 0.10, 2.0)
+    assert (change, worse) == (math.inf, "regressed")
+    assert compare_result(result(0), result(0), 0.10, 2.0) == (0.0, "ok")
+    assert status(result(0, "higher"), result(5, "higher")) == "improved"
+
+
+def test_new_and_missing_results() -> None:
+    base = {"results": [result(10), result(5, name="gone")]}
+    current = {"results": [result(10), result(3, name="added")]}
+
+    rows = compare_report("bench", base, current, 0.10, 2.0)
+
+    assert [(row.name, row.status) for row in rows] == [
+        ("turn", "ok"),
+        ("added", "new"),
+        ("gone", "missing"),
+    ]
+    assert all(
+        row.status == "new" for row in compare_report("b", None, current, 0.1, 2)
+    )
+
+
+def report(p50: float) -> dict:
+    return {"benchmark": "bench", "params": {}, "results": [result(p50)]}
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> Path:
+    """A store with one baseline of `bench`, turn p50 = 10 ms."""
+    store = tmp_path / "store"
+    (store / "abc123").mkdir(parents=True)
+    meta = {
+        "commit": "abc123",
+        "dirty": False,
+        "saved_at": "2026-01-01T00:00:00+00:00",
+        "machine": machine(),
+    }
+    (store / "abc123" / "bench.json").write_text(
+        json.dumps({"meta": meta, "report": report(10)})
+    )
+    return store
+
+
+def run_compare(monkeypatch, store: Path, path: Path, p50: float) -> None:
+    path.write_text(json.dumps(report(p50)))
+    monkeypatch.setattr(
+        "sys.argv",
+        ["bench_baseline", "--store", str(store), "compare", str(path)],
+    )
+    main()
+
+
+def test_compare_exits_with_1_on_a_regression(
+    monkeypatch, capsys, store: Path, tmp_path: Path
+) -> None:
+    run_compare(monkeypatch, store, tmp_path / "same.json", 10.2)
+    assert "REGRESSED" not in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as excinfo:
+        run_compare(monkeypatch, store, tmp_path / "slower.json", 15)
+
+    assert excinfo.value.code == 1
+    assert "REGRESSED" in capsys.readouterr().out
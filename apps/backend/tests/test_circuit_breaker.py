@@ -0,0 +1,208 @@
+"""Tests for the circuit breaker around model calls
+(`svelte_langgraph.circuit_breaker`)."""
+
+import asyncio
+import json
+
+import httpx
+import prometheus_client
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+
+from svelte_langgraph.circuit_breaker import (
+    CIRCUIT_OPEN_MESSAGE,
+    CircuitBreaker,
+    get_circuit_breaker,
+)
+from svelte_langgraph.deadline import DEADLINE_MESSAGE
+from svelte_langgraph.graph import make_graph
+
+from .conftest import make_completion_response
+
+
+pytestmark = pytest.mark.single_provider
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list[float]:
+    now = [1000.0]
+    monkeypatch.setattr(
+        "svelte_langgraph.circuit_breaker.time.monotonic", lambda: now[0]
+    )
+    return now
+
+
+def exported_state() -> str:
+    for state in ("closed", "open", "half_open"):
+        value = prometheus_client.REGISTRY.get_sample_value(
+            "llm_circuit_breaker_state", {"llm_circuit_breaker_state": state}
+        )
+        if value == 1:
+            return state
+    raise AssertionError("no circuit state exported")
+
+
+def test_opens_once_failure_rate_is_reached(clock: list[float]) -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4)
+
+    for ok in (True, False, True):
+        assert breaker.allow()
+        breaker.record(ok, 0.1)
+    assert breaker.state == "closed"
+
+    breaker.record(False, 0.1)
+
+    assert breaker.state == "open"
+    assert exported_state() == "open"
+    assert not breaker.allow()
+
+
+def test_slow_calls_count_as_failures(clock: list[float]) -> None:
+    breaker = CircuitBreaker(min_calls=2, slow_call=5)
+
+    breaker.record(True, 6)
+    breaker.record(True, 7)
+
+    assert breaker.state == "open"
+
+
+def test_old_outcomes_leave_the_window(clock: list[float]) -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, window=60)
+
+    breaker.record(False, 0.1)
+    clock[0] += 61
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_probe_through(clock: list[float]) -> None:
+    breaker = CircuitBreaker(min_calls=1, open_for=30)
+    breaker.record(False, 0.1)
+
+    clock[0] += 30
+
+    assert breaker.state == "half_open"
+    assert exported_state() == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record(True, 0.1)
+
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens(clock: list[float]) -> None:
+    breaker = CircuitBreaker(min_calls=1, open_for=30)
+    breaker.record(False, 0.1)
+    clock[0] += 30
+
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+
+    assert breaker.state == "open"
+    clock[0] += 29
+    assert not breaker.allow()
+
+
+def test_cancelled_probe_frees_the_slot(clock: list[float]) -> None:
+    breaker = CircuitBreaker(min_calls=1, open_for=30)
+    breaker.record(False, 0.1)
+    clock[0] += 30
+    assert breaker.allow()
+
+    breaker.release()
+
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def server_error() -> httpx.Response:
+    return httpx.Response(500, json={"error": {"message": "boom"}})
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_runs_fast(
+    monkeypatch, thread_config: RunnableConfig, mock_completion
+) -> None:
+    monkeypatch.setenv("CHAT_MODEL_KWARGS", json.dumps({"max_retries": 0}))
+    monkeypatch.setenv("LLM_CIRCUIT_MIN_CALLS", "2")
+    mock_completion.side_effect = lambda request: server_error()
+
+    async def ask() -> str:
+        agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+        result = await agent.ainvoke({"messages": [HumanMessage("Hi")]}, thread_config)
+        return result["messages"][-1].text
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            await ask()
+    assert get_circuit_breaker().state == "open"
+
+    assert await ask() == CIRCUIT_OPEN_MESSAGE
+    assert mock_completion.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_successful_probe_closes_the_circuit(
+    monkeypatch, thread_config: RunnableConfig, mock_completion
+) -> None:
+    monkeypatch.setenv("CHAT_MODEL_KWARGS", json.dumps({"max_retries": 0}))
+    monkeypatch.setenv("LLM_CIRCUIT_MIN_CALLS", "1")
+    monkeypatch.setenv("LLM_CIRCUIT_OPEN_S", "0.05")
+    mock_completion.side_effect = [server_error(), make_completion_response("Back!")]
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+
+    with pytest.raises(Exception):
+        await agent.ainvoke({"messages": [HumanMessage("Hi")]}, thread_config)
+    await asyncio.sleep(0.05)
+    result = await agent.ainvoke({"messages": [HumanMessage("Hi")]}, thread_config)
+
+    assert result["messages"][-1].text == "Back!"
+    assert get_circuit_breaker().state == "closed"
+
+
+async def slow_response(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(2)
+    return make_completion_response("Too late")
+
+
+@pytest.mark.asyncio
+async def test_calls_cut_short_by_the_deadline_count_as_failures(
+    monkeypatch, thread_config: RunnableConfig, mock_completion_optional
+) -> None:
+    monkeypatch.setenv("LLM_CIRCUIT_MIN_CALLS", "1")
+    mock_completion_optional.side_effect = slow_response
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+    config = RunnableConfig(
+        configurable={**thread_config.get("configurable", {}), "run_deadline_s": 0.1}
+    )
+
+    result = await agent.ainvoke({"messages": [HumanMessage("Hi")]}, config)
+
+    assert result["messages"][-1].text == DEADLINE_MESSAGE
+    assert get_circuit_breaker().state == "open"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_calls_have_no_outcome(
+    monkeypatch, thread_config: RunnableConfig, mock_completion_optional
+) -> None:
+    monkeypatch.setenv("LLM_CIRCUIT_MIN_CALLS", "1")
+    monkeypatch.setenv("RUN_DEADLINE_S", "10")
+    mock_completion_optional.side_effect = slow_response
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+
+    run = asyncio.create_task(
+        agent.ainvoke({"messages": [HumanMessage("Hi")]}, thread_config)
+    )
+    await asyncio.sleep(0.1)
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+
+    assert get_circuit_breaker().state == "closed"
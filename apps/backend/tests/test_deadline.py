@@ -0,0 +1,117 @@
+"""Tests for per-run deadlines (`svelte_langgraph.deadline`)."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+
+from svelte_langgraph.deadline import (
+    DEADLINE_MESSAGE,
+    TOOL_DEADLINE_MESSAGE,
+    run_budget,
+)
+from svelte_langgraph.graph import make_graph
+
+from .conftest import make_completion_response
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def test_run_budget_is_the_shorter_setting(monkeypatch) -> None:
+    assert run_budget({}) is None
+    assert run_budget({"run_deadline_s": 5}) == 5
+
+    monkeypatch.setenv("RUN_DEADLINE_S", "30")
+
+    assert run_budget({}) == 30
+    assert run_budget({"run_deadline_s": "5"}) == 5
+    assert run_budget({"run_deadline_s": 60}) == 30
+
+
+@pytest.mark.parametrize("value", ["soon", 0, -1])
+def test_run_budget_rejects(value) -> None:
+    with pytest.raises(ValueError, match="configurable.run_deadline_s"):
+        run_budget({"run_deadline_s": value})
+
+
+def deadline_config(thread_config: RunnableConfig, seconds: float) -> RunnableConfig:
+    configurable = {**thread_config.get("configurable", {}), "run_deadline_s": seconds}
+    return RunnableConfig(configurable=configurable)
+
+
+@pytest.mark.asyncio
+async def test_slow_model_call_ends_the_run_at_the_deadline(
+    thread_config: RunnableConfig, mock_completion_optional
+) -> None:
+    # Optional: respx doesn't count the cancelled request as a call.
+    async def slow(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(2)
+        return make_completion_response("Too late")
+
+    mock_completion_optional.side_effect = slow
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+
+    start = time.monotonic()
+    result = await agent.ainvoke(
+        {"messages": [HumanMessage("Hi")]}, deadline_config(thread_config, 0.1)
+    )
+
+    assert time.monotonic() - start < 1
+    assert result["messages"][-1].text == DEADLINE_MESSAGE
+    assert "run_deadline" not in result
+
+
+@pytest.mark.asyncio
+async def test_slow_tool_is_cancelled_at_the_deadline(
+    monkeypatch, thread_config: RunnableConfig, openai_single_tool_call
+) -> None:
+    cancelled = asyncio.Event()
+
+    @tool
+    async def get_weather(city: str) -> str:
+        """Get weather for a given city."""
+        try:
+            await asyncio.sleep(2)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return f"It's always sunny in {city}!"
+
+    monkeypatch.setattr("svelte_langgraph.graph.get_tools", lambda: [get_weather])
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+
+    result = await agent.ainvoke(
+        {"messages": [HumanMessage("Weather in Paris?")]},
+        deadline_config(thread_config, 0.2),
+    )
+
+    assert cancelled.is_set()
+    tool_message, final = result["messages"][-2:]
+    assert isinstance(tool_message, ToolMessage) and tool_message.status == "error"
+    assert tool_message.text == TOOL_DEADLINE_MESSAGE.format(name="get_weather")
+    assert isinstance(final, AIMessage) and final.text == DEADLINE_MESSAGE
+    # The call after the tool never reached the model.
+    assert openai_single_tool_call.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_applies_to_one_run_only(
+    thread_config: RunnableConfig, mock_completion
+) -> None:
+    mock_completion.return_value = make_completion_response("Hello!")
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+
+    await agent.ainvoke(
+        {"messages": [HumanMessage("Hi")]}, deadline_config(thread_config, 0.05)
+    )
+    await asyncio.sleep(0.1)
+    result = await agent.ainvoke({"messages": [HumanMessage("Again")]}, thread_config)
+
+    assert result["messages"][-1].text == "Hello!"
+    assert mock_completion.call_count == 2
@@ -0,0 +1,313 @@
+"""Tests for hedged model requests with a fallback (`svelte_langgraph.hedging`)."""
+
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+import respx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.outputs.chat_generation import ChatGeneration
+
+from svelte_langgraph.hedging import HedgedChatModel, hedged_stream
+from svelte_langgraph.models import current_models, get_chat_model
+from svelte_langgraph.tools import get_weather
+
+from .conftest import DEFAULT_BASE_URL, make_completion_response
+
+FALLBACK_BASE_URL = "https://mock-fallback.test/v1"
+
+
+pytestmark = pytest.mark.single_provider
+
+
+class Source:
+    """A stream factory: waits `delay`, then yields `texts` (or raises
+    `error`). Records whether it was started and cancelled."""
+
+    def __init__(
+        self, delay: float, *texts: str, error: Exception | None = None
+    ) -> None:
+        self.delay = delay
+        self.texts = texts
+        self.error = error
+        self.started = False
+        self.cancelled = False
+
+    async def _stream(self) -> AsyncIterator[str]:
+        self.started = True
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            for text in self.texts:
+                yield text
+                await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+    def __call__(self) -> AsyncIterator[str]:
+        return self._stream()
+
+
+async def collect(stream: AsyncIterator[str]) -> list[str]:
+    return [item async for item in stream]
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_never_starts_the_fallback() -> None:
+    primary, fallback = Source(0, "a", "b"), Source(0, "x")
+
+    assert await collect(hedged_stream(primary, fallback, 0.1)) == ["a", "b"]
+    assert not fallback.started
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled() -> None:
+    primary, fallback = Source(10, "a"), Source(0.01, "x", "y")
+
+    start = time.monotonic()
+    result = await collect(hedged_stream(primary, fallback, 0.05))
+
+    assert result == ["x", "y"]
+    assert time.monotonic() - start < 1
+    assert primary.cancelled
+
+
+@pytest.mark.asyncio
+async def test_items_that_do_not_decide_the_race_are_held_back() -> None:
+    async def primary() -> AsyncIterator[str]:
+        yield ""
+        await asyncio.sleep(10)
+        yield "late"
+
+    fallback = Source(0.01, "", "x", "y")
+
+    result = await collect(hedged_stream(primary, fallback, 0.05, decides=bool))
+
+    assert result == ["", "x", "y"]
+
+
+@pytest.mark.asyncio
+async def test_primary_still_wins_if_it_answers_first_after_the_hedge() -> None:
+    primary, fallback = Source(0.1, "a"), Source(10, "x")
+
+    assert await collect(hedged_stream(primary, fallback, 0.05)) == ["a"]
+    assert fallback.started and fallback.cancelled
+
+
+@pytest.mark.asyncio
+async def test_failing_primary_falls_back_without_waiting() -> None:
+    primary = Source(0, error=RuntimeError("rate limited"))
+    fallback = Source(0, "x")
+
+    start = time.monotonic()
+    result = await collect(hedged_stream(primary, fallback, 10))
+
+    assert result == ["x"]
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.asyncio
+async def test_both_failing_raises_the_primary_error() -> None:
+    primary = Source(0, error=RuntimeError("primary down"))
+    fallback = Source(0, error=RuntimeError("fallback down"))
+
+    with pytest.raises(RuntimeError, match="primary down") as excinfo:
+        await collect(hedged_stream(primary, fallback, 10))
+
+    assert "fallback down" in "".join(excinfo.value.__notes__)
+
+
+@pytest.mark.asyncio
+async def test_error_after_the_first_chunk_propagates() -> None:
+    async def breaks_midway() -> AsyncIterator[str]:
+        yield "a"
+        raise RuntimeError("connection reset")
+
+    fallback = Source(0, "x")
+
+    with pytest.raises(RuntimeError, match="connection reset"):
+        await collect(hedged_stream(breaks_midway, fallback, 10))
+    assert not fallback.started
+
+
+@pytest.mark.asyncio
+async def test_closing_the_stream_cancels_both_requests() -> None:
+    primary, fallback = Source(0.02, "a", "b"), Source(10, "x")
+    stream = hedged_stream(primary, fallback, 0.01)
+
+    assert await anext(stream) == "a"
+    await stream.aclose()
+
+    assert fallback.cancelled
+
+
+class PacedModel(BaseChatModel):
+    """Streams `text` word by word after `first_token_delay` seconds."""
+
+    text: str
+    first_token_delay: float = 0.0
+    # Open the stream with an empty chunk at once, as OpenAI does.
+    opens_empty: bool = False
+    bound_kwargs: list[dict] = []
+    binds: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "paced"
+
+    def bind_tools(self, tools, **kwargs):
+        self.binds += 1
+        return self.bind(tools=[f"{self.text}:{t.__name__}" for t in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs
+    ) -> ChatResult:
+        self.bound_kwargs.append(kwargs)
+        await asyncio.sleep(self.first_token_delay)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=self.text))]
+        )
+
+    async def _astream(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self.bound_kwargs.append(kwargs)
+        if self.opens_empty:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=""))
+        await asyncio.sleep(self.first_token_delay)
+        for word in self.text.split():
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+
+@pytest.mark.asyncio
+async def test_model_streams_the_fallback_when_primary_is_slow() -> None:
+    model = HedgedChatModel(
+        primary=PacedModel(text="slow primary", first_token_delay=10),
+        fallback=PacedModel(text="fast fallback"),
+        hedge_after=0.05,
+    )
+
+    chunks = [chunk.text async for chunk in model.astream("hi")]
+
+    assert "".join(chunks) == "fast fallback "
+
+
+@pytest.mark.asyncio
+async def test_empty_opening_chunk_does_not_win_the_race() -> None:
+    model = HedgedChatModel(
+        primary=PacedModel(text="slow primary", first_token_delay=10, opens_empty=True),
+        fallback=PacedModel(text="fast fallback", opens_empty=True),
+        hedge_after=0.05,
+    )
+
+    start = time.monotonic()
+    chunks = [chunk.text async for chunk in model.astream("hi")]
+
+    assert "".join(chunks) == "fast fallback "
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.asyncio
+async def test_tools_are_bound_per_model() -> None:
+    primary = PacedModel(text="primary", first_token_delay=10, bound_kwargs=[])
+    fallback = PacedModel(text="fallback", bound_kwargs=[])
+    model = HedgedChatModel(primary=primary, fallback=fallback, hedge_after=0.01)
+
+    result = await model.bind_tools([get_weather], tool_choice="auto").ainvoke("hi")
+
+    assert result.text == "fallback"
+    assert primary.bound_kwargs == [
+        {"tools": ["primary:get_weather"], "tool_choice": "auto"}
+    ]
+    assert fallback.bound_kwargs == [
+        {"tools": ["fallback:get_weather"], "tool_choice": "auto"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_tools_are_bound_once_at_bind_time() -> None:
+    primary = PacedModel(text="primary")
+    fallback = PacedModel(text="fallback")
+    model = HedgedChatModel(primary=primary, fallback=fallback, hedge_after=0.01)
+
+    bound = model.bind_tools([get_weather])
+    for _ in range(3):
+        await bound.ainvoke("hi")
+
+    assert primary.binds == fallback.binds == 1
+
+
+def test_routed_models_share_the_fallback(monkeypatch) -> None:
+    monkeypatch.setenv("CHAT_FALLBACK_MODEL_NAME", "gpt-4o")
+    monkeypatch.setenv("CHAT_MODEL_ROUTES", json.dumps({"draft": "gpt-4.1"}))
+
+    hedged = current_models().build_all()
+
+    assert len(hedged) == 2
+    assert all(isinstance(model, HedgedChatModel) for model in hedged)
+    assert hedged[0].fallback is hedged[1].fallback  # type: ignore[attr-defined]
+
+
+def test_fallback_is_off_by_default() -> None:
+    assert not isinstance(get_chat_model(), HedgedChatModel)
+
+
+@pytest.mark.asyncio
+async def test_env_configured_fallback_against_two_mock_providers(
+    monkeypatch,
+) -> None:
+    """A primary provider slower than CHAT_HEDGE_AFTER_MS loses to the
+    fallback provider configured through CHAT_FALLBACK_MODEL_*."""
+    monkeypatch.setenv("CHAT_MODEL_NAME", "gpt-4o-mini")
+    monkeypatch.setenv("CHAT_FALLBACK_MODEL_NAME", "gpt-4o")
+    monkeypatch.setenv(
+        "CHAT_FALLBACK_MODEL_KWARGS", json.dumps({"base_url": FALLBACK_BASE_URL})
+    )
+    monkeypatch.setenv("CHAT_HEDGE_AFTER_MS", "50")
+
+    primary_requests: list[httpx.Request] = []
+
+    async def slow_primary(request: httpx.Request) -> httpx.Response:
+        primary_requests.append(request)
+        await asyncio.sleep(2)
+        return make_completion_response("From the primary.")
+
+    # The cancelled primary request never completes, so respx doesn't count
+    # it as called.
+    with respx.mock(assert_all_called=False) as respx_mock:
+        respx_mock.post(f"{DEFAULT_BASE_URL}/chat/completions").mock(
+            side_effect=slow_primary
+        )
+        fallback = respx_mock.post(f"{FALLBACK_BASE_URL}/chat/completions").mock(
+            return_value=make_completion_response("From the fallback.")
+        )
+
+        model = get_chat_model()
+        start = time.monotonic()
+        result = await model.ainvoke("hi")
+
+    assert isinstance(model, HedgedChatModel)
+    assert result.content == "From the fallback."
+    assert time.monotonic() - start < 1
+    assert len(primary_requests) == fallback.call_count == 1
+    assert json.loads(fallback.calls.last.request.content)["model"] == "gpt-4o"
+
+
+def test_fallback_kwargs_are_validated_like_the_primary(monkeypatch) -> None:
+    monkeypatch.setenv("CHAT_FALLBACK_MODEL_NAME", "gpt-4o")
+    monkeypatch.setenv("CHAT_FALLBACK_MODEL_KWARGS", '{"model": "x"}')
+
+    with pytest.raises(
+        ValueError, match="CHAT_FALLBACK_MODEL_KWARGS must not include 'model'"
+    ):
+        get_chat_model()
@@ -0,0 +1,70 @@
+"""Import cost of `svelte_langgraph.graph`, which Aegra loads at every server
+start. See `benchmarks/bench_import_time.py` for where the time goes.
+
+Which modules the import defers is checked always. Wall-clock time depends on
+the machine and its load too much for a fixed budget, so the time check only
+runs with `GRAPH_IMPORT_BUDGET_MS` set, to a budget measured on the machine
+that runs it (2.1-3.5s on a development machine).
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+# Fresh interpreters to time the import in; the best counts.
+ATTEMPTS = 3
+
+# Modules the graph only needs once it runs.
+DEFERRED_MODULES = (
+    "langchain_core.prompts",
+    "langchain_openai",
+    "openai",
+    "prometheus_client",
+)
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+def graph_import_ms() -> float:
+    stderr = run_python(
+        "-X", "importtime", "-c", "import svelte_langgraph.graph"
+    ).stderr
+    # The module's own line is the last one: "import time: self | cumulative | name".
+    last = stderr.strip().splitlines()[-1]
+    _, cumulative_us, name = last.split("|")
+    assert name.strip() == "svelte_langgraph.graph"
+    return int(cumulative_us) / 1000
+
+
+def test_graph_import_is_within_budget() -> None:
+    raw_budget = os.getenv("GRAPH_IMPORT_BUDGET_MS", "").strip()
+    if not raw_budget:
+        pytest.skip("set GRAPH_IMPORT_BUDGET_MS to check the import time")
+    budget = float(raw_budget)
+
+    best = min(graph_import_ms() for _ in range(ATTEMPTS))
+
+    assert best <= budget, (
+        f"importing svelte_langgraph.graph took {best:.0f}ms, over the "
+        f"{budget:.0f}ms budget; run benchmarks.bench_import_time to see why"
+    )
+
+
+def test_graph_import_defers_heavy_modules() -> None:
+    script = (
+        "import json, sys, svelte_langgraph.graph;"
+        f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))"
+    )
+
+    assert json.loads(run_python("-c", script).stdout) == []
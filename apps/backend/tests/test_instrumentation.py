@@ -0,0 +1,181 @@
+"""Tests for latency spans (`svelte_langgraph.instrumentation`)."""
+
+import json
+
+import prometheus_client
+import pytest
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from svelte_langgraph.graph import make_graph
+from svelte_langgraph.instrumentation import (
+    FileSpanExporter,
+    InstrumentationMiddleware,
+    OtelSpanExporter,
+    PrometheusSpanExporter,
+    Span,
+    exporter_from_env,
+    set_span_exporter,
+    span,
+)
+from svelte_langgraph.models import current_models
+
+from .conftest import get_weather
+
+
+pytestmark = pytest.mark.single_provider
+
+
+class ListExporter:
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def named(self, name: str) -> list[Span]:
+        return [s for s in self.spans if s.name == name]
+
+
+@pytest.fixture
+def exporter() -> ListExporter:
+    exporter = ListExporter()
+    set_span_exporter(exporter)
+    return exporter
+
+
+def test_exporter_from_env(monkeypatch, tmp_path) -> None:
+    assert exporter_from_env() is None
+
+    monkeypatch.setenv("INSTRUMENTATION_EXPORTER", "file")
+    with pytest.raises(ValueError, match="INSTRUMENTATION_FILE"):
+        exporter_from_env()
+    monkeypatch.setenv("INSTRUMENTATION_FILE", str(tmp_path / "spans.jsonl"))
+    assert isinstance(exporter_from_env(), FileSpanExporter)
+
+    monkeypatch.setenv("INSTRUMENTATION_EXPORTER", "zipkin")
+    with pytest.raises(ValueError, match="INSTRUMENTATION_EXPORTER"):
+        exporter_from_env()
+
+
+def test_span_without_exporter_records_nothing() -> None:
+    with span("prompt"):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_run_records_its_spans(
+    monkeypatch,
+    exporter: ListExporter,
+    thread_config: RunnableConfig,
+    openai_single_tool_call,
+) -> None:
+    monkeypatch.setattr("svelte_langgraph.graph.get_tools", lambda: [get_weather])
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+
+    await agent.ainvoke({"messages": [HumanMessage("Weather?")]}, thread_config)
+
+    names = [s.name for s in exporter.spans]
+    for name in ("phase_gate", "prompt", "model_call", "queue", "generation"):
+        assert name in names
+    assert len(exporter.named("model_call")) == 2
+    # Not streamed: no first token to time.
+    assert not exporter.named("first_token")
+    [tool] = exporter.named("tool")
+    assert tool.attributes["tool"] == "get_weather"
+    assert tool.attributes["status"] == "ok"
+    call = exporter.named("model_call")[0]
+    assert call.attributes["model"] == "gpt-4o-mini"
+    assert call.attributes["phase"] == "research"
+    assert call.attributes["status"] == "ok"
+    thread_id = thread_config.get("configurable", {})["thread_id"]
+    assert {s.attributes["thread_id"] for s in exporter.spans} == {thread_id}
+    queue = exporter.named("queue")[0]
+    assert queue.start == call.start and queue.duration <= call.duration
+
+
+@pytest.mark.asyncio
+async def test_streamed_call_records_first_token(exporter: ListExporter) -> None:
+    model = GenericFakeChatModel(messages=iter([AIMessage("Hello there friend")]))
+    agent = create_agent(
+        model=model, middleware=[InstrumentationMiddleware(current_models())]
+    )
+
+    async for _ in agent.astream(
+        {"messages": [HumanMessage("Hi")]}, stream_mode="messages"
+    ):
+        pass
+
+    [first_token] = exporter.named("first_token")
+    [generation] = exporter.named("generation")
+    assert first_token.start == generation.start
+    assert first_token.duration <= generation.duration
+
+
+@pytest.mark.asyncio
+async def test_failing_exporter_does_not_fail_the_run(
+    thread_config: RunnableConfig, openai_basic_conversation
+) -> None:
+    class Broken:
+        def export(self, span: Span) -> None:
+            raise OSError("disk full")
+
+    set_span_exporter(Broken())
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+
+    result = await agent.ainvoke({"messages": [HumanMessage("Hi")]}, thread_config)
+
+    assert isinstance(result["messages"][-1], AIMessage)
+
+
+def sample_span(name: str = "tool") -> Span:
+    return Span(name, 1_700_000_000.0, 0.25, {"tool": "get_weather", "run_id": "r"})
+
+
+def test_file_exporter_appends_json_lines(tmp_path) -> None:
+    path = tmp_path / "spans.jsonl"
+    exporter = FileSpanExporter(path)
+
+    exporter.export(sample_span())
+    exporter.export(sample_span("prompt"))
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["tool", "prompt"]
+    assert lines[0]["attributes"]["tool"] == "get_weather"
+
+
+def test_prometheus_exporter_observes_histogram() -> None:
+    labels = {"span": "tool", "target": "get_weather"}
+
+    def count() -> float:
+        value = prometheus_client.REGISTRY.get_sample_value(
+            "agent_span_duration_seconds_count", labels
+        )
+        return value or 0.0
+
+    before = count()
+    PrometheusSpanExporter().export(sample_span())
+
+    assert count() == before + 1
+
+
+def test_otel_exporter_keeps_times_and_attributes() -> None:
+    memory = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(memory))
+
+    OtelSpanExporter(provider).export(sample_span())
+
+    [finished] = memory.get_finished_spans()
+    assert finished.name == "tool"
+    assert finished.start_time == 1_700_000_000 * 10**9
+    assert finished.end_time == finished.start_time + 250_000_000
+    assert finished.attributes == {"tool": "get_weather", "run_id": "r"}
@@ -0,0 +1,101 @@
+"""Tests for the event loop lag monitor (`svelte_langgraph.loop_lag`)."""
+
+import asyncio
+import time
+
+import prometheus_client
+import pytest
+from aegra_api.core.auth_deps import require_auth
+from aegra_api.models import User
+from fastapi.testclient import TestClient
+
+from svelte_langgraph.loop_lag import (
+    Block,
+    LoopLagMonitor,
+    get_loop_lag_monitor,
+    monitor_from_env,
+    reset_loop_lag_monitor,
+)
+from svelte_langgraph.webapp import app
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def test_monitor_is_opt_in(monkeypatch) -> None:
+    assert monitor_from_env() is None
+
+    monkeypatch.setenv("LOOP_LAG_MONITOR", "true")
+    monkeypatch.setenv("LOOP_LAG_THRESHOLD_MS", "250")
+    monitor = monitor_from_env()
+    assert monitor is not None
+    assert (monitor.interval, monitor.threshold) == (0.1, 0.25)
+
+    monkeypatch.setenv("LOOP_LAG_INTERVAL_MS", "0")
+    with pytest.raises(ValueError, match="LOOP_LAG_INTERVAL_MS"):
+        monitor_from_env()
+
+
+def test_percentiles_of_recent_lag() -> None:
+    monitor = LoopLagMonitor(interval=0.1, threshold=0.1)
+    for i in range(1, 101):
+        monitor.record(i / 1000)
+
+    lag = monitor.snapshot()["lag"]
+
+    assert lag["count"] == 100
+    assert lag["p50_seconds"] == 0.05
+    assert lag["p99_seconds"] == 0.099
+    assert lag["max_seconds"] == 0.1
+    gauge = prometheus_client.REGISTRY.get_sample_value(
+        "event_loop_lag_recent_seconds", {"quantile": "0.95"}
+    )
+    assert gauge == 0.095
+
+
+def block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_catches_the_blocking_stack() -> None:
+    def blocks() -> float:
+        value = prometheus_client.REGISTRY.get_sample_value("event_loop_blocks_total")
+        return value or 0.0
+
+    before = blocks()
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+    task = asyncio.create_task(monitor.run())
+    await asyncio.sleep(0.05)
+
+    block_the_loop(0.3)
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert monitor.snapshot()["lag"]["max_seconds"] >= 0.25
+    [block] = [b for b in monitor.blocks if "block_the_loop" in b.stack]
+    assert block.blocked_seconds > 0.05
+    assert blocks() >= before + 1
+
+
+def test_loop_lag_route(monkeypatch) -> None:
+    app.dependency_overrides[require_auth] = lambda: User(identity="test-user")
+    try:
+        assert TestClient(app).get("/loop-lag").status_code == 404
+
+        monkeypatch.setenv("LOOP_LAG_MONITOR", "1")
+        reset_loop_lag_monitor()
+        monitor = get_loop_lag_monitor()
+        assert monitor is not None
+        monitor.record(0.02)
+        monitor.blocks.append(Block(at=1.0, blocked_seconds=0.3, stack="secret.py"))
+        response = TestClient(app).get("/loop-lag")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["lag"]["max_seconds"] == 0.02
+    # Stacks are logged, never served.
+    assert response.json()["blocks"] == [{"at": 1.0, "blocked_seconds": 0.3}]
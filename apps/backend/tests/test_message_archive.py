@@ -0,0 +1,236 @@
+"""Tests for bounded checkpoint messages (`reducers.bounded_messages`) and the
+message archive (`svelte_langgraph.message_archive`)."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aegra_api.core.auth_deps import require_auth
+from aegra_api.core.orm import get_session
+from aegra_api.models import User
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph.message import Messages
+from langgraph.store.memory import InMemoryStore
+
+from svelte_langgraph.graph import make_graph
+from svelte_langgraph.message_archive import MessageArchive
+from svelte_langgraph.reducers import bounded_messages, keep_recent
+from svelte_langgraph.webapp import app, get_message_archive
+
+from .conftest import (
+    get_weather,
+    make_completion_response,
+)
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def texts(messages) -> list[str]:
+    return [message.text for message in messages]
+
+
+def tool_exchange(call_id: str) -> list:
+    return [
+        AIMessage("", tool_calls=[{"name": "t", "args": {}, "id": call_id}]),
+        ToolMessage("result", tool_call_id=call_id),
+    ]
+
+
+def test_keep_recent_keeps_the_last_messages() -> None:
+    messages = [HumanMessage(str(i)) for i in range(5)]
+
+    assert texts(keep_recent(messages, 3)) == ["2", "3", "4"]
+    assert keep_recent(messages, 10) == messages
+    assert texts(keep_recent(messages, 1, keep_last=2)) == ["3", "4"]
+
+
+def test_keep_recent_keeps_tool_exchanges_whole() -> None:
+    messages = [HumanMessage("q"), *tool_exchange("a"), AIMessage("answer")]
+
+    kept = keep_recent(messages, 2)
+
+    assert isinstance(kept[0], AIMessage) and kept[0].tool_calls
+    assert len(kept) == 3
+
+
+def test_bounded_messages_is_add_messages_without_a_bound(monkeypatch) -> None:
+    left: Messages = [HumanMessage(str(i), id=str(i)) for i in range(5)]
+
+    assert len(bounded_messages(left, [HumanMessage("new")])) == 6
+
+    monkeypatch.setenv("CHECKPOINT_MAX_MESSAGES", "2")
+    assert texts(bounded_messages(left, [HumanMessage("new")])) == ["4", "new"]
+    # Never drops what's being written.
+    assert len(bounded_messages(left, [HumanMessage(n) for n in "abc"])) == 3
+
+
+def test_bounded_messages_rejects_invalid_bound(monkeypatch) -> None:
+    monkeypatch.setenv("CHECKPOINT_MAX_MESSAGES", "0")
+
+    with pytest.raises(ValueError, match="CHECKPOINT_MAX_MESSAGES must be positive"):
+        bounded_messages([], [HumanMessage("hi")])
+
+
+@pytest.mark.asyncio
+async def test_append_archives_only_new_messages() -> None:
+    archive = MessageArchive(InMemoryStore())
+    history = [HumanMessage(str(i), id=str(i)) for i in range(4)]
+
+    assert await archive.append("t-1", history[:2]) == 2
+    assert await archive.append("t-1", history[:3]) == 1
+    # The archived prefix was dropped from the list in the meantime.
+    assert await archive.append("t-1", history[3:]) == 1
+    assert await archive.append("t-1", history[3:]) == 0
+
+    assert await archive.count("t-1") == 4
+    assert texts(await archive.page("t-1", 1, 2)) == ["1", "2"]
+    assert texts(await archive.page("t-1", 3, 50)) == ["3"]
+    assert await archive.page("t-2") == []
+
+
+class YieldingStore(InMemoryStore):
+    """Suspends on every batch, as a database-backed store does."""
+
+    async def abatch(self, ops):
+        await asyncio.sleep(0)
+        return await super().abatch(ops)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_to_a_thread_lose_nothing() -> None:
+    archive = MessageArchive(YieldingStore())
+    first = [HumanMessage("q", id="q"), AIMessage("a", id="a")]
+    second = [HumanMessage("q", id="q"), AIMessage("b", id="b")]
+
+    await asyncio.gather(archive.append("t-1", first), archive.append("t-1", second))
+
+    assert await archive.count("t-1") == 3
+    assert texts(await archive.page("t-1")) in (["q", "a", "b"], ["q", "b", "a"])
+
+
+@pytest.fixture
+def store() -> InMemoryStore:
+    return InMemoryStore()
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_is_bounded_and_archive_has_everything(
+    monkeypatch, thread_config: RunnableConfig, mock_completion, store
+) -> None:
+    monkeypatch.setenv("CHECKPOINT_MAX_MESSAGES", "3")
+    mock_completion.side_effect = [
+        make_completion_response(f"Answer {i}") for i in range(3)
+    ]
+    agent = make_graph(thread_config).copy(
+        update={"checkpointer": InMemorySaver(), "store": store}
+    )
+
+    for i in range(3):
+        await agent.ainvoke({"messages": [HumanMessage(f"Q {i}")]}, thread_config)
+
+    state = await agent.aget_state(thread_config)
+    assert texts(state.values["messages"]) == ["Answer 1", "Q 2", "Answer 2"]
+    thread_id = thread_config.get("configurable", {})["thread_id"]
+    archived = await MessageArchive(store).page(thread_id)
+    assert texts(archived) == [
+        "Q 0",
+        "Answer 0",
+        "Q 1",
+        "Answer 1",
+        "Q 2",
+        "Answer 2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_regenerate_archives_only_the_new_answer(
+    thread_config: RunnableConfig, mock_completion, store
+) -> None:
+    mock_completion.side_effect = [
+        make_completion_response("First answer"),
+        make_completion_response("Second answer"),
+    ]
+    agent = make_graph(thread_config).copy(
+        update={"checkpointer": InMemorySaver(), "store": store}
+    )
+    await agent.ainvoke({"messages": [HumanMessage("Question")]}, thread_config)
+
+    # Regenerate: run again from the checkpoint before the model answered.
+    [before_answer] = [
+        snapshot
+        async for snapshot in agent.aget_state_history(thread_config)
+        if snapshot.next == ("model",)
+    ]
+    await agent.ainvoke(None, before_answer.config)
+
+    state = await agent.aget_state(thread_config)
+    assert texts(state.values["messages"]) == ["Question", "Second answer"]
+    thread_id = thread_config.get("configurable", {})["thread_id"]
+    archived = await MessageArchive(store).page(thread_id)
+    assert texts(archived) == ["Question", "First answer", "Second answer"]
+
+
+@pytest.mark.asyncio
+async def test_tool_results_stay_with_their_call(
+    monkeypatch, thread_config: RunnableConfig, openai_single_tool_call, store
+) -> None:
+    monkeypatch.setenv("CHECKPOINT_MAX_MESSAGES", "2")
+    monkeypatch.setattr("svelte_langgraph.graph.get_tools", lambda: [get_weather])
+    agent = make_graph(thread_config).copy(
+        update={"checkpointer": InMemorySaver(), "store": store}
+    )
+
+    await agent.ainvoke({"messages": [HumanMessage("Weather?")]}, thread_config)
+
+    messages = (await agent.aget_state(thread_config)).values["messages"]
+    assert isinstance(messages[0], AIMessage) and messages[0].tool_calls
+    assert isinstance(messages[1], ToolMessage)
+    thread_id = thread_config.get("configurable", {})["thread_id"]
+    archived = await MessageArchive(store).page(thread_id)
+    assert [type(m) for m in archived] == [
+        HumanMessage,
+        AIMessage,
+        ToolMessage,
+        AIMessage,
+    ]
+
+
+@pytest.fixture
+def client(store: InMemoryStore):
+    app.dependency_overrides[require_auth] = lambda: User(identity="test-user")
+    app.dependency_overrides[get_session] = lambda: None
+    app.dependency_overrides[get_message_archive] = lambda: MessageArchive(store)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_messages_route_pages_the_archive(
+    client: TestClient, store: InMemoryStore
+) -> None:
+    history = [HumanMessage(f"m{i}", id=str(i)) for i in range(5)]
+    await MessageArchive(store).append("t-1", history)
+
+    with patch("svelte_langgraph.webapp.get_thread", new=AsyncMock()) as get_thread:
+        response = client.get("/threads/t-1/messages?offset=3&limit=10")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 5
+    assert [m["content"] for m in body["messages"]] == ["m3", "m4"]
+    assert get_thread.call_args.kwargs["user"].identity == "test-user"
+
+
+def test_messages_route_is_scoped_to_the_owner(client: TestClient) -> None:
+    not_found = HTTPException(404, "Thread 't-1' not found")
+    with patch(
+        "svelte_langgraph.webapp.get_thread", new=AsyncMock(side_effect=not_found)
+    ):
+        response = client.get("/threads/t-1/messages")
+
+    assert response.status_code == 404
@@ -0,0 +1,161 @@
+"""Tests for the mock model's latency profiles (`mock_profiles.py`, served by
+`slow_mock.py`)."""
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from starlette.types import Receive, Scope, Send
+
+from mock_profiles import (
+    Distribution,
+    LatencyProfileMiddleware,
+    Profile,
+    current_profile,
+    default_profile,
+    load_profiles,
+    paced,
+)
+from slow_mock import app as slow_mock_app
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def test_distribution_parse() -> None:
+    assert Distribution.parse(250).sample() == 0.25
+    assert Distribution.parse({"dist": "normal", "mean": -50, "stdev": 0}).sample() == 0
+    assert (
+        0.005
+        <= Distribution.parse({"dist": "uniform", "low": 5, "high": 20}).sample()
+        <= 0.02
+    )
+
+    with pytest.raises(ValueError, match="one of"):
+        Distribution.parse({"dist": "pareto", "alpha": 1})
+    with pytest.raises(ValueError, match="takes"):
+        Distribution.parse({"dist": "normal", "mean": 25})
+    with pytest.raises(ValueError, match="median must be > 0"):
+        Distribution.parse({"dist": "lognormal", "median": 0, "sigma": 1})
+
+
+def test_profile_parse_validates() -> None:
+    profile = Profile.parse(
+        "p", {"ttft_ms": 100, "error_statuses": [503], "models": ["gpt-4o"]}
+    )
+    assert profile.ttft_ms.sample() == 0.1
+    assert profile.error_statuses == (503,)
+
+    with pytest.raises(ValueError, match="unknown fields"):
+        Profile.parse("p", {"ttft": 100})
+    with pytest.raises(ValueError, match="error_rate"):
+        Profile.parse("p", {"error_rate": 2})
+
+
+def test_load_profiles_from_file(monkeypatch, tmp_path) -> None:
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps({"fast": {"ttft_ms": 1}, "mine": {"token_ms": 5}}))
+    monkeypatch.setenv("MOCK_PROFILES", str(path))
+
+    profiles = load_profiles(0.02)
+
+    assert profiles["constant"].token_ms.sample() == 0.02
+    assert profiles["fast"].ttft_ms.sample() == 0.001
+    assert "typical" in profiles
+    assert default_profile(profiles).name == "constant"
+    monkeypatch.setenv("MOCK_PROFILE", "mine")
+    assert default_profile(profiles).name == "mine"
+    monkeypatch.setenv("MOCK_PROFILE", "missing")
+    with pytest.raises(ValueError, match="MOCK_PROFILE"):
+        default_profile(profiles)
+
+
+async def profile_name_app(scope: Scope, receive: Receive, send: Send) -> None:
+    """Answers with the name of the request's profile."""
+    await receive()
+    profile = current_profile.get()
+    body = (profile.name if profile else "").encode()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+PROFILES = {
+    "default": Profile("default"),
+    "gpt": Profile("gpt", models=("gpt-4o",)),
+    "picked": Profile("picked"),
+    "failing": Profile(
+        "failing", error_rate=1, error_statuses=(429,), retry_after_s=1.5
+    ),
+}
+
+
+@pytest.fixture
+async def client():
+    app = LatencyProfileMiddleware(profile_name_app, PROFILES, PROFILES["default"])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://mock") as c:
+        yield c
+
+
+async def test_request_profile_by_header_then_model(client: httpx.AsyncClient) -> None:
+    async def profile(model: str, header: str | None = None) -> str:
+        headers = {"x-mock-profile": header} if header else {}
+        response = await client.post("/chat", json={"model": model}, headers=headers)
+        return response.text
+
+    assert await profile("other") == "default"
+    assert await profile("gpt-4o") == "gpt"
+    assert await profile("gpt-4o", header="picked") == "picked"
+
+    response = await client.post("/chat", json={}, headers={"x-mock-profile": "nope"})
+    assert response.status_code == 400
+
+
+async def test_injected_errors_say_when_to_retry(client: httpx.AsyncClient) -> None:
+    response = await client.post(
+        "/chat", json={"model": "m"}, headers={"x-mock-profile": "failing"}
+    )
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+    assert response.headers["retry-after-ms"] == "1500"
+    assert response.json()["error"]["type"] == "rate_limit_error"
+
+
+async def test_paced_waits_ttft_then_after_each_chunk() -> None:
+    profile = Profile(
+        "p", ttft_ms=Distribution.parse(50), token_ms=Distribution.parse(20)
+    )
+    start = time.perf_counter()
+    arrivals = []
+
+    async for _ in paced(["a", "b", "c"], profile):
+        arrivals.append(time.perf_counter() - start)
+    total = time.perf_counter() - start
+
+    assert arrivals[0] >= 0.05
+    assert arrivals[2] - arrivals[0] >= 0.04
+    assert total >= 0.11
+
+
+async def test_slow_mock_serves_profiles() -> None:
+    transport = httpx.ASGITransport(app=slow_mock_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://mock") as c:
+        body = {
+            "model": "mock",
+            "stream": True,
+            "messages": [{"role": "user", "content": "Hi"}],
+        }
+        response = await asyncio.wait_for(
+            c.post(
+                "/openai/chat/completions",
+                json=body,
+                headers={"x-mock-profile": "constant"},
+            ),
+            timeout=10,
+        )
+
+    assert response.status_code == 200
+    assert response.text.endswith("data: [DONE]\n\n")
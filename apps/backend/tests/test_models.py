@@ -12,19 +12,36 @@ Covers:
   path is NOT deprecated by adding provider-prefix support, and Ollama-style
   tags like `llama3:8b` must not be mistaken for a `{provider}:` prefix.
 - Invalid `CHAT_MODEL_KWARGS` JSON fails loudly at startup.
+- The model registry: settings parsed once into immutable entries, models
+  reused, and reloads that swap configs without disturbing in-flight streams.
 """
 
+import asyncio
 import json
+import os
+import signal
+import threading
+from collections.abc import AsyncIterator
+from pathlib import Path
 
+import httpx
 import pytest
 import respx
 
-from svelte_langgraph.models import _has_known_provider_prefix, get_chat_model
+from svelte_langgraph import models
+from svelte_langgraph.models import (
+    ModelSpec,
+    _has_known_provider_prefix,
+    get_chat_model,
+    get_model_registry,
+    install_reload_signal,
+    parse_model_config,
+    watch_model_config,
+)
 
 from .conftest import (
     DEFAULT_BASE_URL,
     OPENROUTER_MOCK_BASE_URL,
-    ProviderCase,
     make_completion_response,
 )
 
@@ -35,14 +52,7 @@ from .conftest import (
 # provider/model combination.
 
 
-@pytest.fixture(scope="module")
-def provider_case() -> ProviderCase:
-    return ProviderCase(mock_base_url=DEFAULT_BASE_URL)
-
-
-@pytest.fixture
-def chat_model() -> None:
-    return None
+pytestmark = pytest.mark.single_provider
 
 
 @pytest.mark.parametrize(
@@ -218,3 +228,185 @@ def test_non_object_chat_model_kwargs_json_raises(
         match=f"CHAT_MODEL_KWARGS must be a JSON object, got {expected_type_name}",
     ):
         get_chat_model()
+
+
+def test_chat_model_is_built_once(monkeypatch) -> None:
+    """Settings are parsed once and the model reused, not rebuilt per call."""
+    monkeypatch.setenv("CHAT_MODEL_NAME", "gpt-4o-mini")
+
+    first = get_chat_model()
+    monkeypatch.setenv("CHAT_MODEL_NAME", "gpt-4o")
+
+    assert get_chat_model() is first
+
+
+def test_model_config_is_immutable() -> None:
+    config = parse_model_config({"CHAT_MODEL_KWARGS": '{"temperature": 0.1}'})
+
+    with pytest.raises(TypeError):
+        config.default.kwargs["temperature"] = 1.0  # type: ignore[index]
+    with pytest.raises(AttributeError):
+        config.default.name = "gpt-4o"  # type: ignore[misc]
+
+
+def write_model_config(path: Path, settings: dict) -> None:
+    path.write_text(json.dumps(settings))
+
+
+def test_reload_swaps_in_the_new_config(monkeypatch, tmp_path: Path) -> None:
+    config_file = tmp_path / "models.json"
+    write_model_config(config_file, {"CHAT_MODEL_NAME": "gpt-4o-mini"})
+    monkeypatch.setenv("MODEL_CONFIG_FILE", str(config_file))
+    registry = get_model_registry()
+    before = registry.current()
+    old_model = get_chat_model()
+
+    write_model_config(
+        config_file,
+        {"CHAT_MODEL_NAME": "gpt-4o", "CHAT_MODEL_KWARGS": {"temperature": 0.2}},
+    )
+
+    assert registry.reload()
+    assert registry.current().config.default == ModelSpec(
+        "gpt-4o", {"temperature": 0.2}
+    )
+    assert get_chat_model() is not old_model
+    # Whoever still holds the old set (a run in flight) keeps its models.
+    assert before.model() is old_model
+    assert not registry.reload()
+
+
+def test_invalid_reload_keeps_the_current_config(monkeypatch, tmp_path: Path) -> None:
+    config_file = tmp_path / "models.json"
+    write_model_config(config_file, {"CHAT_MODEL_NAME": "gpt-4o-mini"})
+    monkeypatch.setenv("MODEL_CONFIG_FILE", str(config_file))
+    registry = get_model_registry()
+    current = registry.current()
+
+    write_model_config(config_file, {"CHAT_MODEL_KWARGS": {"model": "x"}})
+
+    assert not registry.reload()
+    assert registry.current() is current
+
+
+def test_reload_keeps_the_current_config_if_models_fail_to_build(
+    monkeypatch, tmp_path: Path
+) -> None:
+    config_file = tmp_path / "models.json"
+    write_model_config(config_file, {"CHAT_MODEL_NAME": "gpt-4o-mini"})
+    monkeypatch.setenv("MODEL_CONFIG_FILE", str(config_file))
+    registry = get_model_registry()
+    current = registry.current()
+    init_model = models._init_model
+
+    def without_anthropic(spec: ModelSpec):
+        if spec.name.startswith("anthropic:"):
+            raise ImportError("Initializing ChatAnthropic requires langchain-anthropic")
+        return init_model(spec)
+
+    monkeypatch.setattr(models, "_init_model", without_anthropic)
+    write_model_config(config_file, {"CHAT_MODEL_NAME": "anthropic:claude-x"})
+
+    assert not registry.reload()
+    assert registry.current() is current
+    assert get_chat_model() is current.model()
+
+
+class AsyncByteStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: AsyncIterator[bytes]) -> None:
+        self._chunks = chunks
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._chunks:
+            yield chunk
+
+
+@pytest.mark.asyncio
+async def test_reload_does_not_disturb_an_in_flight_stream(
+    monkeypatch, tmp_path: Path
+) -> None:
+    config_file = tmp_path / "models.json"
+    write_model_config(config_file, {"CHAT_MODEL_NAME": "gpt-4o-mini"})
+    monkeypatch.setenv("MODEL_CONFIG_FILE", str(config_file))
+    registry = get_model_registry()
+
+    async def stream_body(request):
+        for word in ["Hello", " there"]:
+            chunk = {
+                "id": "chatcmpl-test",
+                "object": "chat.completion.chunk",
+                "created": 1,
+                "model": "gpt-4o-mini",
+                "choices": [{"index": 0, "delta": {"content": word}}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+            await asyncio.sleep(0.01)
+        yield b"data: [DONE]\n\n"
+
+    with respx.mock(base_url=DEFAULT_BASE_URL) as respx_mock:
+        route = respx_mock.post("/chat/completions").mock(
+            side_effect=lambda request: httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                stream=AsyncByteStream(stream_body(request)),
+            )
+        )
+        stream = get_chat_model().astream("hi")
+        first = await anext(stream)
+
+        write_model_config(config_file, {"CHAT_MODEL_NAME": "gpt-4o"})
+        assert registry.reload()
+
+        rest = [chunk async for chunk in stream]
+
+    assert first.text + "".join(c.text for c in rest) == "Hello there"
+    assert json.loads(route.calls.last.request.content)["model"] == "gpt-4o-mini"
+
+
+@pytest.mark.asyncio
+async def test_config_file_changes_trigger_a_reload(tmp_path: Path) -> None:
+    config_file = tmp_path / "models.json"
+    write_model_config(config_file, {"CHAT_MODEL_NAME": "gpt-4o-mini"})
+    reloads: list[int] = []
+
+    class Registry:
+        def reload(self) -> bool:
+            reloads.append(threading.get_ident())
+            return True
+
+    watcher = asyncio.create_task(
+        watch_model_config(Registry(), config_file, interval=0.01)  # type: ignore[arg-type]
+    )
+    await asyncio.sleep(0.03)
+    assert reloads == []
+
+    write_model_config(config_file, {"CHAT_MODEL_NAME": "gpt-4o"})
+    os.utime(config_file, (0, 1))
+    await asyncio.sleep(0.05)
+    watcher.cancel()
+
+    # Once, and off the loop.
+    assert len(reloads) == 1 and reloads[0] != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_sighup_reloads_off_the_loop() -> None:
+    reloaded = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    threads: list[int] = []
+
+    class Registry:
+        def reload(self) -> bool:
+            threads.append(threading.get_ident())
+            loop.call_soon_threadsafe(reloaded.set)
+            return True
+
+    if not install_reload_signal(Registry()):  # type: ignore[arg-type]
+        pytest.skip("SIGHUP handlers aren't supported here")
+    try:
+        os.kill(os.getpid(), signal.SIGHUP)
+        await asyncio.wait_for(reloaded.wait(), timeout=5)
+    finally:
+        loop.remove_signal_handler(signal.SIGHUP)
+
+    assert threads != [threading.get_ident()]
@@ -0,0 +1,118 @@
+"""Tests for phase-scoped tool binding (`svelte_langgraph.phase_tools`)."""
+
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool
+from langgraph.checkpoint.memory import InMemorySaver
+
+from svelte_langgraph import phase_tools
+from svelte_langgraph.graph import make_graph
+from svelte_langgraph.phase_tools import (
+    offered_in,
+    phase_tool_schemas,
+    prepare_tool_schemas,
+)
+from svelte_langgraph.tools import (
+    ToolPolicy,
+    change_phase,
+    get_tool_policies,
+    get_tools,
+)
+
+from .conftest import get_weather
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def test_tools_are_offered_in_their_phases() -> None:
+    research_only = ToolPolicy(phases=frozenset({"research"}))
+
+    assert offered_in("research", "lookup", research_only)
+    assert not offered_in("review", "lookup", research_only)
+    assert offered_in("review", "lookup", ToolPolicy())
+
+
+def test_change_phase_is_offered_in_every_phase() -> None:
+    never = ToolPolicy(phases=frozenset())
+
+    for phase in ("research", "draft", "review"):
+        assert offered_in(phase, "change_phase", never)
+
+
+def tools() -> list[StructuredTool]:
+    return [
+        StructuredTool.from_function(coroutine=get_weather),
+        StructuredTool.from_function(change_phase),
+    ]
+
+
+def test_schemas_are_built_once_per_phase() -> None:
+    policies = get_tool_policies()
+
+    research = phase_tool_schemas("research", tools(), policies)
+    review = phase_tool_schemas("review", tools(), policies)
+
+    # New tool objects for the same functions, as every graph has.
+    assert phase_tool_schemas("research", tools(), policies) is research
+    assert [s["function"]["name"] for s in research] == ["get_weather", "change_phase"]
+    assert [s["function"]["name"] for s in review] == ["change_phase"]
+    # No injected arguments in the schema.
+    assert review[0]["function"]["parameters"]["required"] == ["phase"]
+
+
+def test_schema_cache_tells_functions_apart() -> None:
+    async def other_weather(city: str, unit: str) -> str:
+        """Get weather for a given city."""
+        return city
+
+    first = StructuredTool.from_function(coroutine=get_weather, name="get_weather")
+    second = StructuredTool.from_function(coroutine=other_weather, name="get_weather")
+
+    [schema] = phase_tool_schemas("draft", [first], {})
+    [other] = phase_tool_schemas("draft", [second], {})
+
+    assert "unit" not in schema["function"]["parameters"]["properties"]
+    assert "unit" in other["function"]["parameters"]["properties"]
+
+
+@pytest.mark.asyncio
+async def test_each_model_call_binds_the_phase_tools(
+    monkeypatch, thread_config: RunnableConfig, openai_change_phase_tool_call
+) -> None:
+    """The research call is offered `get_weather`; the call after switching
+    to review isn't."""
+    monkeypatch.setattr(
+        "svelte_langgraph.graph.get_tools", lambda: [get_weather, change_phase]
+    )
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+
+    await agent.ainvoke({"messages": [HumanMessage("Let's review.")]}, thread_config)
+
+    offered = [
+        [t["function"]["name"] for t in json.loads(call.request.content)["tools"]]
+        for call in openai_change_phase_tool_call.calls
+    ]
+    assert offered == [["get_weather", "change_phase"], ["change_phase"]]
+
+
+def test_tools_are_built_once() -> None:
+    assert get_tools() is get_tools()
+    assert [t.name for t in get_tools()] == ["get_weather", "change_phase"]
+
+
+@pytest.mark.asyncio
+async def test_prepared_schemas_serve_every_run(
+    thread_config: RunnableConfig, openai_basic_conversation
+) -> None:
+    phase_tools.clear_tool_schema_cache()
+    prepare_tool_schemas()
+    prepared = dict(phase_tools._schema_cache)
+
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+    await agent.ainvoke({"messages": [HumanMessage("Hi")]}, thread_config)
+
+    assert phase_tools._schema_cache == prepared
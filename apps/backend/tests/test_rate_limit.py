@@ -0,0 +1,340 @@
+"""Tests for model-call rate limiting and coordinated 429 backoff
+(`svelte_langgraph.rate_limit`)."""
+
+import asyncio
+import json
+import time
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+from uuid import uuid4
+
+import httpx
+import pytest
+from aegra_api.models import User
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+
+from svelte_langgraph import rate_limit
+from svelte_langgraph.graph import make_graph
+from svelte_langgraph.rate_limit import (
+    BUSY_MESSAGE,
+    RATE_LIMITED_MESSAGE,
+    ProviderBackoff,
+    RateLimiter,
+    TokenBucket,
+    retry_after,
+)
+
+from .conftest import DEFAULT_BASE_URL, make_completion_response
+
+
+pytestmark = pytest.mark.single_provider
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list[float]:
+    now = [1000.0]
+    monkeypatch.setattr("svelte_langgraph.rate_limit.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_waits_for_the_deficit(clock: list[float]) -> None:
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(2) == pytest.approx(2.0)
+    clock[0] += 1
+    assert bucket.reserve(1) == pytest.approx(2.0)
+
+
+def test_token_bucket_refills_up_to_capacity(clock: list[float]) -> None:
+    bucket = TokenBucket(per_minute=60)
+    bucket.reserve(30)
+
+    clock[0] += 3600
+
+    assert bucket.full
+    assert bucket.tokens == 60
+
+
+@pytest.mark.asyncio
+async def test_user_over_limit_is_rejected_others_are_not(clock) -> None:
+    limiter = RateLimiter(user_rpm=2, max_wait=0)
+
+    assert await limiter.acquire("alice", 0) is None
+    assert await limiter.acquire("alice", 0) is None
+    assert await limiter.acquire("alice", 0) == "user"
+    assert await limiter.acquire("bob", 0) is None
+
+
+@pytest.mark.asyncio
+async def test_rejected_user_takes_no_global_capacity(clock) -> None:
+    limiter = RateLimiter(user_rpm=1, global_rpm=2, max_wait=0)
+
+    assert await limiter.acquire("alice", 0) is None
+    for _ in range(5):
+        assert await limiter.acquire("alice", 0) == "user"
+
+    assert await limiter.acquire("bob", 0) is None
+    assert await limiter.acquire("carol", 0) == "global"
+
+
+@pytest.mark.asyncio
+async def test_token_budget_is_corrected_by_actual_usage(clock) -> None:
+    limiter = RateLimiter(user_tpm=1000, max_wait=0)
+
+    assert await limiter.acquire("alice", 100) is None
+    limiter.charge("alice", 850)
+
+    assert await limiter.acquire("alice", 100) == "user"
+    limiter.charge("alice", -500)
+    assert await limiter.acquire("alice", 100) is None
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_when_within_max_wait() -> None:
+    limiter = RateLimiter(global_rpm=600, max_wait=1)
+    start = time.monotonic()
+
+    for _ in range(601):
+        assert await limiter.acquire(None, 0) is None
+
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_cancelled_wait_gives_the_reservation_back() -> None:
+    limiter = RateLimiter(global_rpm=1, max_wait=120)
+    assert await limiter.acquire(None, 0) is None
+
+    waiting = asyncio.create_task(limiter.acquire(None, 0))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    # Back to the one request taken, not two.
+    assert limiter._global.buckets["rpm"].tokens == pytest.approx(0, abs=0.01)
+
+
+def rate_limited(headers: dict[str, str] | None = None) -> httpx.Response:
+    return httpx.Response(
+        429,
+        headers=headers or {},
+        json={"error": {"message": "Rate limit exceeded", "type": "rate_limit"}},
+        request=httpx.Request("POST", f"{DEFAULT_BASE_URL}/chat/completions"),
+    )
+
+
+class StatusError(Exception):
+    def __init__(self, response: httpx.Response) -> None:
+        self.response = response
+        self.status_code = response.status_code
+
+
+def test_retry_after_parsing() -> None:
+    in_a_minute = datetime.now(UTC) + timedelta(seconds=60)
+
+    assert retry_after(StatusError(rate_limited({"retry-after": "7"}))) == 7
+    assert retry_after(StatusError(rate_limited({"retry-after-ms": "250"}))) == 0.25
+    http_date = format_datetime(in_a_minute, usegmt=True)
+    parsed = retry_after(StatusError(rate_limited({"retry-after": http_date})))
+    assert parsed is not None and 55 < parsed <= 60
+    assert retry_after(StatusError(rate_limited())) is None
+    assert retry_after(RuntimeError()) is None
+
+
+def test_backoff_extends_never_shortens(clock: list[float]) -> None:
+    backoff = ProviderBackoff()
+
+    backoff.rate_limited(StatusError(rate_limited({"retry-after": "10"})), clock[0])
+    backoff.rate_limited(StatusError(rate_limited({"retry-after": "1"})), clock[0])
+
+    assert backoff.delay() == 10
+
+
+def test_backoff_without_retry_after_is_exponential(clock: list[float]) -> None:
+    backoff = ProviderBackoff()
+
+    delays = []
+    for _ in range(3):
+        backoff.rate_limited(StatusError(rate_limited()), clock[0])
+        delays.append(backoff.delay())
+        clock[0] += backoff.delay()
+
+    assert delays == [1, 2, 4]
+    backoff.succeeded()
+    backoff.rate_limited(StatusError(rate_limited()), clock[0])
+    assert backoff.delay() == 1
+
+
+def test_concurrent_429s_back_off_once(clock: list[float]) -> None:
+    """Calls in flight together that all get a 429 are one episode."""
+    backoff = ProviderBackoff()
+    started = clock[0]
+    clock[0] += 0.5
+
+    for _ in range(8):
+        backoff.rate_limited(StatusError(rate_limited()), started)
+
+    assert backoff.delay() == 1
+    # The next episode, after the pause, backs off further.
+    clock[0] += backoff.delay()
+    backoff.rate_limited(StatusError(rate_limited()), clock[0])
+    assert backoff.delay() == 2
+
+
+def user_config(identity: str, user_id: str | None = None) -> RunnableConfig:
+    """A run of `identity`, as Aegra configures it; `user_id` is whatever
+    the client passed, if anything."""
+    return RunnableConfig(
+        configurable={
+            "thread_id": str(uuid4()),
+            "user_id": user_id or identity,
+            "langgraph_auth_user": User(identity=identity),
+        }
+    )
+
+
+async def ask(config: RunnableConfig) -> str:
+    agent = make_graph(config).copy(update={"checkpointer": InMemorySaver()})
+    result = await agent.ainvoke({"messages": [HumanMessage("Hi")]}, config)
+    return result["messages"][-1].text
+
+
+@pytest.fixture
+def no_client_retries(monkeypatch) -> None:
+    monkeypatch.setenv("CHAT_MODEL_KWARGS", json.dumps({"max_retries": 0}))
+
+
+@pytest.mark.asyncio
+async def test_user_over_limit_gets_an_ai_message(monkeypatch, mock_completion) -> None:
+    monkeypatch.setenv("LLM_RATE_LIMIT_USER_RPM", "1")
+    monkeypatch.setenv("LLM_RATE_LIMIT_MAX_WAIT_S", "0")
+    mock_completion.return_value = make_completion_response("Hello!")
+
+    assert await ask(user_config("alice")) == "Hello!"
+    assert await ask(user_config("alice")) == RATE_LIMITED_MESSAGE
+    assert await ask(user_config("bob")) == "Hello!"
+    assert mock_completion.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_client_supplied_user_id_keeps_the_users_bucket(
+    monkeypatch, mock_completion
+) -> None:
+    monkeypatch.setenv("LLM_RATE_LIMIT_USER_RPM", "1")
+    monkeypatch.setenv("LLM_RATE_LIMIT_MAX_WAIT_S", "0")
+    mock_completion.return_value = make_completion_response("Hello!")
+
+    assert await ask(user_config("alice", user_id="one")) == "Hello!"
+    # A new user_id per run is still alice's bucket.
+    assert await ask(user_config("alice", user_id="two")) == RATE_LIMITED_MESSAGE
+    assert mock_completion.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_saturation_beyond_the_user_gets_the_busy_message(
+    monkeypatch, mock_completion
+) -> None:
+    monkeypatch.setenv("LLM_RATE_LIMIT_USER_RPM", "10")
+    monkeypatch.setenv("LLM_RATE_LIMIT_GLOBAL_RPM", "1")
+    monkeypatch.setenv("LLM_RATE_LIMIT_MAX_WAIT_S", "1")
+    mock_completion.return_value = make_completion_response("Hello!")
+
+    assert await ask(user_config("alice")) == "Hello!"
+    # Bob is well within his own limits; the process isn't.
+    assert await ask(user_config("bob")) == BUSY_MESSAGE
+
+    rate_limit.reset_rate_limits()
+    rate_limit.provider_backoff.until = time.monotonic() + 10
+    assert await ask(user_config("bob")) == BUSY_MESSAGE
+    assert mock_completion.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_call_cancelled_before_the_provider_is_not_counted(
+    monkeypatch, mock_completion
+) -> None:
+    monkeypatch.setenv("LLM_RATE_LIMIT_USER_RPM", "1")
+    mock_completion.return_value = make_completion_response("Hello!")
+    rate_limit.provider_backoff.until = time.monotonic() + 0.2
+
+    run = asyncio.create_task(ask(user_config("alice")))
+    await asyncio.sleep(0.05)
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+    await asyncio.sleep(0.2)
+
+    # Her one request a minute wasn't used up.
+    assert await ask(user_config("alice")) == "Hello!"
+    assert mock_completion.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_429_is_retried_after_retry_after(
+    no_client_retries, mock_completion
+) -> None:
+    mock_completion.side_effect = [
+        rate_limited({"retry-after": "0.05"}),
+        make_completion_response("Hello!"),
+    ]
+    config = user_config("alice")
+    agent = make_graph(config).copy(update={"checkpointer": InMemorySaver()})
+
+    start = time.monotonic()
+    result = await agent.ainvoke({"messages": [HumanMessage("Hi")]}, config)
+
+    assert result["messages"][-1].text == "Hello!"
+    assert time.monotonic() - start >= 0.05
+    assert mock_completion.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_429_pauses_every_run(no_client_retries, mock_completion) -> None:
+    """A 429 in one run holds back the other runs' calls too."""
+    sent: list[float] = []
+    responses = iter(
+        [
+            rate_limited({"retry-after": "0.2"}),
+            make_completion_response("One"),
+            make_completion_response("Two"),
+        ]
+    )
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        sent.append(time.monotonic())
+        return next(responses)
+
+    mock_completion.side_effect = respond
+
+    async def ask(user: str, delay: float) -> AIMessage:
+        await asyncio.sleep(delay)
+        config = user_config(user)
+        agent = make_graph(config).copy(update={"checkpointer": InMemorySaver()})
+        result = await agent.ainvoke({"messages": [HumanMessage("Hi")]}, config)
+        return result["messages"][-1]
+
+    await asyncio.gather(ask("alice", 0), ask("bob", 0.05))
+
+    assert len(sent) == 3
+    # Bob's first call waited for the pause alice's 429 started.
+    assert sent[1] - sent[0] >= 0.19 and sent[2] - sent[0] >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_429_gives_up_after_max_retries(
+    monkeypatch, no_client_retries, mock_completion
+) -> None:
+    monkeypatch.setenv("LLM_RATE_LIMIT_MAX_RETRIES", "1")
+    mock_completion.side_effect = lambda request: rate_limited({"retry-after": "0.01"})
+    config = user_config("alice")
+    agent = make_graph(config).copy(update={"checkpointer": InMemorySaver()})
+
+    with pytest.raises(Exception) as excinfo:
+        await agent.ainvoke({"messages": [HumanMessage("Hi")]}, config)
+
+    assert rate_limit.is_rate_limit_error(excinfo.value)
+    assert mock_completion.call_count == 2
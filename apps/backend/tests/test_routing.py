@@ -0,0 +1,144 @@
+"""Tests for per-phase model routing and usage reporting
+(`svelte_langgraph.routing`)."""
+
+import json
+
+import pytest
+from aegra_api.core.auth_deps import require_auth
+from aegra_api.models import User
+from fastapi.testclient import TestClient
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+
+from svelte_langgraph.graph import make_graph
+from svelte_langgraph.models import (
+    ModelConfig,
+    ModelSet,
+    ModelSpec,
+    parse_model_routes,
+)
+from svelte_langgraph.phase import Phase
+from svelte_langgraph.routing import model_label, model_usage
+from svelte_langgraph.tools import change_phase
+from svelte_langgraph.webapp import app
+
+from .conftest import get_weather
+
+
+pytestmark = pytest.mark.single_provider
+
+
+@pytest.fixture(autouse=True)
+def clear_model_usage():
+    model_usage.clear()
+    yield
+    model_usage.clear()
+
+
+def test_parse_model_routes_accepts_names_and_objects() -> None:
+    routes = parse_model_routes(
+        json.dumps(
+            {
+                "research": "gpt-4o-mini",
+                "draft": {"name": "gpt-4o", "kwargs": {"temperature": 0.2}},
+            }
+        )
+    )
+
+    assert routes == {
+        "research": ModelSpec("gpt-4o-mini"),
+        "draft": ModelSpec("gpt-4o", {"temperature": 0.2}),
+    }
+
+
+def test_empty_model_routes_route_nothing() -> None:
+    assert parse_model_routes("") == {}
+    assert parse_model_routes("  ") == {}
+
+
+@pytest.mark.parametrize(
+    ("value", "match"),
+    [
+        ("[]", "CHAT_MODEL_ROUTES must be a JSON object, got list"),
+        ('{"bogus": "gpt-4o"}', "Invalid phase 'bogus'"),
+        ('{"draft": 1}', r"CHAT_MODEL_ROUTES\['draft'\] must be a model name"),
+        ('{"draft": {"kwargs": {}}}', "must be a model name"),
+        ('{"draft": {"name": "gpt-4o", "temp": 1}}', "unknown keys"),
+        (
+            '{"draft": {"name": "gpt-4o", "kwargs": {"model": "x"}}}',
+            r"CHAT_MODEL_ROUTES\['draft'\]\['kwargs'\] must not include 'model'",
+        ),
+    ],
+)
+def test_parse_model_routes_rejects(value: str, match: str) -> None:
+    with pytest.raises(ValueError, match=match):
+        parse_model_routes(value)
+
+
+def test_routed_models_are_reused() -> None:
+    models = ModelSet(ModelConfig(default=ModelSpec("gpt-4o-mini")))
+
+    first = models.model(ModelSpec("gpt-4o", {"temperature": 0.2}))
+    second = models.model(ModelSpec("gpt-4o", {"temperature": 0.2}))
+    other = models.model(ModelSpec("gpt-4o", {"temperature": 0.3}))
+
+    assert first is second
+    assert other is not first
+
+
+def test_calls_are_labelled_with_the_model_they_run_on() -> None:
+    routes: dict[Phase, ModelSpec] = {"draft": ModelSpec("gpt-4o")}
+    before = ModelSet(ModelConfig(default=ModelSpec("gpt-4o-mini"), routes=routes))
+    # After a reload that changed the default model.
+    after = ModelSet(ModelConfig(default=ModelSpec("gpt-4.1"), routes=routes))
+
+    assert model_label(before, "draft") == model_label(after, "draft") == "gpt-4o"
+    assert model_label(before, "research") == "gpt-4o-mini"
+    assert model_label(after, "research") == "gpt-4.1"
+
+
+@pytest.mark.asyncio
+async def test_each_model_call_uses_the_current_phase_route(
+    monkeypatch, thread_config: RunnableConfig, openai_change_phase_tool_call
+) -> None:
+    """The call that changes phase runs on the research route; the one after
+    the `change_phase` tool already runs on the review route."""
+    monkeypatch.setenv("CHAT_MODEL_ROUTES", json.dumps({"review": "gpt-4o"}))
+    monkeypatch.setattr(
+        "svelte_langgraph.graph.get_tools", lambda: [get_weather, change_phase]
+    )
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+
+    await agent.ainvoke({"messages": [HumanMessage("Let's review.")]}, thread_config)
+
+    models = [
+        json.loads(call.request.content)["model"]
+        for call in openai_change_phase_tool_call.calls
+    ]
+    assert models == ["gpt-4o-mini", "gpt-4o"]
+
+    research = model_usage.get("research", "gpt-4o-mini")
+    review = model_usage.get("review", "gpt-4o")
+    assert research is not None and review is not None
+    assert (research.calls, review.calls) == (1, 1)
+    # Token usage from the mock completion (10 prompt / 20 completion tokens).
+    assert (review.input_tokens, review.output_tokens) == (10, 20)
+    assert review.latency_seconds > 0
+
+
+def test_model_usage_route_serves_the_snapshot() -> None:
+    model_usage.record("draft", "gpt-4o", 0.5, None)
+    model_usage.record("draft", "gpt-4o", 1.5, None, error=True)
+    app.dependency_overrides[require_auth] = lambda: User(identity="test-user")
+    try:
+        response = TestClient(app).get("/model-usage")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    [usage] = response.json()
+    assert usage["phase"] == "draft" and usage["model"] == "gpt-4o"
+    assert (usage["calls"], usage["errors"]) == (2, 1)
+    assert usage["mean_latency_seconds"] == 1.0
+    assert usage["max_latency_seconds"] == 1.5
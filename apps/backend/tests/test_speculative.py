@@ -0,0 +1,252 @@
+"""Tests for speculative tool execution (`svelte_langgraph.speculative`)."""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Any
+
+import pytest
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.messages.tool import tool_call_chunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+
+from svelte_langgraph.graph import make_graph
+from svelte_langgraph.tools import ToolPolicy, change_phase
+
+
+ScriptItem = ChatGenerationChunk | float | Exception | Callable[[], None]
+
+
+pytestmark = pytest.mark.single_provider
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Streams one script per call: yields chunks, sleeps on floats, raises
+    exceptions and calls callables, in order."""
+
+    scripts: Iterator[list[ScriptItem]]
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> Runnable:
+        return self.bind()
+
+    def _generate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        raise NotImplementedError("ScriptedChatModel only streams")
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for item in next(self.scripts):
+            if isinstance(item, ChatGenerationChunk):
+                yield item
+            elif isinstance(item, Exception):
+                raise item
+            elif callable(item):
+                item()
+            else:
+                await asyncio.sleep(item)
+
+
+def text(content: str) -> ChatGenerationChunk:
+    return ChatGenerationChunk(message=AIMessageChunk(content=content))
+
+
+def call(
+    index: int, args: str, id: str | None = None, name: str | None = None
+) -> ChatGenerationChunk:
+    return ChatGenerationChunk(
+        message=AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                tool_call_chunk(name=name, args=args, id=id, index=index)
+            ],
+        )
+    )
+
+
+@pytest.fixture
+def events() -> list[str]:
+    return []
+
+
+@pytest.fixture
+def make_agent(monkeypatch, events: list[str]):
+    """Build the production graph around a scripted model and a get_weather
+    that records when it starts and whether it was cancelled."""
+
+    async def get_weather(city: str) -> str:
+        """Get weather for a given city."""
+        events.append(f"start {city}")
+        try:
+            await asyncio.sleep(0.01 if city != "Slow" else 10)
+        except asyncio.CancelledError:
+            events.append(f"cancelled {city}")
+            raise
+        return f"Sunny in {city}"
+
+    def make(*scripts: list[ScriptItem], speculative: bool = True):
+        if speculative:
+            monkeypatch.setenv("TOOL_SPECULATIVE_EXECUTION", "1")
+        else:
+            monkeypatch.delenv("TOOL_SPECULATIVE_EXECUTION", raising=False)
+        model = ScriptedChatModel(scripts=iter(scripts))
+        monkeypatch.setattr("svelte_langgraph.graph.get_chat_model", lambda: model)
+        monkeypatch.setattr(
+            "svelte_langgraph.graph.get_tools", lambda: [get_weather, change_phase]
+        )
+        graph = make_graph(RunnableConfig())
+        return graph.copy(update={"checkpointer": InMemorySaver()})
+
+    return make
+
+
+async def stream_turn(agent, thread_config: RunnableConfig) -> dict:
+    async for _ in agent.astream(
+        {"messages": [HumanMessage("Weather?")]}, thread_config, stream_mode="messages"
+    ):
+        pass
+    return (await agent.aget_state(thread_config)).values
+
+
+def two_cities(events: list[str]) -> list[ScriptItem]:
+    return [
+        call(0, '{"city": ', id="call_1", name="get_weather"),
+        call(0, '"Paris"}'),
+        0.05,
+        call(1, '{"city": "Rome"}', id="call_2", name="get_weather"),
+        0.05,
+        lambda: events.append("stream end"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_tools_start_while_model_is_streaming(
+    make_agent, events: list[str], thread_config: RunnableConfig
+) -> None:
+    agent = make_agent(two_cities(events), [text("Sunny in both.")])
+
+    values = await stream_turn(agent, thread_config)
+
+    assert events == ["start Paris", "start Rome", "stream end"]
+    tool_messages = [m for m in values["messages"] if isinstance(m, ToolMessage)]
+    assert [(m.tool_call_id, m.content) for m in tool_messages] == [
+        ("call_1", "Sunny in Paris"),
+        ("call_2", "Sunny in Rome"),
+    ]
+    assert values["messages"][-1].content == "Sunny in both."
+
+
+@pytest.mark.asyncio
+async def test_tools_wait_for_the_message_when_disabled(
+    make_agent, events: list[str], thread_config: RunnableConfig
+) -> None:
+    agent = make_agent(two_cities(events), [text("Sunny.")], speculative=False)
+
+    await stream_turn(agent, thread_config)
+
+    assert events[0] == "stream end"
+    assert sorted(events[1:]) == ["start Paris", "start Rome"]
+
+
+@pytest.mark.asyncio
+async def test_model_failure_cancels_in_flight_tools(
+    make_agent, events: list[str], thread_config: RunnableConfig
+) -> None:
+    agent = make_agent(
+        [
+            call(0, '{"city": "Slow"}', id="call_1", name="get_weather"),
+            0.05,
+            RuntimeError("provider hung up"),
+        ]
+    )
+
+    with pytest.raises(RuntimeError, match="provider hung up"):
+        await stream_turn(agent, thread_config)
+    await asyncio.sleep(0)
+
+    assert events == ["start Slow", "cancelled Slow"]
+
+
+@pytest.mark.asyncio
+async def test_state_writes_keep_tool_call_order(
+    make_agent, events: list[str], thread_config: RunnableConfig
+) -> None:
+    """`change_phase` isn't speculative; interleaved with a speculated call,
+    the last `change_phase` in `tool_calls` order still wins."""
+    agent = make_agent(
+        [
+            call(0, '{"phase": "draft"}', id="call_1", name="change_phase"),
+            call(1, '{"city": "Paris"}', id="call_2", name="get_weather"),
+            call(2, '{"phase": "review"}', id="call_3", name="change_phase"),
+        ],
+        [text("Done.")],
+    )
+
+    values = await stream_turn(agent, thread_config)
+
+    assert values["phase"] == "review"
+    tool_messages = [m for m in values["messages"] if isinstance(m, ToolMessage)]
+    assert [m.tool_call_id for m in tool_messages] == ["call_1", "call_2", "call_3"]
+    assert events == ["start Paris"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_speculated_args_get_the_regular_error(
+    make_agent, events: list[str], thread_config: RunnableConfig
+) -> None:
+    agent = make_agent(
+        [call(0, '{"town": "Paris"}', id="call_1", name="get_weather")],
+        [text("Sorry.")],
+    )
+
+    values = await stream_turn(agent, thread_config)
+
+    tool_message = next(m for m in values["messages"] if isinstance(m, ToolMessage))
+    assert tool_message.status == "error"
+    assert "city" in tool_message.text
+    assert events == []
+
+
+@pytest.mark.asyncio
+async def test_threads_reusing_a_call_id_keep_their_own_results(
+    monkeypatch, make_agent, events: list[str]
+) -> None:
+    """Some providers number call ids per response; two threads' `call_0`s
+    must not claim or discard each other's speculation."""
+    # Uncached, so a result run twice shows.
+    monkeypatch.setattr(
+        "svelte_langgraph.graph.get_tool_policies",
+        lambda: {"get_weather": ToolPolicy(speculative=True)},
+    )
+    agent = make_agent(
+        [call(0, '{"city": "Paris"}', id="call_0", name="get_weather"), 0.05],
+        [call(0, '{"city": "Rome"}', id="call_0", name="get_weather"), 0.05],
+        [text("Done.")],
+        [text("Done.")],
+    )
+
+    paris, rome = await asyncio.gather(
+        stream_turn(agent, RunnableConfig(configurable={"thread_id": "paris"})),
+        stream_turn(agent, RunnableConfig(configurable={"thread_id": "rome"})),
+    )
+
+    for values, city in ((paris, "Paris"), (rome, "Rome")):
+        tool_message = next(m for m in values["messages"] if isinstance(m, ToolMessage))
+        assert tool_message.content == f"Sunny in {city}"
+    # Each ran once, speculatively; neither was cancelled and run again.
+    assert sorted(events) == ["start Paris", "start Rome"]
@@ -0,0 +1,144 @@
+"""Tests for state-only writes that bypass the run lifecycle.
+
+Covers `svelte_langgraph.state_update` (validation and the checkpoint write
+itself) and the `/threads/{thread_id}/state-sync` route in
+`svelte_langgraph.webapp` that exposes it through Aegra.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aegra_api.core.auth_deps import require_auth
+from aegra_api.core.orm import get_session
+from aegra_api.models import ThreadStateUpdateResponse, User
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from svelte_langgraph.state_update import (
+    STATE_UPDATE_AS_NODE,
+    apply_state_update,
+    validate_state_update,
+)
+from svelte_langgraph.webapp import app
+
+from .conftest import make_completion_response
+
+# The state-only path never reaches the model, so the provider/model matrix
+# from conftest adds nothing here; pin it to a single case.
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def test_validate_state_update_accepts_valid_phase() -> None:
+    assert validate_state_update({"phase": "draft"}) == {"phase": "draft"}
+
+
+@pytest.mark.parametrize(
+    ("values", "match"),
+    [
+        ({}, "at least one field"),
+        ({"phase": "bogus"}, "Invalid phase"),
+        ({"phase": ""}, "Invalid phase"),
+        ({"messages": []}, "may only set"),
+        ({"phase": "draft", "messages": []}, "may only set"),
+    ],
+)
+def test_validate_state_update_rejects(values: dict, match: str) -> None:
+    with pytest.raises(ValueError, match=match):
+        validate_state_update(values)
+
+
+@pytest.mark.asyncio
+async def test_apply_state_update_skips_the_model(
+    agent, thread_config: RunnableConfig, mock_completion_optional
+) -> None:
+    """The write lands in the checkpoint without any model call and leaves
+    nothing pending, on a fresh thread."""
+    await apply_state_update(agent, thread_config, {"phase": "draft"})
+
+    state = await agent.aget_state(thread_config)
+    assert state.values["phase"] == "draft"
+    assert state.next == ()
+    assert mock_completion_optional.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_apply_state_update_after_conversation(
+    agent, thread_config: RunnableConfig, mock_completion
+) -> None:
+    """On a thread with history the write keeps the messages, leaves nothing
+    pending, and the next chat turn sees the new phase."""
+    mock_completion.side_effect = [
+        make_completion_response("First answer"),
+        make_completion_response("Second answer"),
+    ]
+    await agent.ainvoke({"messages": [HumanMessage(content="Hi")]}, thread_config)
+
+    await apply_state_update(agent, thread_config, {"phase": "review"})
+
+    state = await agent.aget_state(thread_config)
+    assert state.values["phase"] == "review"
+    assert len(state.values["messages"]) == 2
+    assert state.next == ()
+    assert mock_completion.call_count == 1
+
+    result = await agent.ainvoke(
+        {"messages": [HumanMessage(content="Again")]}, thread_config
+    )
+    assert result["phase"] == "review"
+    assert isinstance(result["messages"][-1], AIMessage)
+    assert result["messages"][-1].content == "Second answer"
+
+
+@pytest.mark.asyncio
+async def test_apply_state_update_rejects_invalid_phase_before_writing(
+    agent, thread_config: RunnableConfig, mock_completion_optional
+) -> None:
+    """Unlike a run, an invalid value never reaches the checkpoint."""
+    with pytest.raises(ValueError, match="Invalid phase"):
+        await apply_state_update(agent, thread_config, {"phase": "bogus"})
+
+    state = await agent.aget_state(thread_config)
+    assert "phase" not in state.values
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[require_auth] = lambda: User(identity="test-user")
+    app.dependency_overrides[get_session] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_state_sync_route_rejects_invalid_phase(client: TestClient) -> None:
+    with patch(
+        "svelte_langgraph.webapp.update_thread_state", new=AsyncMock()
+    ) as update:
+        response = client.post(
+            "/threads/t-1/state-sync", json={"values": {"phase": "bogus"}}
+        )
+
+    assert response.status_code == 422
+    assert "Invalid phase" in response.json()["detail"]
+    update.assert_not_called()
+
+
+def test_state_sync_route_delegates_to_aegra(client: TestClient) -> None:
+    checkpoint = {"thread_id": "t-1", "checkpoint_id": "c-1", "checkpoint_ns": ""}
+    with patch(
+        "svelte_langgraph.webapp.update_thread_state",
+        new=AsyncMock(return_value=ThreadStateUpdateResponse(checkpoint=checkpoint)),
+    ) as update:
+        response = client.post(
+            "/threads/t-1/state-sync", json={"values": {"phase": "draft"}}
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"checkpoint": checkpoint}
+    kwargs = update.call_args.kwargs
+    assert kwargs["thread_id"] == "t-1"
+    assert kwargs["user"].identity == "test-user"
+    assert kwargs["request"].values == {"phase": "draft"}
+    assert kwargs["request"].as_node == STATE_UPDATE_AS_NODE
@@ -0,0 +1,123 @@
+"""Tests for time-to-first-token and inter-token latency tracking
+(`svelte_langgraph.stream_latency`)."""
+
+import prometheus_client
+import pytest
+from aegra_api.core.auth_deps import require_auth
+from aegra_api.models import User
+from fastapi.testclient import TestClient
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+
+from svelte_langgraph.models import current_models
+from svelte_langgraph.stream_latency import (
+    StreamLatencyMiddleware,
+    StreamLatencyStats,
+    _has_answered,
+    stream_latency,
+)
+from svelte_langgraph.webapp import app
+
+
+pytestmark = pytest.mark.single_provider
+
+
+@pytest.fixture(autouse=True)
+def fresh_stream_latency():
+    stream_latency.clear()
+    yield
+    stream_latency.clear()
+
+
+def test_snapshot_has_percentiles_per_phase_and_model() -> None:
+    stats = StreamLatencyStats()
+    for i in range(1, 101):
+        stats.record_ttft("draft", "gpt-4o", i / 100)
+    stats.record_gaps("research", "default", [0.01, 0.03])
+
+    draft, research = stats.snapshot()
+
+    assert (draft["phase"], draft["model"]) == ("draft", "gpt-4o")
+    assert draft["time_to_first_token"]["count"] == 100
+    assert draft["time_to_first_token"]["p50_seconds"] == 0.5
+    assert draft["time_to_first_token"]["p95_seconds"] == 0.95
+    assert draft["inter_token_gap"]["count"] == 0
+    assert research["inter_token_gap"]["max_seconds"] == 0.03
+    assert research["time_to_first_token"]["count"] == 0
+
+
+def test_first_token_is_the_runs_first_ai_text() -> None:
+    tool_call = AIMessage("", tool_calls=[{"name": "t", "args": {}, "id": "1"}])
+
+    assert not _has_answered([HumanMessage("Hi")])
+    assert not _has_answered(
+        [HumanMessage("Hi"), tool_call, ToolMessage("r", tool_call_id="1")]
+    )
+    assert _has_answered([HumanMessage("Hi"), AIMessage("Hello")])
+    # An earlier run's answer doesn't count.
+    assert not _has_answered(
+        [HumanMessage("Hi"), AIMessage("Hello"), HumanMessage("More")]
+    )
+
+
+def fake_agent():
+    model = GenericFakeChatModel(
+        messages=iter([AIMessage("Hello there friend"), AIMessage("Again you say")])
+    )
+    return create_agent(
+        model=model,
+        middleware=[StreamLatencyMiddleware(current_models())],
+        checkpointer=InMemorySaver(),
+    )
+
+
+def ttft_count() -> float:
+    value = prometheus_client.REGISTRY.get_sample_value(
+        "llm_time_to_first_token_seconds_count",
+        {"phase": "research", "model": "gpt-4o-mini"},
+    )
+    return value or 0.0
+
+
+@pytest.mark.asyncio
+async def test_streamed_runs_record_ttft_and_gaps(
+    thread_config: RunnableConfig,
+) -> None:
+    agent = fake_agent()
+    before = ttft_count()
+
+    for text in ("Hi", "And again"):
+        async for _ in agent.astream(
+            {"messages": [HumanMessage(text)]}, thread_config, stream_mode="messages"
+        ):
+            pass
+
+    [entry] = stream_latency.snapshot()
+    assert (entry["phase"], entry["model"]) == ("research", "gpt-4o-mini")
+    assert entry["time_to_first_token"]["count"] == 2
+    assert entry["time_to_first_token"]["p50_seconds"] > 0
+    assert entry["inter_token_gap"]["count"] >= 4
+    assert ttft_count() == before + 2
+
+
+@pytest.mark.asyncio
+async def test_unstreamed_runs_record_nothing(thread_config: RunnableConfig) -> None:
+    await fake_agent().ainvoke({"messages": [HumanMessage("Hi")]}, thread_config)
+
+    assert stream_latency.snapshot() == []
+
+
+def test_stream_latency_route() -> None:
+    stream_latency.record_ttft("research", "default", 0.4)
+    app.dependency_overrides[require_auth] = lambda: User(identity="test-user")
+    try:
+        response = TestClient(app).get("/stream-latency")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    [entry] = response.json()
+    assert entry["time_to_first_token"]["p95_seconds"] == 0.4
@@ -0,0 +1,178 @@
+"""Tests for coalescing streamed model chunks (`svelte_langgraph.streaming`)."""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+import pytest
+import respx
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.runnables import RunnableBinding
+
+from svelte_langgraph.models import get_chat_model
+from svelte_langgraph.streaming import CoalescingChatModel, coalesce_chunks
+from svelte_langgraph.tools import get_weather
+
+from .conftest import DEFAULT_BASE_URL, make_completion_response
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def chunk(text: str) -> ChatGenerationChunk:
+    return ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+
+async def source(
+    *items: str | float | Exception,
+) -> AsyncIterator[ChatGenerationChunk]:
+    """Yield a chunk per string, sleep per float, raise per exception."""
+    for item in items:
+        if isinstance(item, str):
+            yield chunk(item)
+        elif isinstance(item, Exception):
+            raise item
+        else:
+            await asyncio.sleep(item)
+
+
+async def collect(stream: AsyncIterator[ChatGenerationChunk]) -> list[str]:
+    return [c.text async for c in stream]
+
+
+@pytest.mark.asyncio
+async def test_first_chunk_is_not_delayed() -> None:
+    """A long window must not hold back the first token."""
+    stream = coalesce_chunks(source("first", 1.0, "second"), window=5.0)
+
+    start = time.monotonic()
+    first = await anext(stream)
+
+    assert first.text == "first"
+    assert time.monotonic() - start < 0.5
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_first_token_after_empty_chunk_is_not_delayed() -> None:
+    """OpenAI opens with an empty role-only chunk; the first token after it
+    must not wait out the window either."""
+    stream = coalesce_chunks(source("", 0.05, "Hello", 0.05, " there"), window=5.0)
+
+    assert (await anext(stream)).text == ""
+    start = time.monotonic()
+    first = await anext(stream)
+
+    assert first.text == "Hello"
+    assert time.monotonic() - start < 0.5
+    assert [c.text async for c in stream] == [" there"]
+
+
+def test_sync_stream_passes_chunks_through_until_content() -> None:
+    class EmptyFirst(GenericFakeChatModel):
+        def _stream(self, *args, **kwargs):
+            yield chunk("")
+            yield from super()._stream(*args, **kwargs)
+
+    inner = EmptyFirst(messages=iter([AIMessage("Hello there friend")]))
+    model = CoalescingChatModel(inner=inner, window=5.0)
+
+    texts = [c.text for c in model.stream("hi")]
+
+    assert texts == ["", "Hello", " there friend"]
+
+
+@pytest.mark.asyncio
+async def test_chunks_within_window_are_merged() -> None:
+    texts = await collect(
+        coalesce_chunks(source("a", "b", "c", "d"), window=1.0, max_chars=100)
+    )
+
+    assert texts == ["a", "bcd"]
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_buffer_reaches_max_chars() -> None:
+    texts = await collect(
+        coalesce_chunks(source("x", "12", "34", "56", "7"), window=1.0, max_chars=4)
+    )
+
+    assert texts == ["x", "1234", "567"]
+
+
+@pytest.mark.asyncio
+async def test_stalled_source_flushes_after_window() -> None:
+    """Text already received is emitted once the window elapses, even while
+    the provider is stalled before the next chunk."""
+    stream = coalesce_chunks(source("a", "b", 1.0, "c"), window=0.05)
+    assert (await anext(stream)).text == "a"
+
+    start = time.monotonic()
+    second = await anext(stream)
+
+    assert second.text == "b"
+    assert time.monotonic() - start < 0.5
+    assert [c.text async for c in stream] == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_source_error_propagates_after_buffered_chunks() -> None:
+    stream = coalesce_chunks(source("a", RuntimeError("boom")), window=1.0)
+
+    assert (await anext(stream)).text == "a"
+    with pytest.raises(RuntimeError, match="boom"):
+        await anext(stream)
+
+
+@pytest.mark.asyncio
+async def test_wrapper_emits_fewer_chunks_with_same_text() -> None:
+    text = " ".join(f"token{n}" for n in range(100))
+    inner = GenericFakeChatModel(messages=iter([AIMessage(text)]))
+    model = CoalescingChatModel(inner=inner, window=1.0, max_chars=64)
+
+    chunks = [c async for c in model.astream("hi")]
+
+    assert 1 < len(chunks) < 50
+    assert "".join(c.text for c in chunks) == text
+
+
+@pytest.mark.asyncio
+async def test_get_chat_model_wraps_when_configured(monkeypatch) -> None:
+    monkeypatch.setenv("CHAT_MODEL_NAME", "gpt-4o-mini")
+    monkeypatch.setenv("CHAT_STREAM_COALESCE_MS", "30")
+    monkeypatch.setenv("CHAT_STREAM_COALESCE_MAX_CHARS", "128")
+
+    model = get_chat_model()
+
+    assert isinstance(model, CoalescingChatModel)
+    assert model.window == pytest.approx(0.03)
+    assert model.max_chars == 128
+
+    with respx.mock(base_url=DEFAULT_BASE_URL) as respx_mock:
+        respx_mock.post("/chat/completions").mock(
+            return_value=make_completion_response("Hello!")
+        )
+        result = await model.ainvoke("hi")
+
+    assert result.content == "Hello!"
+
+
+def test_get_chat_model_unwrapped_by_default(monkeypatch) -> None:
+    monkeypatch.delenv("CHAT_STREAM_COALESCE_MS", raising=False)
+
+    assert not isinstance(get_chat_model(), CoalescingChatModel)
+
+
+def test_bind_tools_delegates_to_inner(monkeypatch) -> None:
+    """Tool schemas are formatted by the wrapped provider model and carried on
+    the wrapper's binding."""
+    monkeypatch.setenv("CHAT_MODEL_NAME", "gpt-4o-mini")
+    monkeypatch.setenv("CHAT_STREAM_COALESCE_MS", "30")
+
+    bound = get_chat_model().bind_tools([get_weather])
+
+    assert isinstance(bound, RunnableBinding)
+    assert isinstance(bound.bound, CoalescingChatModel)
+    assert bound.kwargs["tools"][0]["function"]["name"] == "get_weather"
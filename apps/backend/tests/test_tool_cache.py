@@ -0,0 +1,284 @@
+"""Tests for the tool result cache (`svelte_langgraph.tool_cache`)."""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage, ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool as create_tool
+from langgraph.checkpoint.memory import InMemorySaver
+from openai.types.chat.chat_completion_message_tool_call import (
+    ChatCompletionMessageToolCall,
+    Function,
+)
+
+from svelte_langgraph.graph import make_graph
+from svelte_langgraph.tool_cache import ToolResultCache, returns_command, run_cached
+from svelte_langgraph.tools import (
+    ToolPolicy,
+    change_phase,
+    get_tool_policies,
+    get_weather,
+)
+
+from .conftest import (
+    CompletionMeta,
+    make_completion_response,
+)
+
+CACHED = ToolPolicy(cache_ttl=60)
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def weather_call(call_id: str, city: str = "Paris") -> ToolCall:
+    return ToolCall(name="get_weather", args={"city": city}, id=call_id)
+
+
+class Counter:
+    """Stands in for a tool execution; counts calls."""
+
+    def __init__(self, delay: float = 0.0, status: str = "success") -> None:
+        self.delay = delay
+        self.status = status
+        self.calls = 0
+        self.cancelled = False
+
+    def __call__(self, call: ToolCall):
+        async def execute() -> ToolMessage:
+            self.calls += 1
+            try:
+                await asyncio.sleep(self.delay)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+            return ToolMessage(
+                f"result {self.calls}",
+                tool_call_id=call["id"],
+                status=self.status,  # type: ignore[arg-type]
+            )
+
+        return execute
+
+
+@pytest.mark.asyncio
+async def test_hit_is_readdressed_to_the_new_call() -> None:
+    cache = ToolResultCache()
+    execute = Counter()
+
+    first = await cache.call(weather_call("a"), CACHED, execute(weather_call("a")))
+    second = await cache.call(weather_call("b"), CACHED, execute(weather_call("b")))
+
+    assert execute.calls == 1
+    assert isinstance(first, ToolMessage) and isinstance(second, ToolMessage)
+    assert second.text == first.text == "result 1"
+    assert second.tool_call_id == "b"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_ttl(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("svelte_langgraph.tool_cache.time.monotonic", lambda: now[0])
+    cache = ToolResultCache()
+    execute = Counter()
+
+    await cache.call(weather_call("a"), CACHED, execute(weather_call("a")))
+    now[0] += 61
+    await cache.call(weather_call("b"), CACHED, execute(weather_call("b")))
+
+    assert execute.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted() -> None:
+    cache = ToolResultCache(max_entries=2)
+    execute = Counter()
+
+    for n, city in enumerate(["Paris", "Rome", "Paris", "Oslo", "Paris", "Rome"]):
+        call = weather_call(str(n), city)
+        await cache.call(call, CACHED, execute(call))
+
+    # Rome was evicted by Oslo (Paris had just been used); Paris stays hot.
+    assert execute.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution() -> None:
+    cache = ToolResultCache()
+    execute = Counter(delay=0.02)
+    calls = [weather_call(f"call_{n}") for n in range(5)]
+
+    results = await asyncio.gather(
+        *(cache.call(call, CACHED, execute(call)) for call in calls)
+    )
+
+    assert execute.calls == 1
+    assert [r.tool_call_id for r in results if isinstance(r, ToolMessage)] == [
+        call["id"] for call in calls
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_execution() -> None:
+    cache = ToolResultCache()
+    execute = Counter(delay=0.05)
+    first = asyncio.create_task(
+        cache.call(weather_call("a"), CACHED, execute(weather_call("a")))
+    )
+    second = asyncio.create_task(
+        cache.call(weather_call("b"), CACHED, execute(weather_call("b")))
+    )
+    await asyncio.sleep(0.01)
+
+    first.cancel()
+    result = await second
+
+    assert isinstance(result, ToolMessage) and result.text == "result 1"
+    assert not execute.cancelled
+
+
+@pytest.mark.asyncio
+async def test_execution_is_cancelled_with_its_last_caller() -> None:
+    cache = ToolResultCache()
+    execute = Counter(delay=10)
+    task = asyncio.create_task(
+        cache.call(weather_call("a"), CACHED, execute(weather_call("a")))
+    )
+    await asyncio.sleep(0.01)
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert execute.cancelled
+
+
+@pytest.mark.asyncio
+async def test_error_results_are_not_cached() -> None:
+    cache = ToolResultCache()
+    execute = Counter(status="error")
+
+    await cache.call(weather_call("a"), CACHED, execute(weather_call("a")))
+    await cache.call(weather_call("b"), CACHED, execute(weather_call("b")))
+
+    assert execute.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_command_returning_tools_are_never_cached() -> None:
+    phase_tool = create_tool(change_phase)
+    call = ToolCall(name="change_phase", args={"phase": "draft"}, id="a")
+    execute = Counter()
+
+    assert returns_command(phase_tool)
+    assert not returns_command(create_tool(get_weather))
+    await run_cached(call, phase_tool, CACHED, execute(call))
+    await run_cached(call, phase_tool, CACHED, execute(call))
+
+    assert execute.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_weather_policy_key_ignores_case_and_whitespace() -> None:
+    cache = ToolResultCache()
+    policy = get_tool_policies()["get_weather"]
+    execute = Counter()
+
+    for n, city in enumerate(["Amsterdam", " amsterdam", "AMSTERDAM"]):
+        call = weather_call(str(n), city)
+        await cache.call(call, policy, execute(call))
+
+    assert execute.calls == 1
+
+
+def weather_tool_call_response(call_id: str):
+    return make_completion_response(
+        tool_calls=[
+            ChatCompletionMessageToolCall(
+                id=call_id,
+                type="function",
+                function=Function(name="get_weather", arguments='{"city": "Paris"}'),
+            )
+        ],
+        meta=CompletionMeta(finish_reason="tool_calls"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_agent_reuses_cached_result_across_threads(
+    monkeypatch, mock_completion
+) -> None:
+    calls: list[str] = []
+
+    async def counting_get_weather(city: str) -> str:
+        """Get weather for a given city."""
+        calls.append(city)
+        return f"It's always sunny in {city}!"
+
+    counting_get_weather.__name__ = "get_weather"
+    monkeypatch.setattr(
+        "svelte_langgraph.graph.get_tools",
+        lambda: [counting_get_weather, change_phase],
+    )
+    mock_completion.side_effect = [
+        weather_tool_call_response("call_1"),
+        make_completion_response("Sunny."),
+        weather_tool_call_response("call_2"),
+        make_completion_response("Still sunny."),
+    ]
+
+    for thread_id in ("t-1", "t-2"):
+        config = RunnableConfig(configurable={"thread_id": thread_id})
+        agent = make_graph(config).copy(update={"checkpointer": InMemorySaver()})
+        result = await agent.ainvoke(
+            {"messages": [HumanMessage("Weather in Paris?")]}, config
+        )
+        tool_message = next(m for m in result["messages"] if isinstance(m, ToolMessage))
+        assert tool_message.text == "It's always sunny in Paris!"
+
+    assert calls == ["Paris"]
+
+
+@pytest.mark.asyncio
+async def test_stopped_first_run_still_answers_the_run_sharing_its_call(
+    monkeypatch, mock_completion
+) -> None:
+    calls: list[str] = []
+
+    async def slow_get_weather(city: str) -> str:
+        """Get weather for a given city."""
+        calls.append(city)
+        await asyncio.sleep(0.1)
+        return f"It's always sunny in {city}!"
+
+    slow_get_weather.__name__ = "get_weather"
+    monkeypatch.setattr(
+        "svelte_langgraph.graph.get_tools",
+        lambda: [slow_get_weather, change_phase],
+    )
+    mock_completion.side_effect = [
+        weather_tool_call_response("call_1"),
+        weather_tool_call_response("call_2"),
+        make_completion_response("Sunny."),
+    ]
+
+    async def ask(thread_id: str) -> dict:
+        config = RunnableConfig(configurable={"thread_id": thread_id})
+        agent = make_graph(config).copy(update={"checkpointer": InMemorySaver()})
+        return await agent.ainvoke(
+            {"messages": [HumanMessage("Weather in Paris?")]}, config
+        )
+
+    first = asyncio.create_task(ask("t-1"))
+    second = asyncio.create_task(ask("t-2"))
+    await asyncio.sleep(0.05)
+    first.cancel()
+    result = await second
+
+    tool_message = next(m for m in result["messages"] if isinstance(m, ToolMessage))
+    assert tool_message.text == "It's always sunny in Paris!"
+    assert result["messages"][-1].text == "Sunny."
+    assert calls == ["Paris"]
+    assert first.cancelled()
@@ -0,0 +1,164 @@
+"""Tests for per-tool timeouts and concurrency limits
+(`svelte_langgraph.tool_limits`)."""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage, ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+
+from svelte_langgraph.graph import make_graph
+from svelte_langgraph.tool_limits import run_with_policy
+from svelte_langgraph.tools import ToolPolicy, change_phase
+
+
+pytestmark = pytest.mark.single_provider
+
+
+def weather_call(n: int = 1) -> ToolCall:
+    return ToolCall(name="get_weather", args={"city": "Paris"}, id=f"call_{n}")
+
+
+class Probe:
+    """Stands in for a tool; records concurrency and cancellation."""
+
+    def __init__(self, duration: float = 0.02) -> None:
+        self.duration = duration
+        self.active = 0
+        self.peak = 0
+        self.cancelled = 0
+
+    async def __call__(self) -> ToolMessage:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.duration)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+        return ToolMessage("ok", tool_call_id="call")
+
+
+@pytest.mark.asyncio
+async def test_timeout_returns_error_tool_message_and_cancels() -> None:
+    probe = Probe(duration=10)
+    policy = ToolPolicy(timeout=0.05)
+
+    result = await run_with_policy(weather_call(), policy, "t-1", probe)
+
+    assert isinstance(result, ToolMessage)
+    assert result.status == "error"
+    assert result.tool_call_id == "call_1"
+    assert result.text == "Error: get_weather timed out after 0.05 seconds."
+    assert probe.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_tools_own_timeout_error_propagates() -> None:
+    async def failing() -> ToolMessage:
+        raise TimeoutError("upstream")
+
+    with pytest.raises(TimeoutError, match="upstream"):
+        await run_with_policy(weather_call(), ToolPolicy(timeout=5), "t-1", failing)
+
+
+@pytest.mark.asyncio
+async def test_global_concurrency_limit() -> None:
+    probe = Probe()
+    policy = ToolPolicy(max_concurrency=2)
+
+    await asyncio.gather(
+        *(run_with_policy(weather_call(n), policy, f"t-{n}", probe) for n in range(6))
+    )
+
+    assert probe.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_per_thread_concurrency_limit() -> None:
+    probes = {"t-1": Probe(), "t-2": Probe()}
+    overall = Probe()
+    policy = ToolPolicy(max_concurrency_per_thread=1)
+
+    async def run(thread_id: str, n: int) -> None:
+        async def execute() -> ToolMessage:
+            await asyncio.gather(overall(), probes[thread_id]())
+            return ToolMessage("ok", tool_call_id="call")
+
+        await run_with_policy(weather_call(n), policy, thread_id, execute)
+
+    await asyncio.gather(*(run(t, n) for t in probes for n in range(3)))
+
+    assert probes["t-1"].peak == probes["t-2"].peak == 1
+    assert overall.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_timeout_includes_waiting_for_a_slot() -> None:
+    slow = Probe(duration=10)
+    policy = ToolPolicy(timeout=0.05, max_concurrency=1)
+
+    first, second = await asyncio.gather(
+        run_with_policy(weather_call(1), policy, "t-1", slow),
+        run_with_policy(weather_call(2), policy, "t-2", slow),
+    )
+
+    assert isinstance(first, ToolMessage) and first.status == "error"
+    assert isinstance(second, ToolMessage) and second.status == "error"
+    assert slow.peak == 1
+
+
+@pytest.mark.asyncio
+async def test_cancellation_frees_the_slot_promptly() -> None:
+    """Cancelling a run (the stop button) cancels queued and running calls
+    alike, and the next call gets the slot right away."""
+    slow = Probe(duration=10)
+    policy = ToolPolicy(max_concurrency=1)
+    running = asyncio.create_task(run_with_policy(weather_call(1), policy, "t", slow))
+    queued = asyncio.create_task(run_with_policy(weather_call(2), policy, "t", slow))
+    await asyncio.sleep(0.01)
+
+    running.cancel()
+    queued.cancel()
+    await asyncio.gather(running, queued, return_exceptions=True)
+
+    assert slow.cancelled == 1
+    fast = Probe()
+    result = await asyncio.wait_for(
+        run_with_policy(weather_call(3), policy, "t", fast), 1
+    )
+    assert isinstance(result, ToolMessage) and result.status != "error"
+
+
+@pytest.mark.asyncio
+async def test_agent_answers_timed_out_tool_with_error_message(
+    monkeypatch, thread_config: RunnableConfig, openai_single_tool_call
+) -> None:
+    """A timed-out tool doesn't fail the run: the model gets the error
+    `ToolMessage` and answers."""
+
+    async def get_weather(city: str) -> str:
+        """Get weather for a given city."""
+        await asyncio.sleep(10)
+        return "never"
+
+    monkeypatch.setattr(
+        "svelte_langgraph.graph.get_tools", lambda: [get_weather, change_phase]
+    )
+    monkeypatch.setattr(
+        "svelte_langgraph.graph.get_tool_policies",
+        lambda: {"get_weather": ToolPolicy(timeout=0.05)},
+    )
+    agent = make_graph(thread_config).copy(update={"checkpointer": InMemorySaver()})
+
+    result = await agent.ainvoke(
+        {"messages": [HumanMessage("Weather in Paris?")]}, thread_config
+    )
+
+    tool_message = next(m for m in result["messages"] if isinstance(m, ToolMessage))
+    assert tool_message.status == "error"
+    assert "timed out" in tool_message.text
+    assert openai_single_tool_call.call_count == 2
@@ -0,0 +1,134 @@
+"""Tests for the startup warm-up and readiness (`svelte_langgraph.warmup`)."""
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+import respx
+from fastapi.testclient import TestClient
+
+from svelte_langgraph import auth, models, phase_tools, warmup
+from svelte_langgraph.models import current_models
+from svelte_langgraph.warmup import is_ready, warm_up, warmup_status, warmup_timeout
+from svelte_langgraph.webapp import app
+
+from .conftest import DEFAULT_BASE_URL
+
+
+pytestmark = pytest.mark.single_provider
+
+
+@pytest.fixture
+def provider():
+    """The provider's model listing, which warm-up uses to connect."""
+    with respx.mock(base_url=DEFAULT_BASE_URL, assert_all_called=False) as respx_mock:
+        route = respx_mock.get("/models")
+        route.return_value = httpx.Response(200, json={"object": "list", "data": []})
+        yield route
+
+
+@pytest.fixture
+def jwks(monkeypatch) -> AsyncMock:
+    monkeypatch.setattr(auth, "oidc_issuer", "http://localhost:8080")
+    get_jwks = AsyncMock(return_value={"keys": []})
+    monkeypatch.setattr(auth, "_get_jwks", get_jwks)
+    return get_jwks
+
+
+@pytest.fixture(autouse=True)
+def no_retry_wait(monkeypatch) -> None:
+    monkeypatch.setattr(warmup, "RETRY_INTERVAL_S", 0)
+
+
+@pytest.mark.asyncio
+async def test_warm_up_prepares_everything(provider, jwks: AsyncMock) -> None:
+    phase_tools.clear_tool_schema_cache()
+
+    assert not is_ready()
+    assert await warm_up()
+
+    assert is_ready() and warmup_status() == "ready"
+    assert phase_tools._schema_cache
+    assert current_models()._models
+    jwks.assert_awaited_once()
+    assert provider.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_warm_up_skips_jwks_without_issuer(monkeypatch, provider) -> None:
+    get_jwks = AsyncMock()
+    monkeypatch.setattr(auth, "_get_jwks", get_jwks)
+
+    assert await warm_up()
+
+    get_jwks.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_provider_error_response_still_warms(provider, jwks) -> None:
+    provider.return_value = httpx.Response(404)
+
+    assert await warm_up()
+
+
+@pytest.mark.asyncio
+async def test_failed_steps_are_retried(provider, jwks: AsyncMock) -> None:
+    jwks.side_effect = [httpx.ConnectError("down"), {"keys": []}]
+
+    assert await warm_up()
+
+    assert jwks.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_ready_after_timeout_even_if_cold(provider, jwks: AsyncMock) -> None:
+    async def hang() -> None:
+        await asyncio.sleep(10)
+
+    jwks.side_effect = hang
+
+    assert not await warm_up(timeout=0.5)
+
+    assert is_ready() and warmup_status() == "timed_out"
+    # The hanging step didn't hold back the others.
+    assert provider.call_count == 1
+    assert phase_tools._schema_cache
+
+
+@pytest.mark.asyncio
+async def test_models_are_built_off_the_loop(provider, jwks) -> None:
+    init_model = models._init_model
+    threads = []
+
+    def record_thread(spec):
+        threads.append(threading.get_ident())
+        return init_model(spec)
+
+    with patch.object(models, "_init_model", record_thread):
+        assert await warm_up()
+
+    assert threads and threading.get_ident() not in threads
+
+
+def test_warmup_timeout_rejects_negative(monkeypatch) -> None:
+    monkeypatch.setenv("WARMUP_TIMEOUT_S", "-1")
+
+    with pytest.raises(ValueError, match="WARMUP_TIMEOUT_S"):
+        warmup_timeout()
+
+
+@pytest.mark.asyncio
+async def test_ready_route_waits_for_warm_up(provider, jwks) -> None:
+    client = TestClient(app)
+    ready = AsyncMock(return_value={"status": "ready"})
+
+    with patch("svelte_langgraph.webapp.readiness_check", new=ready):
+        assert client.get("/ready").status_code == 503
+        await warm_up()
+        response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
+    ready.assert_awaited_once()
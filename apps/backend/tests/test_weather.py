@@ -0,0 +1,153 @@
+"""Tests for weather lookups and their micro-batching
+(`svelte_langgraph.weather`)."""
+
+import asyncio
+from collections.abc import Mapping, Sequence
+
+import pytest
+
+from svelte_langgraph.tools import get_weather
+from svelte_langgraph.weather import (
+    FakeWeatherProvider,
+    WeatherBatcher,
+    get_weather_batcher,
+    make_weather_provider,
+)
+
+
+pytestmark = pytest.mark.single_provider
+
+
+class RecordingProvider(FakeWeatherProvider):
+    """Fake provider that also records each request's cities."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__(latency)
+        self.batches: list[list[str]] = []
+
+    async def lookup(self, cities: Sequence[str]) -> Mapping[str, str]:
+        self.batches.append(list(cities))
+        return await super().lookup(cities)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_request() -> None:
+    provider = RecordingProvider(latency=0.01)
+    batcher = WeatherBatcher(provider, window=0.01)
+
+    results = await asyncio.gather(
+        *(batcher.lookup(city) for city in ["Paris", "Rome", "Oslo", "Paris"])
+    )
+
+    assert results == [
+        "It's always sunny in Paris!",
+        "It's always sunny in Rome!",
+        "It's always sunny in Oslo!",
+        "It's always sunny in Paris!",
+    ]
+    assert provider.batches == [["Paris", "Rome", "Oslo"]]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting_for_the_window() -> None:
+    provider = RecordingProvider()
+    batcher = WeatherBatcher(provider, window=10, max_size=2)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.lookup("Paris"), batcher.lookup("Rome")), 1
+    )
+
+    assert len(results) == 2
+    assert provider.batches == [["Paris", "Rome"]]
+
+
+@pytest.mark.asyncio
+async def test_lookups_after_the_window_start_a_new_batch() -> None:
+    provider = RecordingProvider()
+    batcher = WeatherBatcher(provider, window=0.01)
+
+    await batcher.lookup("Paris")
+    await batcher.lookup("Rome")
+
+    assert provider.batches == [["Paris"], ["Rome"]]
+
+
+@pytest.mark.asyncio
+async def test_zero_window_disables_batching() -> None:
+    provider = RecordingProvider()
+    batcher = WeatherBatcher(provider, window=0)
+
+    await asyncio.gather(batcher.lookup("Paris"), batcher.lookup("Rome"))
+
+    assert provider.batches == [["Paris"], ["Rome"]]
+
+
+@pytest.mark.asyncio
+async def test_provider_error_reaches_every_lookup_in_the_batch() -> None:
+    class FailingProvider:
+        async def lookup(self, cities: Sequence[str]) -> Mapping[str, str]:
+            raise RuntimeError("weather service down")
+
+    batcher = WeatherBatcher(FailingProvider(), window=0.01)
+
+    results = await asyncio.gather(
+        batcher.lookup("Paris"), batcher.lookup("Rome"), return_exceptions=True
+    )
+
+    assert [str(r) for r in results] == ["weather service down"] * 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_lookup_does_not_break_its_batch() -> None:
+    provider = RecordingProvider(latency=0.01)
+    batcher = WeatherBatcher(provider, window=0.01)
+    cancelled = asyncio.create_task(batcher.lookup("Paris"))
+    kept = asyncio.create_task(batcher.lookup("Rome"))
+    await asyncio.sleep(0)
+
+    cancelled.cancel()
+
+    assert await kept == "It's always sunny in Rome!"
+
+
+@pytest.mark.asyncio
+async def test_fake_provider_latency_is_per_request() -> None:
+    provider = FakeWeatherProvider(latency=0.05)
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    await provider.lookup(["Paris", "Rome", "Oslo"])
+
+    assert 0.05 <= loop.time() - start < 0.5
+    assert provider.requests == 1
+
+
+def test_make_weather_provider_reads_latency(monkeypatch) -> None:
+    monkeypatch.setenv("WEATHER_FAKE_LATENCY_MS", "250")
+    provider = make_weather_provider()
+    assert isinstance(provider, FakeWeatherProvider)
+    assert provider.latency == 0.25
+
+    monkeypatch.setenv("WEATHER_FAKE_LATENCY_MS", "100-200")
+    provider = make_weather_provider()
+    assert isinstance(provider, FakeWeatherProvider)
+    assert provider.latency == (0.1, 0.2)
+
+
+def test_make_weather_provider_rejects_unknown(monkeypatch) -> None:
+    monkeypatch.setenv("WEATHER_PROVIDER", "bogus")
+
+    with pytest.raises(ValueError, match="Unknown WEATHER_PROVIDER"):
+        make_weather_provider()
+
+
+@pytest.mark.asyncio
+async def test_get_weather_tool_goes_through_the_batcher(monkeypatch) -> None:
+    monkeypatch.setenv("WEATHER_FAKE_LATENCY_MS", "0")
+
+    results = await asyncio.gather(get_weather("Paris"), get_weather("Rome"))
+
+    assert results == ["It's always sunny in Paris!", "It's always sunny in Rome!"]
+    provider = get_weather_batcher().provider
+    assert isinstance(provider, FakeWeatherProvider)
+    assert provider.requests == 1